@@ -0,0 +1,220 @@
+import heapq
+from CraftingDatabase import CraftingDatabase
+from CraftingGraph import CraftingGraph
+
+# AcquisitionSolver finds the cheapest way to obtain every Item, choosing among the Recipes that produce it
+# Base Items (Items no Recipe produces) are bought: with metric="value" they cost their sell_value, with metric="time" nothing
+# A Recipe's cost is the cost of its inputs (plus its time, for metric="time"), and a unit of one of its outputs costs the
+# Recipe's cost divided by how many of it the Recipe makes. Other outputs of the Recipe are ignored, like in BillOfMaterials
+#
+# Costs are found with Knuth's generalization of Dijkstra's algorithm to the Recipe hypergraph: the cheapest unsettled Item
+# is settled next, and a Recipe is only used once all of its inputs are settled, so Items only reachable through a cycle
+# are reported as unobtainable. Dividing by an output quantity can make a Recipe's output cheaper than its inputs, which
+# breaks Dijkstra's settle order, so a Recipe firing later can still undercut an Item settled earlier. Such an Item is
+# lowered anyway and the Recipes already fired from it are fired again, until nothing gets cheaper (label correcting)
+# A lower cost is only taken if the Item isn't itself part of the new route, so routes stay free of cycles, and loops
+# that make more than they use can't lower each other forever. Around such loops the cheapest cycle-free way to make an
+# Item can need another Item made differently than its own cheapest way, which one route per Item can't express, so the
+# cost found there is that of a valid route but not always the lowest
+# Which valid route is found there depends on the order Items are settled in, so each strongly connected component of the
+# Item graph is solved on its own once everything upstream of it is final, in the order a CraftingGraph keeps. A
+# component's costs then only depend on the costs coming into it, and solving part of the table gives what solving all of
+# it would
+#
+# The table is solved on first use, and changes are queued by the database's listener: on the next query only the changed
+# Items and the Items downstream of them (made from them through any chain of Recipes) are solved again, a whole
+# component at a time
+
+class AcquisitionSolver:
+    METRICS = ("value", "time")
+
+    def __init__(self, db:CraftingDatabase, metric="value"):
+        if metric not in self.METRICS:
+            raise ValueError(f"Unknown metric '{metric}', expected one of {', '.join(self.METRICS)}")
+        self.db = db
+        self.metric = metric
+        self.graph = CraftingGraph(db)
+
+        #item_id: cost of one unit, and item_id: Recipe used to make it (None for bought Items), for solved Items
+        self._costs = None
+        self._routes = {}
+
+        #item_ids whose cost may have changed since the last solve
+        self._pending = set()
+
+        self.db.add_listener(self.on_change)
+
+    #Stops listening to the database, for when the solver is no longer needed
+    def close(self):
+        self.db.remove_listener(self.on_change)
+        self.graph.close()
+
+    #Database listener, queues the Items whose cost a change may affect
+    def on_change(self, event:str, *args):
+        if self._costs is None:
+            return
+        if event == "add_item":
+            self._pending.add(args[0].id)
+        elif event == "edit_item":
+            item, _old_name, old_sell_value = args
+            if self.metric == "value" and item.sell_value != old_sell_value:
+                self._pending.add(item.id)
+        elif event in ("add_recipe", "remove_recipe"):
+            self._pending.update(args[0].output_ids)
+        elif event == "edit_recipe":
+            self._pending.update(args[0].output_ids)
+            self._pending.update(args[1].output_ids)
+        elif event == "remove_item":
+            item, removed_recipes = args
+            self._costs.pop(item.id, None)
+            self._routes.pop(item.id, None)
+            self._pending.discard(item.id)
+            for recipe in removed_recipes:
+                self._pending.update(recipe.output_ids)
+        else:
+            self._costs = None
+
+    #Returns (True, cost of one unit of item_id) or (False, message) if it doesn't exist or can't be obtained
+    def cost(self, item_id:str):
+        if item_id not in self.db.items:
+            return False, f"'{item_id}' not found"
+        cost = self._table().get(item_id)
+        if cost is None:
+            return False, f"'{item_id}' can't be obtained without going through a cycle"
+        return True, cost
+
+    #Returns (True, Recipe) for the cheapest Recipe making item_id, (True, None) if it is bought, or (False, message)
+    def route(self, item_id:str):
+        success, cost = self.cost(item_id)
+        if not success:
+            return False, cost
+        return True, self._routes[item_id]
+
+    #Returns {item_id: (cost, Recipe or None)} for every obtainable Item
+    def table(self):
+        costs = self._table()
+        return {item_id: (cost, self._routes[item_id]) for item_id, cost in costs.items()}
+
+    #Solved costs, solving everything the first time and only what changed afterwards
+    def _table(self):
+        if self._costs is None:
+            self._costs = {}
+            self._routes = {}
+            self._pending = set()
+            self._solve_components(set(self.db.items))
+        elif self._pending:
+            changed = self._downstream({i for i in self._pending if i in self.db.items})
+            self._pending = set()
+            for item_id in changed:
+                self._costs.pop(item_id, None)
+                self._routes.pop(item_id, None)
+            self._solve_components(changed)
+        return self._costs
+
+    #Solves the Items in targets one component at a time, upstream components first
+    #targets is closed downstream, so it holds every Item of the components it touches
+    def _solve_components(self, targets:set):
+        components = {}
+        for item_id in targets:
+            components.setdefault(self.graph.position(item_id), set()).add(item_id)
+        for position in sorted(components):
+            self._solve(components[position])
+
+    #item_ids plus every Item made from them through any chain of Recipes
+    def _downstream(self, item_ids:set) -> set:
+        seen = set(item_ids)
+        stack = list(item_ids)
+        while stack:
+            for recipe in self.db.recipes_that_consume(stack.pop()):
+                for output_id in recipe.output_ids:
+                    if output_id not in seen:
+                        seen.add(output_id)
+                        stack.append(output_id)
+        return seen
+
+    #Knuth's algorithm over the unsolved Items in targets, every other Item's cost (or absence) being final
+    def _solve(self, targets:set):
+        costs = self._costs
+        routes = self._routes
+        best = {}
+        heap = []
+
+        #Settled targets that got cheaper after being settled, whose fired consumers must fire again
+        lowered = []
+
+        def offer(item_id, cost, recipe):
+            if cost < best.get(item_id, float("inf")):
+                best[item_id] = cost
+                routes[item_id] = recipe
+                heapq.heappush(heap, (cost, item_id))
+
+        #Fires a Recipe whose inputs are all settled, offering its cost to each unsettled target it makes, and lowering
+        #settled targets it makes for less
+        def fire(recipe):
+            total = recipe.time if self.metric == "time" else 0
+            for input_id, qty in recipe.input_items():
+                cost = costs.get(input_id)
+                if cost is None:
+                    return
+                total += cost * qty
+            for output_id, qty in recipe.output_items():
+                if output_id not in targets:
+                    continue
+                cost = total / qty
+                if output_id not in costs:
+                    offer(output_id, cost, recipe)
+                elif cost < costs[output_id] and not self._route_uses(recipe, output_id):
+                    costs[output_id] = cost
+                    routes[output_id] = recipe
+                    lowered.append(output_id)
+
+        #Unsettled target inputs left for each Recipe making a target; Recipes without any can fire straight away
+        #Targets are gone through sorted, so ties go the same way however the targets were gathered
+        waiting = {}
+        for item_id in sorted(targets):
+            producers = self.db.recipes_that_produce(item_id)
+            if not producers:
+                offer(item_id, self.db.items[item_id].sell_value if self.metric == "value" else 0, None)
+            for recipe in producers:
+                if recipe not in waiting:
+                    waiting[recipe] = len({i for i in recipe.input_ids if i in targets})
+                    if waiting[recipe] == 0:
+                        fire(recipe)
+
+        while heap:
+            cost, item_id = heapq.heappop(heap)
+            if item_id in costs or cost > best[item_id]:
+                continue
+            costs[item_id] = cost
+
+            for recipe in self.db.recipes_that_consume(item_id):
+                if recipe in waiting:
+                    waiting[recipe] -= 1
+                    if waiting[recipe] == 0:
+                        fire(recipe)
+
+            while lowered:
+                for recipe in self.db.recipes_that_consume(lowered.pop()):
+                    if waiting.get(recipe) == 0:
+                        fire(recipe)
+
+        #Targets never settled can't be obtained
+        for item_id in targets:
+            if item_id not in costs:
+                routes.pop(item_id, None)
+
+    #Whether item_id is among recipe's inputs or anywhere up their chosen routes
+    def _route_uses(self, recipe, item_id:str) -> bool:
+        seen = set()
+        stack = list(recipe.input_ids)
+        while stack:
+            input_id = stack.pop()
+            if input_id == item_id:
+                return True
+            if input_id in seen:
+                continue
+            seen.add(input_id)
+            route = self._routes.get(input_id)
+            if route is not None:
+                stack.extend(route.input_ids)
+        return False
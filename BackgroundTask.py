@@ -0,0 +1,60 @@
+from PySide6.QtCore import QObject, QThread, Signal
+import threading
+
+# BackgroundTask runs a slow function (loading or saving a database) in its own QThread so the window stays responsive
+# The function is called as func(report), and passes report as the progress callback of CraftingDatabase.load()/save()
+# report(done, total) emits the progress signal as a percentage, or -1 if the total is unknown, and raises TaskCancelled
+# once cancel() has been called, which unwinds the function from inside its loop
+# Results and errors come back through the finished and failed signals, which Qt delivers on the main thread
+
+class TaskCancelled(Exception):
+    pass
+
+class BackgroundTask(QObject):
+    progress = Signal(int)
+    finished = Signal(object)
+    failed = Signal(object)
+
+    def __init__(self, func):
+        super().__init__()
+        self.func = func
+        self._cancel = threading.Event()
+        self._percent = None
+
+        # The task lives in its own thread, which quits and is cleaned up once the task is done
+        self.thread = QThread()
+        self.moveToThread(self.thread)
+        self.thread.started.connect(self.run)
+        self.finished.connect(self.thread.quit)
+        self.failed.connect(self.thread.quit)
+        self.thread.finished.connect(self.thread.deleteLater)
+
+    def start(self):
+        self.thread.start()
+
+    #Asks the task to stop, it stops the next time it reports progress
+    #The task lives in its worker thread, so a signal connected straight to cancel() would be queued behind run() and
+    #only delivered once the work is done. Call it directly from the main thread instead, it only sets a thread-safe flag
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def run(self):
+        try:
+            result = self.func(self.report)
+        except Exception as e:
+            self.failed.emit(e)
+            return
+        self.finished.emit(result)
+
+    #Progress callback handed to func, only emits when the percentage changes so the main thread isn't flooded
+    def report(self, done, total):
+        if self._cancel.is_set():
+            raise TaskCancelled()
+        percent = int(done * 100 / total) if total else -1
+        if percent != self._percent:
+            self._percent = percent
+            self.progress.emit(percent)
@@ -0,0 +1,147 @@
+from CraftingDatabase import CraftingDatabase
+from GraphGenerator import generate
+from SortIndex import SortIndex
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+# Benchmark times the CraftingDatabase operations the app leans on, on generated databases of a few sizes
+# A scale is a number of Recipes, generated over half as many Items with GraphGenerator's defaults and a fixed seed,
+# so every run times the same databases
+# Each benchmark reports its total seconds, how many operations that covered, and microseconds per operation
+# Results are written as JSON, and compare() (or --compare) lines up two result files to show what got faster or slower
+#
+#   python Benchmark.py --scales 1000 10000 --output before.json
+#   python Benchmark.py --scales 1000 10000 --output after.json --compare before.json
+
+DEFAULT_SCALES = (1000, 10000, 100000)
+
+#Seconds taken by the fastest of repeat calls of func
+def _measure(func, repeat=1) -> float:
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def _result(seconds:float, ops:int) -> dict:
+    return {"seconds": seconds, "ops": ops, "us_per_op": seconds * 1e6 / ops if ops else 0}
+
+#Runs every benchmark on one generated database, returning {benchmark name: result}
+def run_scale(scale:int, seed=0, repeat=3) -> dict:
+    db = generate(items=max(scale // 2, 10), recipes=scale, seed=seed)
+    items = dict(db.items)
+    recipes = list(db.recipes)
+    item_ids = list(items)
+    results = {}
+
+    # add_recipe() one at a time into a database that already has every Item
+    def add_all():
+        target = CraftingDatabase(items=items)
+        for recipe in recipes:
+            target.add_recipe(recipe)
+    results["add_recipe"] = _result(_measure(add_all), len(recipes))
+
+    # Index lookups for every Item
+    def consume_all():
+        for item_id in item_ids:
+            db.recipes_that_consume(item_id)
+    results["recipes_that_consume"] = _result(_measure(consume_all, repeat), len(item_ids))
+
+    # Profits with an empty cache, then with every profit cached
+    def profits():
+        for recipe in recipes:
+            db.calc_profit(recipe)
+    def cold_profits():
+        db._profit_cache.clear()
+        profits()
+    results["calc_profit_cold"] = _result(_measure(cold_profits, repeat), len(recipes))
+    results["calc_profit_warm"] = _result(_measure(profits, repeat), len(recipes))
+
+    # MainWindow.get_sorted_recipes(): building each sort key's order the first time, then reading it in both directions
+    sort_index = SortIndex(db)
+    results["sorted_recipes_build"] = _result(
+        _measure(lambda: [sort_index.sorted_recipes(key) for key in SortIndex.KEYS]), len(SortIndex.KEYS))
+    results["sorted_recipes"] = _result(
+        _measure(lambda: [sort_index.sorted_recipes(key, descending) for key in SortIndex.KEYS for descending in (False, True)], repeat),
+        len(SortIndex.KEYS) * 2)
+    sort_index.close()
+
+    # Saving, then loading the file back both validated and trusted
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "benchmark.json")
+        results["save"] = _result(_measure(lambda: db.save(filename)), len(recipes))
+        results["load"] = _result(_measure(lambda: CraftingDatabase.load(filename)), len(recipes))
+        results["load_trusted"] = _result(_measure(lambda: CraftingDatabase.load(filename, trusted=True)), len(recipes))
+
+    # remove_item(cascade=True) of a random sample of up to 1000 Items, on a fresh copy
+    sample = random.Random(seed).sample(item_ids, min(len(item_ids), 1000))
+    target = CraftingDatabase(items=dict(items), recipes=recipes)
+    def remove_all():
+        for item_id in sample:
+            target.remove_item(item_id, cascade=True)
+    results["remove_item_cascade"] = _result(_measure(remove_all), len(sample))
+
+    return results
+
+#Runs every scale, returning the results with a description of the machine they ran on
+def run(scales=DEFAULT_SCALES, seed=0, repeat=3, log=print) -> dict:
+    report = {
+        "meta": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "seed": seed,
+            "repeat": repeat,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": {},
+    }
+    for scale in scales:
+        results = run_scale(scale, seed=seed, repeat=repeat)
+        report["results"][str(scale)] = results
+        if log is not None:
+            for name, result in results.items():
+                log(f"{scale:>8} {name:<22} {result['seconds']:>10.4f}s {result['us_per_op']:>12.2f}us/op")
+    return report
+
+#Ratios of new to old us_per_op for every benchmark both reports ran, under 1 means faster
+def compare(old:dict, new:dict) -> dict:
+    ratios = {}
+    for scale, results in new["results"].items():
+        old_results = old["results"].get(scale, {})
+        for name, result in results.items():
+            before = old_results.get(name)
+            if before and before["us_per_op"]:
+                ratios.setdefault(scale, {})[name] = result["us_per_op"] / before["us_per_op"]
+    return ratios
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time CraftingDatabase operations on generated databases")
+    parser.add_argument("--scales", type=int, nargs="+", default=list(DEFAULT_SCALES), help="numbers of Recipes to generate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each repeatable benchmark, the fastest is kept")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    report = run(args.scales, seed=args.seed, repeat=args.repeat)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    print(f"Results written to '{args.output}'")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            old = json.load(f)
+        for scale, ratios in compare(old, report).items():
+            for name, ratio in ratios.items():
+                print(f"{scale:>8} {name:<22} {ratio:>8.2f}x {'faster' if ratio < 1 else 'slower'}")
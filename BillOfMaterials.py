@@ -0,0 +1,132 @@
+from CraftingDatabase import CraftingDatabase
+
+# BillOfMaterials expands an Item into the raw (base) Items it takes to craft, following producing Recipes all the way down
+# Raw Items are Items no Recipe produces. An Item with several producing Recipes is expanded through the first one added
+# Multi-output Recipes are scaled by the quantity of the wanted output: iron x4 -> iron_ingot x2 means 1 iron_ingot costs 2 iron
+# Other outputs of a Recipe (byproducts) are ignored
+# Expansions of 1 unit of each Item are memoized, and are only dropped when a Recipe producing that Item (or something below it) changes
+# Expansion uses an explicit stack instead of recursion, so very deep trees don't hit Python's recursion limit
+
+class BillOfMaterials:
+    def __init__(self, db:CraftingDatabase):
+        self.db = db
+
+        #item_id: {raw_item_id: quantity} for 1 unit of item_id
+        self._memo = {}
+
+        #item_id: set of memoized item_ids whose expansion went directly through item_id, used for invalidation
+        self._users = {}
+
+        self.db.add_listener(self.on_change)
+
+    #Stops listening to the database, for when the BillOfMaterials is no longer needed
+    def close(self):
+        self.db.remove_listener(self.on_change)
+
+    #Database listener, drops memoized expansions that depended on the changed Recipes' outputs
+    #Sell value and name changes never change quantities, so they don't invalidate anything
+    def on_change(self, event:str, *args):
+        if event in ("add_recipe", "remove_recipe"):
+            self._invalidate(args[0].output_ids)
+        elif event == "edit_recipe":
+            self._invalidate(args[0].output_ids)
+            self._invalidate(args[1].output_ids)
+        elif event == "remove_item":
+            item, removed_recipes = args
+            self._invalidate([item.id])
+            for r in removed_recipes:
+                self._invalidate(r.output_ids)
+        elif event == "bulk_add_recipes":
+            for r in args[0]:
+                self._invalidate(r.output_ids)
+        elif event == "bulk_remove":
+            removed_items, removed_recipes = args
+            self._invalidate([item.id for item in removed_items])
+            for r in removed_recipes:
+                self._invalidate(r.output_ids)
+
+    #Returns the Recipe used to craft item_id, or None if it is a raw Item
+    def recipe_for(self, item_id:str):
+        producers = self.db.recipes_that_produce(item_id)
+        return producers[0] if producers else None
+
+    #Returns the raw Items and quantities needed to craft quantity of item_id, provided it exists and its tree has no cycles
+    #iron_ingot x1 -> (True, {'iron': 2.0})
+    def expand(self, item_id:str, quantity=1):
+        if item_id not in self.db.items:
+            return False, f"'{item_id}' not found"
+
+        success, unit = self._expand_unit(item_id)
+        if not success:
+            return False, unit
+        return True, {raw_id: qty * quantity for raw_id, qty in unit.items()}
+
+    #Returns the total sell_value of the raw Items needed to craft quantity of item_id
+    def raw_cost(self, item_id:str, quantity=1):
+        success, materials = self.expand(item_id, quantity)
+        if not success:
+            return False, materials
+        return True, sum(self.db.items[raw_id].sell_value * qty for raw_id, qty in materials.items())
+
+    #Expands 1 unit of item_id depth first with an explicit stack, memoizing every Item on the way
+    #Items on the current path are tracked so a Recipe leading back into the path is reported as a cycle
+    def _expand_unit(self, item_id:str):
+        if item_id in self._memo:
+            return True, self._memo[item_id]
+
+        stack = [item_id]
+        on_path = set()
+
+        while stack:
+            current = stack[-1]
+            if current in self._memo:
+                stack.pop()
+                continue
+
+            recipe = self.recipe_for(current)
+
+            #Raw Items expand to themselves
+            if recipe is None:
+                self._memo[current] = {current: 1.0}
+                stack.pop()
+                continue
+
+            #First visit, queue up every input that isn't expanded yet
+            if current not in on_path:
+                on_path.add(current)
+                pending = [i for i in recipe.input_ids if i not in self._memo]
+                for i in pending:
+                    if i in on_path:
+                        return False, f"Cycle detected: {' -> '.join(self._cycle_path(stack, on_path, i))}"
+                if pending:
+                    stack.extend(pending)
+                    continue
+
+            #Every input is expanded, so combine them scaled by how many of current the Recipe makes
+            per_craft = dict(recipe.output_items())[current]
+            unit = {}
+            for input_id, qty in recipe.input_items():
+                scale = qty / per_craft
+                for raw_id, raw_qty in self._memo[input_id].items():
+                    unit[raw_id] = unit.get(raw_id, 0.0) + raw_qty * scale
+                self._users.setdefault(input_id, set()).add(current)
+
+            self._memo[current] = unit
+            on_path.discard(current)
+            stack.pop()
+
+        return True, self._memo[item_id]
+
+    #Rebuilds the path of the cycle closing at item_id from the Items currently being expanded on the stack
+    #An Item being expanded sits at its highest position in the stack, so the path is read top down and reversed
+    def _cycle_path(self, stack:list, on_path:set, item_id:str):
+        path = list(dict.fromkeys(i for i in reversed(stack) if i in on_path))[::-1]
+        return path[path.index(item_id):] + [item_id]
+
+    #Drops the memoized expansions of item_ids and of every Item expanded through them
+    def _invalidate(self, item_ids):
+        stack = list(item_ids)
+        while stack:
+            current = stack.pop()
+            self._memo.pop(current, None)
+            stack.extend(self._users.pop(current, ()))
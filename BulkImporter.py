@@ -0,0 +1,243 @@
+from Item import Item, slugify
+from Recipe import Recipe
+from CraftingDatabase import CraftingDatabase
+import csv
+import json
+import operator
+import os
+
+# BulkImporter adds Items or Recipes to a database from large CSV or JSON lines tables, like wiki exports and datamined game files
+# Rows are read one at a time and added batch_size at a time with the database's bulk_add_ methods, so memory stays
+# bounded by one batch however long the file is, and listeners hear about one "bulk_add_items"/"bulk_add_recipes" per batch
+# Rows that can't be added are skipped and reported with their line number and the reason, the rest of the batch still goes in
+#
+# columns maps each field to the column (CSV header or JSON key) holding it, and only needs the fields named differently:
+#   Items:   "id", "name", "sell_value". Without an id, the Item's id is slugify(name), the same as ItemDialog's ID field
+#   Recipes: "inputs", "outputs", "type", "time"
+# Ingredients are written "iron_ore:4; coal" in CSV (a missing quantity is 1), and may also be {"iron_ore": 4} in JSON lines
+# An ingredient that isn't an existing item_id is taken as an Item name and slugified, so "Iron Ore:4" finds iron_ore
+#
+#   importer = BulkImporter(db)
+#   importer.import_items("items.csv", columns={"name": "Item Name", "sell_value": "Price"})
+#   importer.import_recipes("recipes.jsonl")
+
+ITEM_COLUMNS = {"id": "id", "name": "name", "sell_value": "sell_value"}
+RECIPE_COLUMNS = {"inputs": "inputs", "outputs": "outputs", "type": "type", "time": "time"}
+
+#Fields a row must have, every other field has a default
+REQUIRED = ("name", "inputs", "outputs")
+
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+class BulkImporter:
+    #on_reject is called as on_reject(line, reason) for every rejected row, while only the first max_errors are kept in
+    #the report. progress is called as progress(rows_read) after every batch
+    def __init__(self, db:CraftingDatabase, batch_size=10000, max_errors=1000, on_reject=None, progress=None):
+        self.db = db
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.on_reject = on_reject
+        self.progress = progress
+
+    #Both return {"rows": rows read, "added": rows added, "rejected": rows rejected, "errors": [(line, reason)]}
+    #format is "csv" or "jsonl", and defaults to what the file extension says
+    def import_items(self, filename:str, columns:dict=None, format:str=None) -> dict:
+        return self._import(filename, ITEM_COLUMNS, columns, format, self._item, self.db.bulk_add_items)
+
+    def import_recipes(self, filename:str, columns:dict=None, format:str=None) -> dict:
+        #item_id: the database's own item_id string, so ingredients are looked up once and share the stored ids
+        self._ids = dict(zip(self.db.items, self.db.items))
+        return self._import(filename, RECIPE_COLUMNS, columns, format, self._recipe, self.db.bulk_add_recipes)
+
+    def _import(self, filename, defaults, columns, format, build, bulk_add):
+        if format is None:
+            format = FORMATS.get(os.path.splitext(filename)[1].lower())
+            if format is None:
+                raise ValueError(f"Can't tell the format of '{filename}' from its extension, pass format='csv' or 'jsonl'")
+        elif format not in ("csv", "jsonl"):
+            raise ValueError(f"Unknown format '{format}', expected 'csv' or 'jsonl'")
+
+        unknown = set(columns or ()) - defaults.keys()
+        if unknown:
+            raise ValueError(f"Unknown field '{min(unknown)}', expected one of {', '.join(defaults)}")
+        mapping = {**defaults, **(columns or {})}
+
+        self._report = {"rows": 0, "added": 0, "rejected": 0, "errors": []}
+        read = self._csv_rows if format == "csv" else self._jsonl_rows
+
+        #(line, object) pairs waiting to be added
+        batch = []
+        with open(filename, "r", encoding="utf-8-sig", newline="") as f:
+            for line, row in read(f, mapping, columns or {}):
+                self._report["rows"] += 1
+                try:
+                    batch.append((line, build(*row)))
+                except (ValueError, TypeError) as e:
+                    self._reject(line, str(e))
+                    continue
+                if len(batch) >= self.batch_size:
+                    self._add(batch, bulk_add)
+                    batch = []
+            self._add(batch, bulk_add)
+        return self._report
+
+    #Adds a batch in one bulk_add_ call, or if some entries are invalid, rejects those and adds the rest
+    def _add(self, batch, bulk_add):
+        if batch:
+            success, results = bulk_add([value for _line, value in batch])
+            if not success:
+                for (line, _value), (valid, message) in zip(batch, results):
+                    if not valid:
+                        self._reject(line, message)
+                batch = [entry for entry, (valid, _message) in zip(batch, results) if valid]
+                bulk_add([value for _line, value in batch])
+            self._report["added"] += len(batch)
+        if self.progress is not None:
+            self.progress(self._report["rows"])
+
+    def _reject(self, line:int, reason:str):
+        self._report["rejected"] += 1
+        if len(self._report["errors"]) < self.max_errors:
+            self._report["errors"].append((line, reason))
+        if self.on_reject is not None:
+            self.on_reject(line, reason)
+
+    #Yields (line, tuple of the mapped fields' values), with None for a field the row doesn't have
+    #A missing header column is an error for required fields and fields named in columns, and is left empty otherwise
+    def _csv_rows(self, f, mapping, columns):
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        positions = {name.strip(): i for i, name in enumerate(header)}
+
+        indexes = []
+        for field, column in mapping.items():
+            if column in positions:
+                indexes.append(positions[column])
+            elif field in REQUIRED or field in columns:
+                raise ValueError(f"Column '{column}' for {field} not found in the header of '{f.name}'")
+            else:
+                indexes.append(None)
+
+        #Fields missing from the header read an extra None appended to every row
+        width = len(header)
+        padding = [None] if None in indexes else []
+        get = operator.itemgetter(*(width if i is None else i for i in indexes))
+        for row in reader:
+            if not row:
+                continue
+            if len(row) < width:
+                row += [None] * (width - len(row))
+            yield reader.line_num, get(row + padding if padding else row)
+
+    def _jsonl_rows(self, f, mapping, columns):
+        keys = tuple(mapping.values())
+        for line, text in enumerate(f, 1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError as e:
+                self._report["rows"] += 1
+                self._reject(line, f"Invalid JSON: {e}")
+                continue
+            if not isinstance(row, dict):
+                self._report["rows"] += 1
+                self._reject(line, f"Expected a JSON object, got {type(row).__name__}")
+                continue
+            yield line, tuple(row.get(key) for key in keys)
+
+    #Builds an Item from a row's id, name and sell_value, raising ValueError for a row ItemDialog wouldn't accept
+    def _item(self, item_id, name, sell_value) -> Item:
+        name = _text(name)
+        if not name:
+            raise ValueError("Item has no name")
+        item_id = _text(item_id) or slugify(name)
+        sell_value = _whole(sell_value, "Sell value") if _text(sell_value) else 0
+        if sell_value < 0:
+            raise ValueError(f"Sell value must not be negative, got {sell_value}")
+        return Item(item_id, name, sell_value)
+
+    #_ingredients() already checks everything Recipe's constructor would, so the Recipe is built without checking again
+    def _recipe(self, inputs, outputs, type, time) -> Recipe:
+        ids = self._ids
+        return Recipe._from_checked(
+            _ingredients(inputs, "Inputs", ids),
+            _ingredients(outputs, "Outputs", ids),
+            _text(type) or "CRAFT",
+            _number(time, "Time") if _text(time) else 0,
+        )
+
+
+#A CSV cell or JSON value as stripped text, "" for missing values
+def _text(value) -> str:
+    return "" if value is None else str(value).strip()
+
+#12, "12", 12.0 or "12.0" -> 12, raising ValueError for fractions (2.7 or "2.5"), booleans and non-numbers
+def _whole(value, label:str) -> int:
+    if type(value) is int:
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+    number = _number(value, label) if not isinstance(value, bool) else None
+    if number is None or not number.is_integer():
+        raise ValueError(f"{label} must be a whole number, got '{value}'")
+    return int(number)
+
+def _number(value, label:str) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{label} must be a number, got '{value}'") from None
+
+#"iron_ore:4; Coal" or {"iron_ore": 4} -> {"iron_ore": 4, "coal": 1}, slugifying names that aren't existing item_ids
+#ids maps every existing item_id to the database's own string for it, which is what the result holds
+#Entries naming an existing item_id with a plain positive quantity, by far the most common, are handled inline
+def _ingredients(value, label:str, ids) -> dict:
+    ingredients = {}
+    if isinstance(value, str):
+        for text in value.split(";"):
+            item_id, colon, quantity = text.rpartition(":")
+            if colon:
+                known = ids.get(item_id.strip())
+                count = int(quantity) if quantity.isdecimal() else 0
+                if known is not None and count > 0:
+                    ingredients[known] = ingredients.get(known, 0) + count
+                    continue
+            else:
+                item_id, quantity = quantity, 1
+            entry = _ingredient(item_id, quantity, label, ids)
+            if entry is not None:
+                item_id, quantity = entry
+                ingredients[item_id] = ingredients.get(item_id, 0) + quantity
+    elif isinstance(value, dict):
+        for item_id, quantity in value.items():
+            entry = _ingredient(item_id, quantity, label, ids)
+            if entry is not None:
+                item_id, quantity = entry
+                ingredients[item_id] = ingredients.get(item_id, 0) + quantity
+    elif value is None:
+        raise ValueError(f"{label} are missing")
+    else:
+        raise TypeError(f"{label} must be text like 'iron_ore:4; coal' or an object of item_id: quantity")
+    return ingredients
+
+#One ingredient as (item_id, quantity), or None for an empty entry like the one after a trailing ";"
+def _ingredient(item_id, quantity, label:str, ids):
+    if item_id not in ids:
+        item_id = _text(item_id)
+        if item_id not in ids:
+            item_id = slugify(item_id)
+        if not item_id:
+            if quantity == 1:
+                return None
+            raise ValueError(f"{label} give a quantity without an item")
+    if type(quantity) is not int:
+        quantity = _whole(quantity, f"Quantity of '{item_id}'")
+    if quantity <= 0:
+        raise ValueError(f"Quantity for {item_id} must be positive, got {quantity}")
+    return ids.get(item_id, item_id), quantity
@@ -1,10 +1,30 @@
 from Item import Item
 from Recipe import Recipe
-import json
+import os
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from NameIndex import NameIndex
+
+# Modules only some methods need (NameIndex, hashlib, json, threading) are imported inside them, so scripts and the
+# command line tool that only load and query a database don't pay for importing them
+
+# save() ends every file with a sha256 checksum of all the bytes before it, in place of the top level object's closing "\n}"
+# StreamingLoader uses it to recognize files this app wrote, which can skip validation
+CHECKSUM_TRAILER = ',\n    "checksum": "{}"\n}}'
+CHECKSUM_TRAILER_LENGTH = len(CHECKSUM_TRAILER.format("0" * 64))
 
 # CraftingDatabase stores a name (meant to correlate to a specific game and therefore filename, but not enfored)
-# Also stores a Dictionary of item_id: Item(object) and a List of Recipes
+# Also stores a Dictionary of item_id: Item(object) and an insertion ordered Dictionary of Recipe: Recipe, used as an ordered set
+# that can also look up the stored instance of an equal Recipe
+# Keeps consumer/producer indexes of item_id: [Recipes] so item lookups don't scan every Recipe
+# Also keeps a NameIndex of Item names for filtering and completion, built on first use of name_index
 # CraftingDatabase is meant to handle all Item and Recipe interaction logic, including enforcing unique Items, Recipes, and calculations involving multiple Items or Recipes 
+# Listeners added with add_listener() are called as listener(event, *args) after every successful change, named after the method that made it:
+#   "add_item" (item), "edit_item" (item, old_name, old_sell_value), "remove_item" (item, removed_recipes),
+#   "add_recipe" (recipe), "remove_recipe" (recipe), "edit_recipe" (old_recipe, new_recipe)
+# The bulk_ methods tell listeners about a whole batch with one event, which listeners that don't know it treat as a reason to rebuild:
+#   "bulk_add_items" (items), "bulk_add_recipes" (recipes), "bulk_remove" (removed_items, removed_recipes)
 
 class CraftingDatabase:
     def __init__(self, items: dict[str, Item]=None, recipes:list[Recipe]=None, name="Unnamed Database"):
@@ -30,41 +50,118 @@ class CraftingDatabase:
 
 
         #Ensures passed recipes is not None, then a list
-        self.recipes = []
+        #Recipes are keyed by their hash, so duplicate Recipes in the list collapse into one
+        self.recipes = {}
         if recipes is not None:
             if not isinstance(recipes, list):
                 raise TypeError(f"recipes must be a list, got '{type(recipes)}'")
-            self.recipes = recipes.copy()
 
-        #Ensures each object in recipes is actually a Recipe
+            #Ensures each object in recipes is actually a Recipe
+            for r in recipes:
+                if not isinstance(r, Recipe):
+                    raise TypeError(f"recipes must contain Recipe objects, got '{type(r)}'")
+            for r in recipes:
+                self.recipes.setdefault(r, r)
+
+        #Builds the item_id: [Recipes] indexes used by recipes_that_consume() and recipes_that_produce()
+        self._consumers = {}
+        self._producers = {}
         for r in self.recipes:
-            if not isinstance(r, Recipe):
-                raise TypeError(f"recipes must contain Recipe objects, got '{type(r)}'")
-            
+            self._index_recipe(r)
+
+        #Caches calc_profit() results as Recipe: profit, only cleared for Recipes whose items change sell_value
+        #Hits and misses are counted so the cache's effectiveness can be checked
+        self._profit_cache = {}
+        self.profit_cache_hits = 0
+        self.profit_cache_misses = 0
+
+        #Trigram index of Item names, built the first time name_index is used so loading doesn't pay for it
+        self._name_index = None
+
+        #Callbacks told about every change, used by engines built on top of the database to keep their caches valid
+        self._listeners = []
+
+    #Registers a callback to be called as listener(event, *args) after every change
+    def add_listener(self, listener):
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    #Unregisters a callback added with add_listener(), if it was registered
+    def remove_listener(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    #Trigram index of every Item's name, see NameIndex
+    @property
+    def name_index(self) -> "NameIndex":
+        if self._name_index is None:
+            from NameIndex import NameIndex
+            self._name_index = NameIndex.build((item_id, item.name) for item_id, item in self.items.items())
+        return self._name_index
+
+    #Tells every listener about a change
+    def _notify(self, event:str, *args):
+        for listener in self._listeners:
+            listener(event, *args)
+
+    #Adds a recipe to the consumer and producer indexes of each of its inputs and outputs
+    def _index_recipe(self, recipe:Recipe):
+        for item_id in recipe.input_ids:
+            self._consumers.setdefault(item_id, []).append(recipe)
+        for item_id in recipe.output_ids:
+            self._producers.setdefault(item_id, []).append(recipe)
+
+    #Removes a stored recipe from the consumer and producer indexes, dropping entries that become empty
+    #Lists are used over sets since they take a fraction of the memory, and removing costs as much as the number of matches
+    def _unindex_recipe(self, recipe:Recipe):
+        for index, item_ids in ((self._consumers, recipe.input_ids), (self._producers, recipe.output_ids)):
+            for item_id in item_ids:
+                recipes = index.get(item_id)
+                if recipes is None:
+                    continue
+                recipes.remove(recipe)
+                if not recipes:
+                    del index[item_id]
+
+    #Removes many stored recipes from the consumer and producer indexes at once
+    #Each affected list is filtered once instead of having every recipe removed from it, which is quadratic for popular Items
+    def _unindex_recipes(self, recipes:set):
+        for index, attr in ((self._consumers, "input_ids"), (self._producers, "output_ids")):
+            affected = {item_id for r in recipes for item_id in getattr(r, attr)}
+            for item_id in affected:
+                kept = [r for r in index.get(item_id, ()) if r not in recipes]
+                if kept:
+                    index[item_id] = kept
+                else:
+                    index.pop(item_id, None)
+
     #Does not allow adding duplicate items
     #Returns a boolean success value and related message
     def add_item(self, item:Item):
         if item.id in self.items:
             return False, "Item already exists"
         self.items[item.id] = item
+        if self._name_index is not None:
+            self._name_index.add(item.id, item.name)
+        self._notify("add_item", item)
         return True, "Item successfully added"
 
-    #Does not allow adding duplicate recipes
+    #Does not allow adding duplicate recipes, checked with a single hash lookup
     #Returns a boolean success value and related message
     def add_recipe(self, recipe:Recipe):
-        for r in self.recipes:
-            if r == recipe:
-                return False, "Recipe already exists"
+        if recipe in self.recipes:
+            return False, "Recipe already exists"
        
-        for item_id in recipe.inputs.keys():
+        for item_id in recipe.input_ids:
             if item_id not in self.items:
                 return False, f"Unknown input item '{item_id}'. Add it before adding the recipe."
        
-        for item_id in recipe.outputs.keys():
+        for item_id in recipe.output_ids:
             if item_id not in self.items:
                 return False, f"Unknown output item '{item_id}'. Add it before adding the recipe."
 
-        self.recipes.append(recipe)
+        self._insert_recipe(recipe)
+        self._notify("add_recipe", recipe)
         return True, "Recipe successfully added"
     
     #Removes given Item from items, provided it exists
@@ -72,46 +169,205 @@ class CraftingDatabase:
         if item_id not in self.items:
             return False, f"'{item_id}' not found"
         
-        recipes_that_include = (self.recipes_that_consume(item_id) + self.recipes_that_produce(item_id))
+        #A Recipe that both consumes and produces the Item is only listed once
+        recipes_that_include = list(dict.fromkeys(self.recipes_that_consume(item_id) + self.recipes_that_produce(item_id)))
 
+        #Cascaded Recipes are reported to listeners as part of the single "remove_item" event
         if recipes_that_include:
             if cascade:
-                for r in recipes_that_include:
-                    self.remove_recipe(r)
-                del self.items[item_id]
+                self._discard_recipes(recipes_that_include)
+                item = self._pop_item(item_id)
+                self._notify("remove_item", item, recipes_that_include)
                 return True, "Item and all included Recipes removed"
             return False, "Item must not be in recipes, use cascade=true to force delete Item and included Recipes"
         
-        del self.items[item_id]
+        item = self._pop_item(item_id)
+        self._notify("remove_item", item, [])
         return True, "Item removed. No included Recipes found."
 
+    #Drops an Item from items and the name index
+    def _pop_item(self, item_id:str) -> Item:
+        if self._name_index is not None:
+            self._name_index.remove(item_id)
+        return self.items.pop(item_id)
+
     #Removes one instance of recipe from the database, provided it exists.
     def remove_recipe(self, recipe:Recipe):
         if recipe in self.recipes:
-            self.recipes.remove(recipe)
+            self._discard_recipe(recipe)
+            self._notify("remove_recipe", recipe)
             return True, "Recipe deleted"
         return False, "Recipe not found"
 
+    #Stores a recipe and indexes it without checks or telling listeners, used by add_recipe(), edit_recipe() and loaders
+    def _insert_recipe(self, recipe:Recipe):
+        self.recipes[recipe] = recipe
+        self._index_recipe(recipe)
+
+    #Drops a stored recipe from the store, the indexes and the profit cache without telling listeners
+    #recipe may be any Recipe equal to the stored one
+    def _discard_recipe(self, recipe:Recipe):
+        stored = self.recipes.pop(recipe)
+        self._unindex_recipe(stored)
+        self._profit_cache.pop(stored, None)
+
+    #Drops many stored recipes at once, filtering the indexes once at the end
+    def _discard_recipes(self, recipes):
+        stored = {self.recipes.pop(r) for r in recipes}
+        self._unindex_recipes(stored)
+        for r in stored:
+            self._profit_cache.pop(r, None)
+
+    #Adds every Item in items, or none of them if any is invalid
+    #Returns (success, results) where results holds a (bool, message) per entry of items, in the same order
+    #On failure the entries that could have been added are still reported as True, so only the ones at fault are False
+    def bulk_add_items(self, items:list[Item]):
+        items = list(items)
+        results = []
+        valid = (True, "Item can be added")
+        seen = set()
+        for item in items:
+            if not isinstance(item, Item):
+                results.append((False, f"Expected an Item, got '{type(item)}'"))
+                continue
+            if item.id in self.items:
+                results.append((False, "Item already exists"))
+            elif item.id in seen:
+                results.append((False, f"'{item.id}' is listed more than once"))
+            else:
+                results.append(valid)
+            seen.add(item.id)
+        if any(result is not valid for result in results):
+            return False, results
+
+        for item in items:
+            self.items[item.id] = item
+
+        #The name index is rebuilt once on next use instead of inserting into it per Item
+        if items:
+            self._name_index = None
+        self._notify("bulk_add_items", items)
+        return True, [(True, "Item successfully added")] * len(items)
+
+    #Adds every Recipe in recipes, or none of them if any is invalid, checking every entry in one pass
+    #Returns (success, results) like bulk_add_items()
+    def bulk_add_recipes(self, recipes:list[Recipe]):
+        recipes = list(recipes)
+        known = self.items.__contains__
+        results = []
+        valid = (True, "Recipe can be added")
+        seen = set()
+        for recipe in recipes:
+            if not isinstance(recipe, Recipe):
+                results.append((False, f"Expected a Recipe, got '{type(recipe)}'"))
+                continue
+            if recipe in self.recipes:
+                results.append((False, "Recipe already exists"))
+            elif recipe in seen:
+                results.append((False, "Recipe is listed more than once"))
+            elif all(map(known, recipe.item_ids)):
+                results.append(valid)
+            elif not all(map(known, recipe.input_ids)):
+                unknown = min(item_id for item_id in recipe.input_ids if not known(item_id))
+                results.append((False, f"Unknown input item '{unknown}'. Add it before adding the recipe."))
+            else:
+                unknown = min(item_id for item_id in recipe.output_ids if not known(item_id))
+                results.append((False, f"Unknown output item '{unknown}'. Add it before adding the recipe."))
+            seen.add(recipe)
+        if any(result is not valid for result in results):
+            return False, results
+
+        #Appended to the indexes in one pass, the same way the constructor builds them
+        store = self.recipes
+        consumers = self._consumers
+        producers = self._producers
+        for recipe in recipes:
+            store[recipe] = recipe
+            for item_id in recipe.input_ids:
+                consumers.setdefault(item_id, []).append(recipe)
+            for item_id in recipe.output_ids:
+                producers.setdefault(item_id, []).append(recipe)
+        self._notify("bulk_add_recipes", recipes)
+        return True, [(True, "Recipe successfully added")] * len(recipes)
+
+    #Removes every Item in item_ids and every Recipe in recipes, or nothing if any entry is invalid
+    #Items still used by Recipes that aren't being removed need cascade=True, which also removes those Recipes
+    #Returns (success, results) with a (bool, message) per entry of item_ids, followed by one per entry of recipes
+    def bulk_remove(self, item_ids=(), recipes=(), cascade=False):
+        item_ids = list(item_ids)
+        recipes = list(recipes)
+        results = []
+
+        seen_recipes = set()
+        for recipe in recipes:
+            if recipe not in self.recipes:
+                results.append((False, "Recipe not found"))
+            elif recipe in seen_recipes:
+                results.append((False, "Recipe is listed more than once"))
+            else:
+                results.append((True, "Recipe can be removed"))
+            seen_recipes.add(recipe)
+
+        item_results = []
+        seen_items = set()
+        cascaded = []
+        for item_id in item_ids:
+            if item_id not in self.items:
+                item_results.append((False, f"'{item_id}' not found"))
+            elif item_id in seen_items:
+                item_results.append((False, f"'{item_id}' is listed more than once"))
+            else:
+                included = [r for r in self.recipes_that_consume(item_id) + self.recipes_that_produce(item_id) if r not in seen_recipes]
+                if included and not cascade:
+                    item_results.append((False, "Item must not be in recipes, use cascade=true to force delete Item and included Recipes"))
+                else:
+                    item_results.append((True, "Item can be removed"))
+                    cascaded.extend(included)
+            seen_items.add(item_id)
+        results = item_results + results
+        if not all(success for success, _msg in results):
+            return False, results
+
+        #Stored instances, each listed once, in the order they were found
+        removed_recipes = list(dict.fromkeys(self.recipes[r] for r in recipes + cascaded))
+        self._discard_recipes(removed_recipes)
+        removed_items = [self.items.pop(item_id) for item_id in item_ids]
+        if removed_items:
+            self._name_index = None
+
+        self._notify("bulk_remove", removed_items, removed_recipes)
+        return True, [(True, "Item removed")] * len(item_ids) + [(True, "Recipe deleted")] * len(recipes)
+
     #Updates an Item's name and/or sell_value, provided the item_id exists
     #Item id CANNOT be changed, only removed
+    #A sell_value change only clears the cached profits of Recipes that consume or produce the Item
     def edit_item(self, item_id: str, new_name=None, new_sell_value=None):
         if item_id not in self.items:
             return False, "Item not found"
         
         item = self.items[item_id]
+        old_name, old_sell_value = item.name, item.sell_value
         if new_name is not None:
             item.name = new_name
-        if new_sell_value is not None:
+            if self._name_index is not None and new_name != old_name:
+                self._name_index.add(item_id, new_name)
+        if new_sell_value is not None and new_sell_value != item.sell_value:
             item.sell_value = new_sell_value
+            self._invalidate_profits(item_id)
         
+        self._notify("edit_item", item, old_name, old_sell_value)
         return True, "Item updated"
 
     #Updates a Recipe by removing and readding it, provided it exists
+    #Does not allow editing a Recipe into a duplicate of another existing Recipe
     def edit_recipe(self, old_recipe: Recipe, new_recipe: Recipe):
         if old_recipe not in self.recipes:
             return False, "Recipe not found"
-        self.recipes.remove(old_recipe)
-        self.recipes.append(new_recipe)
+        if new_recipe != old_recipe and new_recipe in self.recipes:
+            return False, "Recipe already exists"
+        self._discard_recipe(old_recipe)
+        self._insert_recipe(new_recipe)
+        self._notify("edit_recipe", old_recipe, new_recipe)
         return True, "Recipe updated"
 
     #Returns an item's sell_value, provided it's in the database
@@ -122,41 +378,50 @@ class CraftingDatabase:
 
     #Returns the "profit" from selling a recipe's outputs vs it's inputs. 
     #Positive values means the output is worth more to sell 
+    #Results are cached until a sell_value used by the Recipe changes through edit_item()
     def calc_profit(self, recipe:Recipe) -> tuple [bool, int]:
 
         if recipe not in self.recipes:
             return False, -1
 
+        profit = self._profit_cache.get(recipe)
+        if profit is not None:
+            self.profit_cache_hits += 1
+            return True, profit
+        self.profit_cache_misses += 1
+
         input_cost = 0
         output_cost = 0
 
 
-        for i, q in recipe.inputs.items():
+        for i, q in recipe.input_items():
             input_cost += self.items[i].sell_value * q
         
-        for i, q in recipe.outputs.items():
+        for i, q in recipe.output_items():
             output_cost += self.items[i].sell_value * q
         
-        return True, (output_cost - input_cost)
+        profit = output_cost - input_cost
+        self._profit_cache[recipe] = profit
+        return True, profit
+
+    #Clears the cached profit of every Recipe that consumes or produces item_id
+    def _invalidate_profits(self, item_id:str):
+        for index in (self._consumers, self._producers):
+            for r in index.get(item_id, ()):
+                self._profit_cache.pop(r, None)
 
     #Returns recipes which have item_id in their inputs
+    #Looked up in the consumer index, so this only costs as much as the number of matches
     def recipes_that_consume(self, item_id:str):
-        output = []
-        for r in self.recipes:
-            if item_id in r.inputs:
-                output.append(r)
-        return output
+        return list(self._consumers.get(item_id, ()))
 
-    #Returns recipes which have item_id in their inputs
+    #Returns recipes which have item_id in their outputs
+    #Looked up in the producer index, so this only costs as much as the number of matches
     def recipes_that_produce(self, item_id:str):
-        output = []
-        for r in self.recipes:
-            if item_id in r.outputs:
-                output.append(r)
-        return output
+        return list(self._producers.get(item_id, ()))
 
     #Must convert self.items from a dictionary of item_id: Item(object) to item_id: Item(dictionary) using item.to_dict()
-    #Must convert self.recipes from a list of Recipe(object) to a list of Recipe(dictionary) using recipe.to_dict()
+    #Must convert self.recipes from an ordered set of Recipe(object) to a list of Recipe(dictionary) using recipe.to_dict()
     #Finally creates a dictionary of "name": name, "items": dictionary(item_id:Item(dictionary)), "recipes": list(Recipe(dictionary))
     def to_dict(self):
         
@@ -175,13 +440,59 @@ class CraftingDatabase:
         }
 
     #Saves the database to a JSON file in self.to_dict() form
-    def save(self, filename=None):
+    #The JSON is written in chunks, hashing everything before the closing "\n}", which is then replaced by CHECKSUM_TRAILER
+    #It is written to a temporary file first and moved over the old file once complete, so a crash mid-save leaves the old file intact
+    #progress is called as progress(recipes_written, total_recipes) while writing, and may raise to cancel the save
+    #The temporary file is named per thread, so saves running in different threads don't write over each other
+    def save(self, filename=None, progress=None):
+        import hashlib
+        import json
+        import threading
+
         if filename is None:
             filename = f"{self.name}.json"
-        with open(filename,"w", encoding="utf-8") as f:
-            json.dump(self.to_dict(), f, indent=4)
+        temp_filename = f"{filename}.{threading.get_ident()}.tmp"
+
+        data = self.to_dict()
+        if progress is not None:
+            data["recipes"] = _ReportingList(data["recipes"], progress)
+
+        digest = hashlib.sha256()
+        try:
+            with open(temp_filename, "wb") as f:
+                pending = ""
+                for chunk in json.JSONEncoder(indent=4).iterencode(data):
+                    pending += chunk
+                    if len(pending) >= 65536:
+                        encoded = pending[:-2].encode("utf-8")
+                        digest.update(encoded)
+                        f.write(encoded)
+                        pending = pending[-2:]
+                encoded = pending[:-2].encode("utf-8")
+                digest.update(encoded)
+                f.write(encoded)
+                f.write(CHECKSUM_TRAILER.format(digest.hexdigest()).encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_filename, filename)
+        except BaseException:
+            if os.path.exists(temp_filename):
+                os.remove(temp_filename)
+            raise
+
+    #Returns a copy of the database that later edits don't affect, so it can be saved from another thread while editing goes on
+    #Recipes can't change after being created, so they are shared. Items, the store and the indexes are copied
+    #Listeners and cached profits are not copied
+    def snapshot(self):
+        copy = type(self)(name=self.name)
+        copy.items = {item_id: Item(item.id, item.name, item.sell_value) for item_id, item in self.items.items()}
+        copy.recipes = self.recipes.copy()
+        copy._consumers = {item_id: recipes.copy() for item_id, recipes in self._consumers.items()}
+        copy._producers = {item_id: recipes.copy() for item_id, recipes in self._producers.items()}
+        return copy
 
     #Unwraps the nested dictionary and list mess back into objects, using Item's and Recipe's from_dict() methods
+    #The constructor builds the consumer/producer indexes in the same pass
     @classmethod
     def from_dict(cls, data):
         
@@ -197,11 +508,40 @@ class CraftingDatabase:
         
         return cls(items=items, recipes=recipes, name=name)
     
-    #Loads the JSON file's dictionary into a CraftingDatabase object using from_dict()
+    #Loads the JSON file into a CraftingDatabase object, parsing it entry by entry with StreamingLoader
+    #trusted=True skips validating Items and Recipes when the file's checksum shows this app wrote it
+    #progress is called as progress(bytes_read, total_bytes) while reading
     @classmethod
-    def load(cls, filename):
-        with open(filename, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return cls.from_dict(data)
+    def load(cls, filename, trusted=False, progress=None):
+
+        #Imported here since StreamingLoader imports CraftingDatabase
+        from StreamingLoader import StreamingLoader
+        return StreamingLoader(filename, trusted=trusted, progress=progress).load(cls)
+
+    #Adds the Items or Recipes in a CSV or JSON lines file a batch at a time, see BulkImporter for columns and options
+    #Returns {"rows", "added", "rejected", "errors": [(line, reason)]}
+    def import_items(self, filename, columns=None, format=None, **options):
+
+        #Imported here since BulkImporter imports CraftingDatabase
+        from BulkImporter import BulkImporter
+        return BulkImporter(self, **options).import_items(filename, columns=columns, format=format)
+
+    def import_recipes(self, filename, columns=None, format=None, **options):
+        from BulkImporter import BulkImporter
+        return BulkImporter(self, **options).import_recipes(filename, columns=columns, format=format)
+
 
+#List that calls progress(done, total) every 1000 entries as it is iterated, used by save() to report how far the
+#JSON encoder has got through the Recipes
+class _ReportingList(list):
+    def __init__(self, values, progress):
+        super().__init__(values)
+        self.progress = progress
 
+    def __iter__(self):
+        total = len(self)
+        for i, value in enumerate(super().__iter__()):
+            if i % 1000 == 0:
+                self.progress(i, total)
+            yield value
+        self.progress(total, total)
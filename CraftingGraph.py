@@ -0,0 +1,283 @@
+from CraftingDatabase import CraftingDatabase
+
+# CraftingGraph is the Item graph behind a CraftingDatabase: an edge input -> output for every Recipe input and output,
+# counted once per Recipe so several Recipes can share an edge
+# Loops like ore -> ingot -> recycled ore form strongly connected components (SCCs), found with an iterative Tarjan's
+# algorithm so deep graphs don't hit Python's recursion limit. Collapsing every SCC into one node gives the condensed graph,
+# which has no cycles, and order() lists its components topologically (inputs before what they are used to make)
+#
+# The components and order are kept up to date by the database's listener instead of being recomputed:
+#   A new edge that agrees with the order changes nothing. One that doesn't only reorders the components between its two ends
+#   (Pearce and Kelly's algorithm), merging those that now form a cycle into one component
+#   Removing the last edge between two Items can only split the component they share, so Tarjan's algorithm is only rerun on it
+
+class CraftingGraph:
+    def __init__(self, db:CraftingDatabase):
+        self.db = db
+        self._rebuild()
+        self.db.add_listener(self.on_change)
+
+    #Stops listening to the database, for when the graph is no longer needed
+    def close(self):
+        self.db.remove_listener(self.on_change)
+
+    #Database listener, updates the edges, components and order for the Recipes that changed
+    def on_change(self, event:str, *args):
+        if event == "add_item":
+            self._add_node(args[0].id)
+        elif event == "add_recipe":
+            self._add_recipe(args[0])
+        elif event == "remove_recipe":
+            self._remove_recipe(args[0])
+        elif event == "edit_recipe":
+            self._remove_recipe(args[0])
+            self._add_recipe(args[1])
+        elif event == "remove_item":
+            item, removed_recipes = args
+            for recipe in removed_recipes:
+                self._remove_recipe(recipe)
+            self._remove_node(item.id)
+        elif event != "edit_item":
+            self._rebuild()
+
+    #Component id of an Item
+    def component_of(self, item_id:str) -> int:
+        return self._comp[item_id]
+
+    #Items in a component
+    def members(self, comp:int) -> set:
+        return set(self._members[comp])
+
+    #Component ids in topological order
+    def order(self) -> list[int]:
+        return list(self._order)
+
+    #Position of an Item's component in order(), so analyses can compare Items without copying the order
+    def position(self, item_id:str) -> int:
+        return self._pos[self._comp[item_id]]
+
+    #Every Item in topological order, Items of the same component next to each other
+    def item_order(self) -> list[str]:
+        return [item_id for comp in self._order for item_id in self._members[comp]]
+
+    #Components made directly from a component, the edges of the condensed graph
+    def successors(self, comp:int) -> set:
+        found = set()
+        for item_id in self._members[comp]:
+            for other_id in self._out.get(item_id, ()):
+                if self._comp[other_id] != comp:
+                    found.add(self._comp[other_id])
+        return found
+
+    #The condensed graph as {component: set of successor components}
+    def condensed(self) -> dict[int, set]:
+        return {comp: self.successors(comp) for comp in self._order}
+
+    #True if the component's Items can be made from each other: several Items, or one Item a Recipe makes from itself
+    def is_cycle(self, comp:int) -> bool:
+        members = self._members[comp]
+        if len(members) > 1:
+            return True
+        item_id = next(iter(members))
+        return item_id in self._out.get(item_id, ())
+
+    #Item sets of every component that is a cycle
+    def cycles(self) -> list[set]:
+        return [set(self._members[comp]) for comp in self._order if self.is_cycle(comp)]
+
+    def has_cycle(self) -> bool:
+        return any(self.is_cycle(comp) for comp in self._order)
+
+    #Builds the edges from every Recipe and the components and order with one pass of Tarjan's algorithm
+    def _rebuild(self):
+        #item_id: {item_id: number of Recipes with that edge}, both ways
+        self._out = {}
+        self._in = {}
+        for recipe in self.db.recipes:
+            for input_id in recipe.input_ids:
+                for output_id in recipe.output_ids:
+                    self._count_edge(input_id, output_id)
+
+        #item_id: component, component: set of item_ids, components in topological order and their positions in it
+        self._comp = {}
+        self._members = {}
+        self._order = []
+        self._pos = {}
+        self._next_comp = 0
+
+        # Tarjan finds components sinks first, so the topological order is the reverse
+        # Starting from the last Item keeps unrelated Items in the order they were added, which is also the order new
+        # Items take, so Recipes added along that order (like loading a file) never have to reorder anything
+        for members in reversed(self._tarjan(list(reversed(self.db.items)))):
+            self._order.append(self._new_comp(members))
+        self._reindex(0)
+
+    #Counts an edge for one more Recipe, returning True if no other Recipe has it
+    def _count_edge(self, input_id:str, output_id:str) -> bool:
+        count = self._out.setdefault(input_id, {}).get(output_id, 0) + 1
+        self._out[input_id][output_id] = count
+        self._in.setdefault(output_id, {})[input_id] = count
+        return count == 1
+
+    #Uncounts an edge, returning True once no Recipe has it anymore
+    def _uncount_edge(self, input_id:str, output_id:str) -> bool:
+        count = self._out[input_id][output_id] - 1
+        if count:
+            self._out[input_id][output_id] = count
+            self._in[output_id][input_id] = count
+            return False
+        del self._out[input_id][output_id]
+        del self._in[output_id][input_id]
+        return True
+
+    #Edges are counted and placed one at a time, so the order is always valid for every edge counted so far
+    def _add_recipe(self, recipe):
+        for input_id in recipe.input_ids:
+            for output_id in recipe.output_ids:
+                if self._count_edge(input_id, output_id):
+                    self._add_edge(input_id, output_id)
+
+    def _remove_recipe(self, recipe):
+        for input_id in recipe.input_ids:
+            for output_id in recipe.output_ids:
+                if self._uncount_edge(input_id, output_id) and input_id != output_id:
+                    if self._comp[input_id] == self._comp[output_id]:
+                        self._split(self._comp[input_id])
+
+    #Keeps the order valid for a new edge u -> v, reordering or merging the components between them if needed
+    def _add_edge(self, u:str, v:str):
+        cu, cv = self._comp[u], self._comp[v]
+        if cu == cv or self._pos[cu] < self._pos[cv]:
+            return
+        lo, hi = self._pos[cv], self._pos[cu]
+
+        # Components reachable from v without going past u in the order, and those reaching u without going before v
+        forward = self._reach(cv, self._out, lambda comp: self._pos[comp] <= hi)
+        backward = self._reach(cu, self._in, lambda comp: self._pos[comp] >= lo)
+        slots = sorted(self._pos[comp] for comp in forward | backward)
+
+        # Reachers move into the first of the slots they all held in the order and reachables into the last,
+        # so reachers only move earlier and reachables only move later
+        merged = forward & backward
+        before = sorted(backward - merged, key=self._pos.__getitem__)
+        after = sorted(forward - merged, key=self._pos.__getitem__)
+        for slot, comp in zip(slots, before):
+            self._order[slot] = comp
+        for slot, comp in zip(slots[len(slots) - len(after):], after):
+            self._order[slot] = comp
+
+        # Components in both now form a cycle with the new edge and become one component, in the slot after the reachers
+        # No other component between them has an edge to or from them, so the slots left over can simply be dropped
+        if merged:
+            members = set()
+            for comp in merged:
+                members |= self._members.pop(comp)
+                del self._pos[comp]
+            self._order[slots[len(before)]] = self._new_comp(members)
+            unused = set(slots[len(before) + 1:len(slots) - len(after)])
+            self._order = [comp for i, comp in enumerate(self._order) if i not in unused]
+        self._reindex(slots[0])
+
+    #Components reachable from start through edges (self._out or self._in) whose component passes allowed
+    def _reach(self, start:int, edges:dict, allowed) -> set:
+        found = {start}
+        stack = [start]
+        while stack:
+            for item_id in self._members[stack.pop()]:
+                for other_id in edges.get(item_id, ()):
+                    comp = self._comp[other_id]
+                    if comp not in found and allowed(comp):
+                        found.add(comp)
+                        stack.append(comp)
+        return found
+
+    #Reruns Tarjan's algorithm on a component that lost an edge, replacing it by the components it splits into
+    def _split(self, comp:int):
+        members = self._members[comp]
+        parts = self._tarjan(members, within=members)
+        if len(parts) == 1:
+            return
+        del self._members[comp]
+        slot = self._pos.pop(comp)
+        self._order[slot:slot + 1] = [self._new_comp(part) for part in reversed(parts)]
+        self._reindex(slot)
+
+    def _add_node(self, item_id:str):
+        comp = self._new_comp({item_id})
+        self._pos[comp] = len(self._order)
+        self._order.append(comp)
+
+    #Drops an Item whose Recipes are already removed, so it is a component of its own
+    def _remove_node(self, item_id:str):
+        comp = self._comp.pop(item_id)
+        self._out.pop(item_id, None)
+        self._in.pop(item_id, None)
+        del self._members[comp]
+        slot = self._pos.pop(comp)
+        del self._order[slot]
+        self._reindex(slot)
+
+    def _new_comp(self, members:set) -> int:
+        comp = self._next_comp
+        self._next_comp += 1
+        self._members[comp] = members
+        for item_id in members:
+            self._comp[item_id] = comp
+        return comp
+
+    #Updates the positions of the components from slot onwards
+    def _reindex(self, slot:int):
+        for i in range(slot, len(self._order)):
+            self._pos[self._order[i]] = i
+
+    #Iterative Tarjan's algorithm over nodes, only following edges into within when given
+    #Returns the components as sets of item_ids, each listed after every component it leads to
+    def _tarjan(self, nodes, within=None) -> list[set]:
+        index = {}
+        low = {}
+        stack = []
+        on_stack = set()
+        found = []
+
+        def successors(item_id):
+            targets = self._out.get(item_id, ())
+            return iter([t for t in targets if t in within] if within is not None else list(targets))
+
+        for root in nodes:
+            if root in index:
+                continue
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, successors(root))]
+
+            while work:
+                node, remaining = work[-1]
+                descended = False
+                for other_id in remaining:
+                    if other_id not in index:
+                        index[other_id] = low[other_id] = len(index)
+                        stack.append(other_id)
+                        on_stack.add(other_id)
+                        work.append((other_id, successors(other_id)))
+                        descended = True
+                        break
+                    if other_id in on_stack:
+                        low[node] = min(low[node], index[other_id])
+                if descended:
+                    continue
+
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    members = set()
+                    while True:
+                        item_id = stack.pop()
+                        on_stack.discard(item_id)
+                        members.add(item_id)
+                        if item_id == node:
+                            break
+                    found.append(members)
+        return found
@@ -0,0 +1,78 @@
+from Item import Item
+from Recipe import Recipe
+from CraftingDatabase import CraftingDatabase
+import itertools
+import random
+
+# generate() builds a synthetic CraftingDatabase shaped like a real game's crafting tree, for benchmarks and stress testing
+# The same arguments always build the same database, every random choice comes from one random.Random(seed)
+#
+# Items are split into depth tiers. Tier 0 holds raw Items no Recipe makes, and sell values grow with the tier
+# Every other Item is the main output of at least one Recipe, extra Recipes become alternative ways to make an Item
+# A Recipe for a tier t Item takes its inputs from lower tiers, mostly t - 1, and may make byproducts of tier t or lower
+# Within a tier, low numbered Items are picked far more often (Zipf's law with exponent hub_skew), like iron plates in
+# most factory games, so some Items end up used by thousands of Recipes and most by a handful
+# fan_in and fan_out are the weights of 1, 2, 3... inputs and outputs per Recipe
+# A cycle_ratio share of Recipes also take an input from their own tier or above, closing loops like ore -> ingot -> scrap -> ore
+
+RECIPE_TYPES = ("CRAFT", "SMELT", "ASSEMBLE", "REFINE")
+
+def generate(items=1000, recipes=2000, depth=6, fan_in=(35, 30, 20, 10, 5), fan_out=(85, 12, 3), cycle_ratio=0.02,
+             hub_skew=1.0, seed=0, name=None) -> CraftingDatabase:
+    if depth < 2:
+        raise ValueError(f"depth must be at least 2, got {depth}")
+    if items < depth:
+        raise ValueError(f"items must be at least depth ({depth}), got {items}")
+    if not 0 <= cycle_ratio <= 1:
+        raise ValueError(f"cycle_ratio must be between 0 and 1, got {cycle_ratio}")
+
+    rng = random.Random(seed)
+
+    #Item ids by tier, and cumulative Zipf weights for picking within each tier
+    tiers = [[] for _ in range(depth)]
+    generated_items = {}
+    for i in range(items):
+        tier = i * depth // items
+        item_id = f"t{tier}_item_{len(tiers[tier])}"
+        tiers[tier].append(item_id)
+        sell_value = max(1, round(rng.uniform(1, 20) * 1.6 ** tier))
+        generated_items[item_id] = Item(item_id, f"Tier {tier} Item {len(tiers[tier])}", sell_value)
+    weights = [list(itertools.accumulate(1 / (rank + 1) ** hub_skew for rank in range(len(tier)))) for tier in tiers]
+
+    def pick(tier):
+        return rng.choices(tiers[tier], cum_weights=weights[tier])[0]
+
+    def count(distribution):
+        return rng.choices(range(1, len(distribution) + 1), weights=distribution)[0]
+
+    #Main outputs go round every crafted Item in turn, so each has a Recipe before any gets a second one
+    crafted = [(tier, item_id) for tier in range(1, depth) for item_id in tiers[tier]]
+
+    generated_recipes = {}
+    attempts = 0
+    while len(generated_recipes) < recipes and attempts < recipes * 20:
+        tier, output_id = crafted[attempts % len(crafted)]
+        attempts += 1
+
+        inputs = {}
+        for _ in range(count(fan_in)):
+            input_tier = tier - 1 if rng.random() < 0.6 else rng.randrange(tier)
+            input_id = pick(input_tier)
+            inputs[input_id] = inputs.get(input_id, 0) + rng.randint(1, 4)
+        if rng.random() < cycle_ratio:
+            input_id = pick(rng.randrange(tier, depth))
+            inputs[input_id] = inputs.get(input_id, 0) + 1
+
+        outputs = {output_id: rng.randint(1, 2)}
+        for _ in range(count(fan_out) - 1):
+            byproduct_id = pick(rng.randrange(1, tier + 1))
+            if byproduct_id not in inputs:
+                outputs.setdefault(byproduct_id, 1)
+
+        time = round(rng.uniform(0.5, 5) * tier, 1)
+        recipe = Recipe(inputs, outputs, type=rng.choice(RECIPE_TYPES), time=time)
+        generated_recipes.setdefault(recipe, recipe)
+
+    if name is None:
+        name = f"generated_{items}_{recipes}_{seed}"
+    return CraftingDatabase(items=generated_items, recipes=list(generated_recipes), name=name)
@@ -1,11 +1,15 @@
+import sys
+
 #Items hold an id, name, and a sell_value
 #The only logic they hold is how to go from Object -> dictionary -> Object
+#Items use __slots__ and interned ids to stay small, since Recipes share the same id strings
 
 
 class Item:
+    __slots__ = ("id", "name", "sell_value")
 
     def __init__(self, id, name, sell_value=0):
-        self.id = id
+        self.id = sys.intern(id) if isinstance(id, str) else id
         self.name = name
         self.sell_value = sell_value
     
@@ -32,4 +36,9 @@ class Item:
                 data["name"],
                 data["sell_value"]
         )
+
+
+#Iron Ore -> iron_ore, the id suggested for a new Item's name
+def slugify(text: str) -> str:
+    return text.lower().replace(" ", "_")
     
\ No newline at end of file
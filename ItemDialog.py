@@ -1,9 +1,5 @@
-import sys
-from Item import Item
-from Recipe import Recipe
-from CraftingDatabase import CraftingDatabase
-from PySide6.QtWidgets import QSpinBox, QLineEdit, QDialog, QMessageBox, QInputDialog, QApplication, QMainWindow, QWidget, QPushButton, QVBoxLayout, QLabel, QTabWidget, QListWidget, QHBoxLayout
-from PySide6.QtCore import Qt
+from Item import slugify
+from PySide6.QtWidgets import QSpinBox, QLineEdit, QDialog, QPushButton, QVBoxLayout, QLabel, QHBoxLayout
 
 class ItemDialog(QDialog):
     def __init__(self, parent=None, title="Add Item", default_name="", default_id="", default_value=0, editing=False):
@@ -72,8 +68,3 @@ class ItemDialog(QDialog):
 
         # Return all 3 fields
         return self.name_input.text(), self.id_input.text(), self.value_input.value()
-
-def slugify(text: str) ->str:
-
-    # Iron Ore -> iron_ore
-    return text.lower().replace(" ", "_")
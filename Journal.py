@@ -0,0 +1,166 @@
+from Item import Item
+from Recipe import Recipe
+from CraftingDatabase import CraftingDatabase, CHECKSUM_TRAILER, CHECKSUM_TRAILER_LENGTH
+import json
+import os
+
+# Journal keeps a CraftingDatabase saved as a snapshot file plus an append-only journal of the changes made since
+# Every add/edit/remove is recorded as one compact JSON line, and save() only appends the lines recorded since the last save
+# Once the journal holds compact_every records, save() folds it into a new snapshot (compaction)
+# Loading reads the snapshot, then replays the journal on top of it
+#
+# The journal's first line names the checksum of the snapshot it applies to. Compaction replaces the snapshot first and the
+# journal second, both atomically, so a crash in between leaves a journal that no longer matches and is skipped, not replayed twice
+# A crash while appending can only cut off the last line, which is ignored when replaying
+
+class Journal:
+    def __init__(self, db:CraftingDatabase, filename:str, compact_every=10000):
+        self.db = db
+        self.filename = filename
+        self.journal_filename = f"{filename}.journal"
+        self.compact_every = compact_every
+
+        #Records not yet appended to the journal file, and how many records the file already holds
+        self._pending = []
+        self._records = 0
+
+        self._replaying = False
+        self.db.add_listener(self.on_change)
+
+        #A database without a snapshot yet starts with one
+        if not os.path.exists(self.journal_filename):
+            self.compact()
+
+    #Loads the snapshot and replays its journal, returning a Journal that keeps recording the loaded database
+    @classmethod
+    def open(cls, filename:str, compact_every=10000):
+        if os.path.exists(filename):
+            db = CraftingDatabase.load(filename, trusted=True)
+        else:
+            db = CraftingDatabase(name=os.path.splitext(os.path.basename(filename))[0])
+
+        journal = cls(db, filename, compact_every)
+        if not journal._replay():
+            journal.compact()
+        return journal
+
+    #Stops recording, after saving anything still pending
+    def close(self):
+        self.save()
+        self.db.remove_listener(self.on_change)
+
+    #Database listener, turns every change into a journal record
+    def on_change(self, event:str, *args):
+        if self._replaying:
+            return
+        if event == "add_item":
+            item = args[0]
+            record = [event, item.id, item.name, item.sell_value]
+        elif event == "edit_item":
+            item = args[0]
+            record = [event, item.id, item.name, item.sell_value]
+        elif event == "remove_item":
+            record = [event, args[0].id]
+        elif event in ("add_recipe", "remove_recipe"):
+            record = [event, args[0].to_dict()]
+        elif event == "edit_recipe":
+            record = [event, args[0].to_dict(), args[1].to_dict()]
+        elif event == "bulk_add_items":
+            record = [event, [[item.id, item.name, item.sell_value] for item in args[0]]]
+        elif event == "bulk_add_recipes":
+            record = [event, [recipe.to_dict() for recipe in args[0]]]
+        elif event == "bulk_remove":
+            removed_items, removed_recipes = args
+            record = [event, [item.id for item in removed_items], [recipe.to_dict() for recipe in removed_recipes]]
+        else:
+            return
+        self._pending.append(record)
+
+    #Appends the pending records to the journal and flushes them to disk
+    #Compacts instead once the journal is long enough
+    def save(self):
+        if not self._pending:
+            return
+        if self._records + len(self._pending) >= self.compact_every:
+            self.compact()
+            return
+
+        lines = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in self._pending)
+        with open(self.journal_filename, "a", encoding="utf-8") as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        self._records += len(self._pending)
+        self._pending.clear()
+
+    #Saves a full snapshot and starts an empty journal for it
+    def compact(self):
+        self.db.save(self.filename)
+
+        temp_filename = f"{self.journal_filename}.tmp"
+        with open(temp_filename, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"snapshot": self._snapshot_checksum()}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_filename, self.journal_filename)
+
+        self._records = 0
+        self._pending.clear()
+
+    #Replays the journal onto the loaded snapshot
+    #Returns False if the journal doesn't belong to the snapshot or ended in a cut off line, so it should be compacted away
+    def _replay(self) -> bool:
+        with open(self.journal_filename, "r", encoding="utf-8") as f:
+            try:
+                header = json.loads(f.readline())
+            except json.JSONDecodeError:
+                return False
+            if header.get("snapshot") != self._snapshot_checksum():
+                return False
+
+            self._replaying = True
+            try:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        return False
+                    self._apply(record)
+                    self._records += 1
+            finally:
+                self._replaying = False
+        return True
+
+    #Applies one journal record to the database
+    def _apply(self, record:list):
+        event = record[0]
+        if event == "add_item":
+            self.db.add_item(Item(record[1], record[2], record[3]))
+        elif event == "edit_item":
+            self.db.edit_item(record[1], new_name=record[2], new_sell_value=record[3])
+        elif event == "remove_item":
+            self.db.remove_item(record[1], cascade=True)
+        elif event == "add_recipe":
+            self.db.add_recipe(Recipe.from_dict(record[1]))
+        elif event == "remove_recipe":
+            self.db.remove_recipe(Recipe.from_dict(record[1]))
+        elif event == "edit_recipe":
+            self.db.edit_recipe(Recipe.from_dict(record[1]), Recipe.from_dict(record[2]))
+        elif event == "bulk_add_items":
+            self.db.bulk_add_items([Item(item_id, name, sell_value) for item_id, name, sell_value in record[1]])
+        elif event == "bulk_add_recipes":
+            self.db.bulk_add_recipes([Recipe.from_dict(data) for data in record[1]])
+        elif event == "bulk_remove":
+            self.db.bulk_remove(record[1], [Recipe.from_dict(data) for data in record[2]], cascade=True)
+
+    #Reads the checksum save() wrote at the end of the snapshot, or "" if there is none
+    def _snapshot_checksum(self) -> str:
+        if not os.path.exists(self.filename) or os.path.getsize(self.filename) < CHECKSUM_TRAILER_LENGTH:
+            return ""
+        with open(self.filename, "rb") as f:
+            f.seek(-CHECKSUM_TRAILER_LENGTH, os.SEEK_END)
+            tail = f.read().decode("utf-8", errors="replace")
+        prefix, suffix = CHECKSUM_TRAILER.format("\0").split("\0")
+        if not tail.startswith(prefix) or not tail.endswith(suffix):
+            return ""
+        return tail[len(prefix):-len(suffix)]
@@ -0,0 +1,199 @@
+from CraftingDatabase import CraftingDatabase
+from PySide6.QtCore import Qt, QAbstractListModel, QSortFilterProxyModel, QModelIndex
+from PySide6.QtGui import QColor, QBrush
+
+# List models for MainWindow's Items and Recipes lists, backed directly by a CraftingDatabase
+# The models only hold the current order of item_ids / Recipes, and build a row's text and color in data(),
+# which Qt only calls for rows that are actually on screen, so large databases don't build 100k strings on every refresh
+# Filtering is done by the proxy models on top, which only check set membership and never format anything
+# The underlying object of every row is available through Qt.UserRole
+
+class ItemListModel(QAbstractListModel):
+    def __init__(self, db:CraftingDatabase, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.item_ids = []
+
+    #Replaces the rows with item_ids in display order
+    def set_rows(self, item_ids, db:CraftingDatabase=None):
+        self.beginResetModel()
+        if db is not None:
+            self.db = db
+        self.item_ids = list(item_ids)
+        self.endResetModel()
+
+    #Redraws the rows of item_ids in place, for Items that were edited without changing which rows there are
+    def refresh_rows(self, item_ids):
+        _refresh_rows(self, self.item_ids, item_ids)
+
+    #Moves to item_ids in display order when only the Items in touched were added, removed or edited, inserting,
+    #removing and redrawing just their rows. Resets the rows instead if other Items moved
+    def update_rows(self, item_ids, touched):
+        item_ids = list(item_ids)
+        if not _update_rows(self, self.item_ids, item_ids, touched):
+            self.set_rows(item_ids)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.item_ids)
+
+    #iron (Iron Ore $5) is shown as "Iron Ore ($5)"
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        item = self.db.items.get(self.item_ids[index.row()])
+        if item is None:
+            return None
+        if role == Qt.DisplayRole:
+            return f"{item.name} (${item.sell_value})"
+        if role == Qt.UserRole:
+            return item
+        return None
+
+
+class RecipeListModel(QAbstractListModel):
+    def __init__(self, db:CraftingDatabase, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.recipes = []
+
+        # Green is profitable, red is a net loss, black is break-even
+        self.brushes = {
+            1: QBrush(QColor("green")),
+            -1: QBrush(QColor("red")),
+            0: QBrush(QColor("black")),
+        }
+
+    #Replaces the rows with Recipes in display order
+    def set_rows(self, recipes, db:CraftingDatabase=None):
+        self.beginResetModel()
+        if db is not None:
+            self.db = db
+        self.recipes = list(recipes)
+        self.endResetModel()
+
+    #Redraws the rows of recipes in place, for Recipes whose Items were edited
+    def refresh_rows(self, recipes):
+        _refresh_rows(self, self.recipes, recipes)
+
+    #Moves to recipes in display order when only the Recipes in touched were added, removed or edited, see ItemListModel
+    def update_rows(self, recipes, touched):
+        recipes = list(recipes)
+        if not _update_rows(self, self.recipes, recipes, touched):
+            self.set_rows(recipes)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.recipes)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        recipe = self.recipes[index.row()]
+        if role == Qt.DisplayRole:
+            return self.recipe_text(recipe)
+        if role == Qt.ForegroundRole:
+            success, profit = self.db.calc_profit(recipe)
+            if not success:
+                return None
+            return self.brushes[(profit > 0) - (profit < 0)]
+        if role == Qt.UserRole:
+            return recipe
+        return None
+
+    #CRAFT: 4x Iron Ore → 2x Iron Ingot | 3.0s | Profit: 2
+    def recipe_text(self, recipe) -> str:
+
+        # Format inputs and outputs
+        inputs_str = ", ".join(f"{qty}x {self.db.items[i].name}" for i, qty in sorted(recipe.input_items()))
+        outputs_str = ", ".join(f"{qty}x {self.db.items[i].name}" for i, qty in sorted(recipe.output_items()))
+
+        # Profit
+        success, profit = self.db.calc_profit(recipe)
+        profit_str = f"Profit: {profit}" if success else "Profit: N/A"
+
+        return f"{recipe.type}: {inputs_str} → {outputs_str} | {recipe.time}s | {profit_str}"
+
+
+#Emits dataChanged for every row of model whose entry in rows is in changed, one signal per run of adjacent rows
+def _refresh_rows(model, rows, changed):
+    changed = set(changed)
+    if not changed:
+        return
+    changed_rows = [row for row, entry in enumerate(rows) if entry in changed]
+    start = None
+    for i, row in enumerate(changed_rows):
+        if start is None:
+            start = row
+        if i + 1 == len(changed_rows) or changed_rows[i + 1] != row + 1:
+            model.dataChanged.emit(model.index(start), model.index(row))
+            start = None
+
+
+#Turns rows, the model's list of entries, into new by removing and inserting only the touched entries that left or
+#joined it, one signal per run of adjacent rows, then redraws the touched entries that stayed
+#Returns False without changing anything if the entries that stay aren't in the same order in new
+def _update_rows(model, rows:list, new:list, touched) -> bool:
+    touched = set(touched)
+    old_set = set(rows)
+    new_set = set(new)
+    if [entry for entry in rows if entry in new_set] != [entry for entry in new if entry in old_set]:
+        return False
+
+    # Removed rows, last run first so the rows before it keep their numbers
+    removed = [row for row, entry in enumerate(rows) if entry not in new_set]
+    for start, stop in reversed(_runs(removed)):
+        model.beginRemoveRows(QModelIndex(), start, stop)
+        del rows[start:stop + 1]
+        model.endRemoveRows()
+
+    # Added rows, first run first, each already at its place in new
+    added = [row for row, entry in enumerate(new) if entry not in old_set]
+    for start, stop in _runs(added):
+        model.beginInsertRows(QModelIndex(), start, stop)
+        rows[start:start] = new[start:stop + 1]
+        model.endInsertRows()
+
+    _refresh_rows(model, rows, touched & old_set & new_set)
+    return True
+
+#(first, last) of every run of consecutive numbers in sorted numbers
+def _runs(numbers) -> list:
+    runs = []
+    for number in numbers:
+        if runs and runs[-1][1] == number - 1:
+            runs[-1][1] = number
+        else:
+            runs.append([number, number])
+    return [tuple(run) for run in runs]
+
+
+#Hides Items outside of an allowed set of item_ids, or shows every Item when the set is None
+#The set comes from the database's NameIndex, so filtering never looks at the names themselves
+class ItemFilterProxy(QSortFilterProxyModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.allowed = None
+
+    def set_allowed(self, allowed):
+        self.allowed = allowed
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if self.allowed is None:
+            return True
+        return self.sourceModel().item_ids[source_row] in self.allowed
+
+
+#Hides Recipes outside of an allowed set, or shows every Recipe when the set is None
+class RecipeFilterProxy(QSortFilterProxyModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.allowed = None
+
+    def set_allowed(self, allowed):
+        self.allowed = allowed
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if self.allowed is None:
+            return True
+        return self.sourceModel().recipes[source_row] in self.allowed
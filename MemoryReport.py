@@ -0,0 +1,92 @@
+from CraftingDatabase import CraftingDatabase
+import argparse
+import gc
+import sys
+import tracemalloc
+
+# memory_report() measures how much memory a CraftingDatabase's objects take, by walking them with sys.getsizeof
+# Every object is counted once, by the first part of the database that reaches it: an interned item_id shared by
+# an Item and many Recipes is counted with the Item, so "bytes_per_recipe" only counts what each Recipe adds
+# Returns a dictionary of byte counts per part, per object averages, and the total
+# The walk only sees what sys.getsizeof reports, so load_footprint() also measures a load with tracemalloc, which counts
+# every allocation (GC headers and allocator rounding included) and is the number to compare between versions of the app
+#
+#   python MemoryReport.py game.json
+
+def memory_report(db:CraftingDatabase) -> dict:
+    seen = set()
+
+    items_bytes = sum(_deep_size(item, seen) for item in db.items.values())
+    items_bytes += _deep_size(db.items, seen)
+
+    recipes_bytes = sum(_deep_size(recipe, seen) for recipe in db.recipes)
+    store_bytes = _deep_size(db.recipes, seen)
+    index_bytes = _deep_size(db._consumers, seen) + _deep_size(db._producers, seen)
+    cache_bytes = _deep_size(db._profit_cache, seen)
+
+    item_count = len(db.items)
+    recipe_count = len(db.recipes)
+    return {
+        "items": item_count,
+        "recipes": recipe_count,
+        "items_bytes": items_bytes,
+        "recipes_bytes": recipes_bytes,
+        "recipe_store_bytes": store_bytes,
+        "index_bytes": index_bytes,
+        "profit_cache_bytes": cache_bytes,
+        "bytes_per_item": items_bytes / item_count if item_count else 0,
+        "bytes_per_recipe": recipes_bytes / recipe_count if recipe_count else 0,
+        "total_bytes": items_bytes + recipes_bytes + store_bytes + index_bytes + cache_bytes,
+    }
+
+#Size of obj and everything it holds that hasn't been counted yet, walked with an explicit stack
+def _deep_size(obj, seen:set) -> int:
+    total = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        else:
+            for slot in getattr(type(current), "__slots__", ()):
+                if hasattr(current, slot):
+                    stack.append(getattr(current, slot))
+            if hasattr(current, "__dict__"):
+                stack.append(current.__dict__)
+    return total
+
+#Bytes still allocated after loading filename, and the peak while loading, as measured by tracemalloc
+#Returns (db, retained_bytes, peak_bytes)
+def load_footprint(filename:str):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        db = CraftingDatabase.load(filename)
+        gc.collect()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return db, retained, peak
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show how much memory a database file takes once loaded")
+    parser.add_argument("file", help="database JSON file")
+    args = parser.parse_args()
+
+    db, retained, peak = load_footprint(args.file)
+    print(f"Loaded {len(db.items)} items and {len(db.recipes)} recipes: "
+          f"{retained / 1e6:.1f} MB retained, {peak / 1e6:.1f} MB peak while loading")
+    for part, value in memory_report(db).items():
+        if part.endswith("_bytes") and not part.startswith("bytes_per"):
+            print(f"  {part[:-len('_bytes')]:<16} {value / 1e6:>8.2f} MB")
+        elif part.startswith("bytes_per"):
+            print(f"  {part:<16} {value:>8.1f} B")
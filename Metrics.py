@@ -0,0 +1,225 @@
+from CraftingDatabase import CraftingDatabase
+from collections import deque
+from time import perf_counter
+import cProfile
+import functools
+import json
+import threading
+import time
+
+# Metrics times operations while switched on, and costs nothing while switched off
+# CraftingDatabase's methods are only wrapped with a timer while metrics are enabled: enable() swaps timing wrappers in
+# on the class and disable() puts the original methods back, so the database runs untouched the rest of the time
+# Other code times its own steps with timer(name), which is a shared do-nothing context manager while metrics are off
+#
+# Operation names start with their category: "db." for database work, "qt." for filling Qt models and widgets and
+# "ui." for whole MainWindow steps, so a refresh's time can be split between Qt list population and database work
+# Every operation keeps its call count and total time, and its last max_samples timings for the p50/p99 latencies
+# Category totals only count the outermost operation of each category, so remove_item() calling recipes_that_consume()
+# isn't counted twice as database work
+# A cProfile capture of everything that runs can also be started and stopped, and is saved as a pstats file
+
+#CraftingDatabase methods wrapped while metrics are enabled
+DATABASE_METHODS = (
+    "add_item", "add_recipe", "remove_item", "remove_recipe", "edit_item", "edit_recipe",
+    "bulk_add_items", "bulk_add_recipes", "bulk_remove",
+    "calc_profit", "recipes_that_consume", "recipes_that_produce",
+    "snapshot", "save", "load",
+)
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class _Timer:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name:str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = self.metrics._begin(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics._end(self.name, self.start)
+        return False
+
+
+class Metrics:
+    def __init__(self, max_samples=10000):
+        self.enabled = False
+        self.max_samples = max_samples
+
+        #name: [calls, total seconds, deque of the last max_samples timings]
+        self._stats = {}
+        self._lock = threading.Lock()
+
+        #category: total seconds of its outermost operations, and per thread the number of running operations per category
+        self._categories = {}
+        self._local = threading.local()
+
+        #(class, attribute name, original class attribute) for every method wrapped by enable()
+        self._wrapped = []
+
+        self._profiler = None
+
+    #Starts timing, wrapping CraftingDatabase's methods
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        for name in DATABASE_METHODS:
+            self._wrap(CraftingDatabase, name, f"db.{name}")
+
+    #Stops timing and puts the original methods back, keeping what was recorded so far
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        for cls, name, original in reversed(self._wrapped):
+            setattr(cls, name, original)
+        self._wrapped.clear()
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._categories.clear()
+
+    #Context manager timing the code inside it as operation name, while metrics are enabled
+    def timer(self, name:str):
+        return _Timer(self, name) if self.enabled else _NULL_TIMER
+
+    #Records one call of operation name, outermost being False when it ran inside another operation of its category
+    def record(self, name:str, seconds:float, outermost=True):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = [0, 0.0, deque(maxlen=self.max_samples)]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2].append(seconds)
+            if outermost:
+                category = name.split(".", 1)[0]
+                self._categories[category] = self._categories.get(category, 0.0) + seconds
+
+    #Marks operation name as running in this thread, returning its start time for _end()
+    def _begin(self, name:str) -> float:
+        running = self._running()
+        category = name.split(".", 1)[0]
+        running[category] = running.get(category, 0) + 1
+        return perf_counter()
+
+    def _end(self, name:str, start:float):
+        seconds = perf_counter() - start
+        running = self._running()
+        category = name.split(".", 1)[0]
+        running[category] -= 1
+        self.record(name, seconds, outermost=running[category] == 0)
+
+    #category: number of operations of that category running in this thread
+    def _running(self) -> dict:
+        running = getattr(self._local, "running", None)
+        if running is None:
+            running = self._local.running = {}
+        return running
+
+    #Returns {name: {"calls", "total_ms", "p50_ms", "p99_ms", "max_ms"}}, the percentiles over the last max_samples calls
+    def summary(self) -> dict:
+        with self._lock:
+            stats = {name: (calls, total, sorted(samples)) for name, (calls, total, samples) in self._stats.items()}
+
+        summary = {}
+        for name, (calls, total, samples) in sorted(stats.items()):
+            summary[name] = {
+                "calls": calls,
+                "total_ms": total * 1000,
+                "p50_ms": _percentile(samples, 50) * 1000,
+                "p99_ms": _percentile(samples, 99) * 1000,
+                "max_ms": samples[-1] * 1000,
+            }
+        return summary
+
+    #Total milliseconds per category ("db", "qt", "ui"), the part of each operation name before the first "."
+    def categories(self) -> dict:
+        with self._lock:
+            return {category: seconds * 1000 for category, seconds in sorted(self._categories.items())}
+
+    #Writes the summary and category totals to a JSON file
+    def export(self, filename:str):
+        data = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "categories": self.categories(),
+            "operations": self.summary(),
+        }
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4)
+
+    def profiling(self) -> bool:
+        return self._profiler is not None
+
+    #Starts a cProfile capture of everything the main thread runs
+    def start_profile(self):
+        if self._profiler is None:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    #Stops the capture and saves it as a pstats file, readable with pstats.Stats(filename), or discards it without a filename
+    def stop_profile(self, filename:str=None):
+        if self._profiler is None:
+            return
+        profiler, self._profiler = self._profiler, None
+        profiler.disable()
+        if filename is not None:
+            profiler.dump_stats(filename)
+
+    #Replaces cls.name with a wrapper timing it as metric, classmethods and staticmethods included
+    def _wrap(self, cls, name:str, metric:str):
+        original = cls.__dict__.get(name)
+        if original is None:
+            return
+        kind = type(original) if isinstance(original, (classmethod, staticmethod)) else None
+        func = original.__func__ if kind else original
+
+        def timed(*args, **kwargs):
+            start = self._begin(metric)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._end(metric, start)
+        timed.__name__ = func.__name__
+        timed.__qualname__ = func.__qualname__
+        timed.__doc__ = func.__doc__
+
+        setattr(cls, name, kind(timed) if kind else timed)
+        self._wrapped.append((cls, name, original))
+
+
+#Decorator timing a function as operation name while metrics are enabled, for functions called too rarely for the
+#check to matter, like MainWindow's refresh methods (which Qt signals hold on to, so they can't be swapped later)
+#The wrapper passes on every argument it gets, so connect a decorated method to a signal with arguments through a lambda
+def timed(name:str):
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with metrics.timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+#Nearest-rank percentile of sorted samples
+def _percentile(samples:list, percent:float) -> float:
+    if not samples:
+        return 0.0
+    rank = max(0, -(-len(samples) * percent // 100) - 1)
+    return samples[int(rank)]
+
+
+#The metrics shared by the whole app
+metrics = Metrics()
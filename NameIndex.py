@@ -0,0 +1,229 @@
+import bisect
+import heapq
+import itertools
+import math
+from collections import Counter
+
+# NameIndex is a trigram index over Item names, used to filter and complete Items by name without scanning all of them
+# Names are lowercased and padded as "  name " before being split into trigrams, so the start of the name and the start of
+# every word get their own trigrams ("  i" and " ir" for "iron ore", and " or" for "ore")
+# Each trigram's postings are kept sorted by rank (shorter names first, then alphabetical), so the best matches for a text
+# are found by walking its rarest trigram's postings and stopping as soon as enough names contain the text
+# Since names are padded in front, every one or two characters of a name end one of its trigrams, so text too short for
+# a trigram is looked up through the trigrams ending with it instead of checked against every name
+#
+# matching() returns every Item whose name contains the text
+# search() returns the top matches ranked: names starting with the text, then names containing it
+# When no name contains the text, it returns the names sharing the most trigrams with it instead, so typos like
+# "irno ore" still find "Iron Ore". Names are counted over the full postings of text's trigrams, as many as fit in a
+# budget, and when even the few every match must be in don't fit, the names sharing a whole word with text are scored
+
+class NameIndex:
+    def __init__(self, min_similarity=0.2, fuzzy_budget=100000):
+        #item_id: lowercased name
+        self._names = {}
+        #item_id: (name length, lowercased name, item_id), the order postings are sorted in
+        self._rank = {}
+        #trigram: [item_ids] sorted by rank
+        self._postings = {}
+        #last character or last two characters: {trigrams ending with them}
+        self._endings = {}
+        self.min_similarity = min_similarity
+        #Fuzzy search visits at most this many postings entries, see _fuzzy()
+        self.fuzzy_budget = fuzzy_budget
+
+    #Builds an index from (item_id, name) pairs
+    #Names are added in rank order, so every trigram's postings come out sorted without inserting one at a time
+    @classmethod
+    def build(cls, pairs, **kwargs):
+        index = cls(**kwargs)
+        ranks = sorted((len(name), name, item_id) for item_id, name in ((i, n.lower()) for i, n in pairs))
+        for rank in ranks:
+            _length, name, item_id = rank
+            index._names[item_id] = name
+            index._rank[item_id] = rank
+            for gram in NameIndex._grams(name):
+                index._postings.setdefault(gram, []).append(item_id)
+        for gram in index._postings:
+            index._add_ending(gram)
+        return index
+
+    def __len__(self):
+        return len(self._names)
+
+    #Adds or replaces the name of item_id
+    def add(self, item_id:str, name:str):
+        if item_id in self._names:
+            self.remove(item_id)
+        name = name.lower()
+        self._names[item_id] = name
+        self._rank[item_id] = (len(name), name, item_id)
+        for gram in NameIndex._grams(name):
+            if gram not in self._postings:
+                self._postings[gram] = []
+                self._add_ending(gram)
+            bisect.insort(self._postings[gram], item_id, key=self._rank.__getitem__)
+
+    #Removes item_id from the index, if it is in it
+    def remove(self, item_id:str):
+        name = self._names.pop(item_id, None)
+        if name is None:
+            return
+        rank = self._rank[item_id]
+        for gram in NameIndex._grams(name):
+            postings = self._postings[gram]
+            del postings[bisect.bisect_left(postings, rank, key=self._rank.__getitem__)]
+            if not postings:
+                del self._postings[gram]
+                for ending in (gram[1:], gram[2:]):
+                    self._endings[ending].discard(gram)
+                    if not self._endings[ending]:
+                        del self._endings[ending]
+        del self._rank[item_id]
+
+    #Files a trigram that just got postings under its last character and its last two characters
+    def _add_ending(self, gram:str):
+        for ending in (gram[1:], gram[2:]):
+            self._endings.setdefault(ending, set()).add(gram)
+
+    #Returns the set of item_ids whose name contains text, or None if text is empty (everything matches)
+    #Text shorter than a trigram is in exactly the names having a trigram that ends with it
+    def matching(self, text:str):
+        text = text.lower().strip()
+        if not text:
+            return None
+        if len(text) < 3:
+            return set().union(*(self._postings[gram] for gram in self._endings.get(text, ())))
+        names = self._names
+        return {item_id for item_id in self._rarest(NameIndex._text_grams(text)) if text in names[item_id]}
+
+    #Returns up to limit item_ids ranked by how well their name matches text
+    #Text shorter than a trigram only matches names with a word starting with it
+    def search(self, text:str, limit=10) -> list[str]:
+        text = text.lower().strip()
+        if not text or limit <= 0:
+            return []
+        names = self._names
+
+        # Text shorter than a trigram is looked up by the trigram marking a word starting with it
+        grams = NameIndex._text_grams(text) if len(text) >= 3 else [" " * (3 - len(text)) + text]
+
+        # Names starting with the text, walked in rank order through the rarest trigram they all share
+        ranked = []
+        for item_id in self._rarest(grams + [("  " + text)[:3]]):
+            if names[item_id].startswith(text):
+                ranked.append(item_id)
+                if len(ranked) == limit:
+                    return ranked
+
+        # Then names containing it anywhere
+        found = set(ranked)
+        for item_id in self._rarest(grams):
+            if item_id not in found and text in names[item_id]:
+                ranked.append(item_id)
+                found.add(item_id)
+                if len(ranked) == limit:
+                    return ranked
+
+        # Only fall back to similar names when nothing contains the text, so exact lookups stay cheap
+        if ranked:
+            return ranked
+        return self._fuzzy(text, limit)
+
+    #Postings of the rarest of grams, in rank order
+    def _rarest(self, grams):
+        return min((self._postings.get(gram, ()) for gram in grams), key=len)
+
+    #Up to limit item_ids, ranked by the share of trigrams their name has in common with text
+    #A name needs enough trigrams in common with text to reach min_similarity, so it is in the postings of at least one
+    #of text's rarest few trigrams. Those postings are counted in full, and names are scored from the most trigrams in
+    #common down until no name left can beat the ones found
+    #When the rarest few alone hold more than fuzzy_budget entries, the names sharing a whole word with text are scored
+    def _fuzzy(self, text:str, limit:int) -> list[str]:
+        if len(text) < 3:
+            return []
+        grams = NameIndex._grams(text)
+
+        # similarity = shared / (text's trigrams + name's trigrams - shared) can only reach min_similarity for names of
+        # at least shortest trigrams, which need to share at least needed trigrams with text
+        similarity = max(self.min_similarity, 1e-9)
+        shortest = max(math.ceil(similarity * len(grams)), 1)
+        needed = max(math.ceil(similarity * (len(grams) + shortest) / (1 + similarity)), 1)
+        postings = sorted((self._postings[gram] for gram in grams if gram in self._postings), key=len)
+        required = max(len(postings) - needed + 1, 0)
+        visited = sum(map(len, postings[:required]))
+        if visited > self.fuzzy_budget:
+            return self._closest(grams, self._whole_words(text), limit)
+
+        shared = Counter()
+        for items in postings[:required]:
+            shared.update(items)
+
+        # A name can share at most one more trigram with text for every postings list not counted, and its similarity is
+        # at most shared / text's trigrams
+        uncounted = len(postings) - required
+        names = self._names
+        scores = {}
+        scored = []
+        best = []
+        for item_id, count in shared.most_common():
+            if len(best) == limit and best[0] > (count + uncounted) / len(grams):
+                break
+            name = names[item_id]
+            similarity = scores.get(name)
+            if similarity is None:
+                similarity = scores[name] = NameIndex._similarity(grams, name)
+            if similarity >= self.min_similarity:
+                scored.append((-similarity, self._rank[item_id]))
+                if len(best) < limit:
+                    heapq.heappush(best, similarity)
+                else:
+                    heapq.heappushpop(best, similarity)
+        return [rank[2] for _similarity, rank in heapq.nsmallest(limit, scored)]
+
+    #item_ids of names having one of text's words as a whole word, the shortest first, visiting at most fuzzy_budget
+    #postings entries in all
+    def _whole_words(self, text:str) -> set:
+        words = text.split()
+        share = max(self.fuzzy_budget // len(words), 1)
+        names = self._names
+        found = set()
+        for word in words:
+            padded = " " + word + " "
+            for item_id in itertools.islice(self._rarest(NameIndex._text_grams(padded)), share):
+                if padded in " " + names[item_id] + " ":
+                    found.add(item_id)
+        return found
+
+    #Up to limit of candidates reaching min_similarity with grams, the most similar first and in rank order among equals
+    #Names repeat, so each one is only scored once
+    def _closest(self, grams:set, candidates, limit:int) -> list[str]:
+        names = self._names
+        scores = {}
+        scored = []
+        for item_id in candidates:
+            name = names[item_id]
+            similarity = scores.get(name)
+            if similarity is None:
+                similarity = scores[name] = NameIndex._similarity(grams, name)
+            if similarity >= self.min_similarity:
+                scored.append((-similarity, self._rank[item_id]))
+        return [rank[2] for _similarity, rank in heapq.nsmallest(limit, scored)]
+
+    #Share of trigrams grams and the lowercased name have in common
+    @staticmethod
+    def _similarity(grams:set, name:str) -> float:
+        name_grams = NameIndex._grams(name)
+        common = len(grams & name_grams)
+        return common / (len(grams) + len(name_grams) - common)
+
+    #Trigrams any name containing text must have, which can't include padding since text may appear mid-word
+    @staticmethod
+    def _text_grams(text:str) -> list:
+        return [text[i:i + 3] for i in range(len(text) - 2)]
+
+    #Trigrams of a lowercased name, padded so the start and end of the name get trigrams of their own
+    @staticmethod
+    def _grams(name:str) -> set:
+        padded = "  " + name + " "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
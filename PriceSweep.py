@@ -0,0 +1,163 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from CraftingDatabase import CraftingDatabase
+
+# PriceSweep finds out how every Recipe's profit holds up across many alternative sets of sell values (scenarios),
+# like the price changes a game patch might bring
+# A scenario is one row of sell values, one column per Item in item_ids order (the database's Item order), so a sweep
+# takes a (scenarios x items) matrix. perturbed() builds one by randomly scaling the current sell values
+#
+# Profits are calc_profit() for every Recipe under every scenario, from a sparse net matrix with one row per Recipe
+# (outputs positive, inputs negative). Rather than CSR like RecipeMatrix, the matrix is stored by slot: slot j holds the
+# j-th entry of every Recipe that has one, with Recipes sorted longest first so those Recipes are always a prefix.
+# A block of scenarios is then summed with one gather, multiply and add over contiguous memory per slot, instead of
+# a small sum per Recipe. Scenarios are processed chunk_bytes at a time, and only running totals are kept between
+# chunks, so memory stays bounded however many scenarios there are
+# With workers, chunks are spread over a process pool, each process receiving the matrix once
+#
+# sweep() returns per Recipe statistics over all scenarios: the share where it is profitable (profit > 0) and the
+# share where it loses value (profit < 0), and the mean, standard deviation, minimum and maximum profit
+
+class PriceSweep:
+    def __init__(self, db:CraftingDatabase, chunk_bytes=64 * 1024 * 1024):
+        self.db = db
+        self.chunk_bytes = chunk_bytes
+
+        #Items in column order, Recipes in row order, and the net matrix by slot, built from the database as it is now
+        self.item_ids = list(db.items)
+        self.recipes = list(db.recipes)
+        self._matrix = _net_matrix(self.item_ids, self.recipes)
+
+    #Current sell values in item_ids order
+    def base_prices(self):
+        return np.array([self.db.items[item_id].sell_value for item_id in self.item_ids], dtype=float)
+
+    #count scenarios where every sell value is scaled by its own random factor, lognormally spread around 1
+    #spread=0.1 moves most prices by up to about 20% either way. The same seed always gives the same scenarios
+    def perturbed(self, count:int, spread=0.1, seed=0):
+        rng = np.random.default_rng(seed)
+        return self.base_prices() * rng.lognormal(0.0, spread, size=(count, len(self.item_ids)))
+
+    #Profits of every Recipe under a few scenarios, as a (scenarios x recipes) array, for inspecting single scenarios
+    def profits(self, scenarios):
+        scenarios = self._check(scenarios)
+        return _profits(self._matrix, scenarios).T
+
+    #Returns {"recipes": [Recipe], "profitable", "losing", "mean", "std", "min", "max": arrays in recipes order}
+    #workers > 1 spreads the chunks over that many processes
+    def sweep(self, scenarios, workers=None):
+        scenarios = self._check(scenarios)
+        size = self._chunk_rows()
+        chunks = [scenarios[start:start + size] for start in range(0, len(scenarios), size)]
+
+        if workers and workers > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self._matrix,)) as pool:
+                partials = list(pool.map(_worker_totals, chunks))
+        else:
+            partials = [_totals(self._matrix, chunk) for chunk in chunks]
+
+        count, positive, negative, mean, m2, low, high = _merge(partials, len(self.recipes))
+        scale = 1 / count if count else 0.0
+        return {
+            "recipes": list(self.recipes),
+            "scenarios": count,
+            "profitable": positive * scale,
+            "losing": negative * scale,
+            "mean": mean,
+            "std": np.sqrt(m2 * scale),
+            "min": low,
+            "max": high,
+        }
+
+    #Returns [(Recipe, share of scenarios where it is profitable)] for Recipes profitable in at least threshold of them,
+    #most robust first
+    def robust_recipes(self, scenarios, threshold=0.9, workers=None):
+        result = self.sweep(scenarios, workers=workers)
+        shares = result["profitable"]
+        order = np.argsort(-shares, kind="stable")
+        return [(self.recipes[i], float(shares[i])) for i in order if shares[i] >= threshold]
+
+    #Scenarios per chunk, so that the (recipes x scenarios) profits and one slot's products stay within chunk_bytes
+    def _chunk_rows(self) -> int:
+        return max(1, self.chunk_bytes // (max(len(self.recipes), 1) * 8 * 2))
+
+    def _check(self, scenarios):
+        scenarios = np.asarray(scenarios, dtype=float)
+        if scenarios.ndim == 1:
+            scenarios = scenarios[np.newaxis, :]
+        if scenarios.ndim != 2 or scenarios.shape[1] != len(self.item_ids):
+            raise ValueError(f"scenarios must have one column per Item ({len(self.item_ids)}), got shape {scenarios.shape}")
+        return scenarios
+
+
+#The net matrix as (order, slots): order[k] is the Recipe at sorted row k, and each slot is (rows, columns, quantities)
+#for the first rows sorted Recipes, +quantity for outputs and -quantity for inputs
+def _net_matrix(item_ids, recipes):
+    column = {item_id: i for i, item_id in enumerate(item_ids)}
+    entries = [[(column[i], -q) for i, q in r.input_items()] + [(column[i], q) for i, q in r.output_items()] for r in recipes]
+    order = sorted(range(len(recipes)), key=lambda k: -len(entries[k]))
+
+    slots = []
+    for j in range(len(entries[order[0]]) if recipes else 0):
+        rows = [entries[k][j] for k in order if len(entries[k]) > j]
+        slots.append((len(rows), np.array([c for c, _q in rows], dtype=np.int64), np.array([q for _c, q in rows], dtype=float)))
+    return np.array(order, dtype=np.int64), slots
+
+#(recipes x scenarios) profits for one block of scenarios
+def _profits(matrix, scenarios):
+    order, slots = matrix
+    prices = np.ascontiguousarray(scenarios.T)
+    sorted_profits = np.zeros((len(order), len(scenarios)))
+    for rows, columns, quantities in slots:
+        sorted_profits[:rows] += prices[columns] * quantities[:, np.newaxis]
+
+    result = np.empty_like(sorted_profits)
+    result[order] = sorted_profits
+    return result
+
+#Running totals for one chunk: (scenarios, profitable counts, losing counts, means, sums of squared deviations from
+#the mean, minimums, maximums)
+def _totals(matrix, scenarios):
+    profits = _profits(matrix, scenarios)
+    mean = profits.mean(axis=1)
+    return (
+        len(scenarios),
+        (profits > 0).sum(axis=1),
+        (profits < 0).sum(axis=1),
+        mean,
+        ((profits - mean[:, np.newaxis]) ** 2).sum(axis=1),
+        profits.min(axis=1),
+        profits.max(axis=1),
+    )
+
+#Combines chunk totals, merging means and squared deviations with Chan's parallel formula so the standard deviation
+#stays accurate when profits are large compared to how much they vary
+def _merge(partials, rows):
+    count = 0
+    positive = np.zeros(rows, dtype=np.int64)
+    negative = np.zeros(rows, dtype=np.int64)
+    mean = np.zeros(rows)
+    m2 = np.zeros(rows)
+    low = np.full(rows, np.inf)
+    high = np.full(rows, -np.inf)
+    for n, pos, neg, chunk_mean, chunk_m2, lo, hi in partials:
+        total = count + n
+        delta = chunk_mean - mean
+        mean = mean + delta * (n / total)
+        m2 = m2 + chunk_m2 + delta ** 2 * (count * n / total)
+        count = total
+        positive += pos
+        negative += neg
+        np.minimum(low, lo, out=low)
+        np.maximum(high, hi, out=high)
+    return count, positive, negative, mean, m2, low, high
+
+#The net matrix of the sweep a pool process works for, set once per process by the pool's initializer
+_worker_matrix = None
+
+def _init_worker(matrix):
+    global _worker_matrix
+    _worker_matrix = matrix
+
+def _worker_totals(scenarios):
+    return _totals(_worker_matrix, scenarios)
@@ -0,0 +1,266 @@
+import numpy as np
+from CraftingDatabase import CraftingDatabase
+from CraftingGraph import CraftingGraph
+
+# ProductionPlanner turns target output rates (items per minute) into how many crafts of each Recipe must run in parallel
+# Recipe.time is the seconds one craft takes, so a Recipe running at r crafts per minute needs r * time / 60 parallel crafts
+# Like BillOfMaterials, an Item is crafted through the first Recipe added that produces it, and Items nothing produces are raw
+# The Recipes needed for the targets are built into a sparse stoichiometric matrix (one row per Item, one column per
+# Recipe, outputs positive and inputs negative) held as NumPy coordinate arrays, and the crafting rates come from solving
+# it instead of walking the tree
+# Each Recipe is driven by one Item, and its rate is what that Item's net production needs once every other Recipe making
+# or using it is known. So the Recipes are solved in levels: every Recipe whose dependencies are solved is solved at once
+# with array operations, then its production and use are added to the running surplus in one scatter
+# Only Recipes caught in a loop together (byproducts feeding back into the plan) need a linear solve, a dense one the size
+# of the loop. Loops are taken furthest downstream first, in the order a CraftingGraph keeps
+# An Item made by a Recipe chosen for another Item drives that Recipe too, which runs at whatever its most demanding Item
+# needs. A Recipe whose Items are already covered by byproducts runs 0 times rather than a negative number of times, and
+# what is left over is reported as byproducts
+
+class ProductionPlanner:
+    def __init__(self, db:CraftingDatabase):
+        self.db = db
+        self.graph = CraftingGraph(db)
+
+    #Stops following the database, for when the planner is no longer needed
+    def close(self):
+        self.graph.close()
+
+    #Returns the Recipe used to craft item_id, or None if it is a raw Item
+    def recipe_for(self, item_id:str):
+        producers = self.db.recipes_that_produce(item_id)
+        return producers[0] if producers else None
+
+    #Plans a single set of targets, {'circuit': 10} meaning 10 circuits per minute
+    #Returns (True, plan) or (False, message), where plan holds:
+    #   "crafts" {Recipe: crafts per minute}, "parallel" {Recipe: crafts running at once},
+    #   "raw" {raw_item_id: items per minute consumed} and "byproducts" {item_id: surplus items per minute}
+    def plan(self, targets:dict[str, float]):
+        success, plans = self.plan_many([targets])
+        if not success:
+            return False, plans
+        return True, plans[0]
+
+    #Plans several sets of targets at once, solved together as the columns of one right hand side
+    def plan_many(self, targets_list:list[dict[str, float]]):
+        for targets in targets_list:
+            for item_id, rate in targets.items():
+                if item_id not in self.db.items:
+                    return False, f"'{item_id}' not found"
+                if rate < 0:
+                    return False, f"Target rate for '{item_id}' must not be negative, got {rate}"
+
+        items, recipes, drivers, covered = self._closure([item_id for targets in targets_list for item_id in targets])
+        row = {item_id: i for i, item_id in enumerate(items)}
+
+        # Stoichiometric matrix of net Items per craft, as (row, column, quantity) entries
+        rows, cols, quantities = [], [], []
+        for col, recipe in enumerate(recipes):
+            for item_id, qty in recipe.input_items():
+                rows.append(row[item_id])
+                cols.append(col)
+                quantities.append(-qty)
+            for item_id, qty in recipe.output_items():
+                rows.append(row[item_id])
+                cols.append(col)
+                quantities.append(qty)
+        rows = np.array(rows, dtype=np.intp)
+        cols = np.array(cols, dtype=np.intp)
+        quantities = np.array(quantities, dtype=float)
+
+        # Target rates, one column per set of targets
+        wanted = np.zeros((len(items), len(targets_list)))
+        for col, targets in enumerate(targets_list):
+            for item_id, rate in targets.items():
+                wanted[row[item_id], col] += rate
+
+        driver_rows = np.array([row[item_id] for item_id in drivers], dtype=np.intp)
+        driven = np.full(len(items), -1, dtype=np.intp)
+        driven[driver_rows] = np.arange(len(recipes))
+        for item_id, col in covered:
+            driven[row[item_id]] = col
+        positions = np.array([self.graph.position(item_id) for item_id in drivers], dtype=np.intp)
+        success, crafts, surplus = _solve(rows, cols, quantities, wanted, driven, driver_rows, positions)
+        if not success:
+            return False, crafts
+
+        # Whatever is left is raw consumption (negative) or byproduct surplus (positive)
+        # An Item driving a Recipe can only be short when the loop making it uses up more than it makes
+        raw = np.array([self.recipe_for(item_id) is None for item_id in items], dtype=bool)
+        short = np.flatnonzero(~raw & np.any(surplus < -1e-9, axis=1))
+        if short.size:
+            item_id = items[short[0]]
+            if driven[short[0]] >= 0:
+                return False, f"'{item_id}' can't be made, the Recipes making it use up more of it than they make"
+            return False, f"'{item_id}' is only made as a byproduct, and not enough of it is made"
+        raw_rows = np.flatnonzero(raw).tolist()
+
+        parallel = crafts * np.array([recipe.time for recipe in recipes])[:, None] / 60
+
+        plans = []
+        for col in range(len(targets_list)):
+            column = surplus[:, col].tolist()
+            plans.append({
+                "crafts": dict(zip(recipes, crafts[:, col].tolist())),
+                "parallel": dict(zip(recipes, parallel[:, col].tolist())),
+                "raw": {items[i]: -column[i] for i in raw_rows if column[i] < -1e-9},
+                "byproducts": {items[i]: column[i] for i in np.flatnonzero(surplus[:, col] > 1e-9).tolist()},
+            })
+        return True, plans
+
+    #Collects every Item and Recipe upstream of the target Items
+    #Returns (item_ids, recipes, drivers, covered) where drivers[i] is the Item that recipes[i] was chosen to craft
+    #and covered holds (item_id, i) for every other Item needed that recipes[i] makes, as it was already chosen
+    def _closure(self, target_ids:list[str]):
+        items = list(dict.fromkeys(target_ids))
+        seen = set(items)
+        recipes = []
+        drivers = []
+        covered = []
+        chosen = {}
+
+        stack = list(items)
+        expanded = set(items)
+        while stack:
+            item_id = stack.pop()
+            recipe = self.recipe_for(item_id)
+            if recipe is None:
+                continue
+            if recipe in chosen:
+                covered.append((item_id, chosen[recipe]))
+                continue
+            chosen[recipe] = len(recipes)
+            recipes.append(recipe)
+            drivers.append(item_id)
+
+            for other_id in recipe.input_ids + recipe.output_ids:
+                if other_id not in seen:
+                    seen.add(other_id)
+                    items.append(other_id)
+            for input_id in recipe.input_ids:
+                if input_id not in expanded:
+                    expanded.add(input_id)
+                    stack.append(input_id)
+
+        return items, recipes, drivers, covered
+
+
+
+
+#Solves the matrix given as (rows, cols, quantities) entries for the crafts of every Recipe column
+#driven[i] is the Recipe row i drives (or -1), drivers[j] the row Recipe j was chosen for and positions[j] where that
+#Item is in CraftingGraph's order
+#Returns (True, crafts, surplus) with one column per set of targets, or (False, message, None)
+def _solve(rows, cols, quantities, wanted, driven, drivers, positions):
+    count = len(drivers)
+    crafts = np.zeros((count, wanted.shape[1]))
+    surplus = -wanted
+    if not count:
+        return True, crafts, surplus
+
+    # Each Recipe's driving rows, and what the Recipe itself makes of each
+    driving = np.flatnonzero(driven >= 0)
+    driving = driving[np.argsort(driven[driving], kind="stable")]
+    driving_start = np.searchsorted(driven[driving], np.arange(count + 1))
+    on_driver = driven[rows] >= 0
+    own = on_driver & (driven[rows] == cols)
+    diagonal = np.zeros(len(wanted))
+    np.add.at(diagonal, rows[own], quantities[own])
+
+    # Entries on driving rows, as (Recipe it drives, Recipe it comes from, quantity, whether the row is the one the
+    # Recipe was chosen for), grouped by the first
+    needs, needed, amounts = driven[rows[on_driver]], cols[on_driver], quantities[on_driver]
+    primary = drivers[needs] == rows[on_driver]
+
+    # needs[e] depends on needed[e]. waiting counts each Recipe's unsolved dependencies
+    order = np.argsort(needs, kind="stable")
+    needs, needed, amounts, primary = needs[order], needed[order], amounts[order], primary[order]
+    needs_start = np.searchsorted(needs, np.arange(count + 1))
+    depends = ~(needs == needed)
+    waiting = np.bincount(needs[depends], minlength=count)
+    order = np.argsort(needed[depends], kind="stable")
+    dependents = needs[depends][order]
+    dependents_start = np.searchsorted(needed[depends][order], np.arange(count + 1))
+
+    # Entries of every column, to add a solved Recipe's production and use to the surplus
+    order = np.argsort(cols, kind="stable")
+    col_rows, col_cols, col_quantities = rows[order], cols[order], quantities[order]
+    col_start = np.searchsorted(col_cols, np.arange(count + 1))
+
+    solved = np.zeros(count, dtype=bool)
+    downstream = np.argsort(positions, kind="stable").tolist()
+    ready = np.flatnonzero(waiting == 0)
+    while True:
+        if ready.size:
+            # Each Recipe runs as often as its most demanding row needs, and not at all if none need it
+            group = ready
+            at = driving[_ranges(driving_start[group], driving_start[group + 1])]
+            at = at[diagonal[at] != 0]
+            if np.any(np.bincount(driven[at], minlength=count)[group] == 0):
+                return False, "Recipes form a cycle that can't produce any net output", None
+            np.maximum.at(crafts, driven[at], -surplus[at] / diagonal[at, None])
+        else:
+            while downstream and solved[downstream[-1]]:
+                downstream.pop()
+            if not downstream:
+                break
+            group = _loop(downstream[-1], needs_start, needed, solved)
+            success = _solve_loop(group, needs_start, needs, needed, np.where(primary, amounts, 0),
+                                  surplus[drivers[group]], crafts)
+            if not success:
+                return False, "Recipes form a cycle that can't produce any net output", None
+
+        solved[group] = True
+        entries = _ranges(col_start[group], col_start[group + 1])
+        np.add.at(surplus, col_rows[entries], col_quantities[entries, None] * crafts[col_cols[entries]])
+
+        unlocked = dependents[_ranges(dependents_start[group], dependents_start[group + 1])]
+        unlocked = unlocked[~solved[unlocked]]
+        np.subtract.at(waiting, unlocked, 1)
+        ready = np.unique(unlocked[waiting[unlocked] == 0])
+    return True, crafts, surplus
+
+#The Recipe start, with every unsolved Recipe it depends on directly or not, as an array
+#start is the unsolved Recipe furthest downstream, so nothing in the group waits on a Recipe outside it
+def _loop(start:int, needs_start, needed, solved):
+    group = [start]
+    members = {start}
+    for j in group:
+        for other in needed[needs_start[j]:needs_start[j + 1]].tolist():
+            if not solved[other] and other not in members:
+                members.add(other)
+                group.append(other)
+    return np.array(group, dtype=np.intp)
+
+#Solves the Recipes of a loop together for each set of targets, given the surplus of their drivers so far
+#Only the rows each Recipe was chosen for are solved, amounts on its other driving rows are given as 0
+#A Recipe that would run a negative number of times is set to 0 and the rest solved again without it
+#Returns False if the loop can't produce any net output
+def _solve_loop(group, needs_start, needs, needed, amounts, surplus, crafts) -> bool:
+    place = {j: n for n, j in enumerate(group.tolist())}
+    entries = _ranges(needs_start[group], needs_start[group + 1])
+    inside = np.array([j in place for j in needed[entries].tolist()], dtype=bool)
+    entries = entries[inside]
+    block = np.zeros((len(group), len(group)))
+    np.add.at(block, ([place[j] for j in needs[entries].tolist()], [place[j] for j in needed[entries].tolist()]),
+              amounts[entries])
+
+    for col in range(surplus.shape[1]):
+        running = np.ones(len(group), dtype=bool)
+        while True:
+            values = np.zeros(len(group))
+            try:
+                values[running] = np.linalg.solve(block[np.ix_(running, running)], -surplus[running, col])
+            except np.linalg.LinAlgError:
+                return False
+            negative = values < -1e-9
+            if not negative.any():
+                break
+            running &= ~negative
+        crafts[group, col] = np.maximum(values, 0)
+    return True
+
+#Indices of every range(starts[i], stops[i]) one after the other, without a Python loop
+def _ranges(starts, stops):
+    lengths = stops - starts
+    return np.arange(lengths.sum()) + np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
@@ -0,0 +1,256 @@
+from CraftingDatabase import CraftingDatabase
+from BillOfMaterials import BillOfMaterials
+from SortIndex import SortIndex
+from Recipe import Recipe
+from Serialization import recipe_json
+import argparse
+import asyncio
+import json
+import sys
+
+# QueryServer keeps one CraftingDatabase loaded and answers crafting lookups over a JSON line protocol on localhost,
+# so overlays, bots and spreadsheets running next to the game can share it instead of each loading the file
+# Every request is one line holding a JSON object, and every response is one line, in the same order as the requests:
+#   {"id": 1, "op": "consumers", "item": "iron_ore"}  ->  {"id": 1, "ok": true, "result": [...]}
+#   {"id": 2, "op": "item", "item": "nope"}           ->  {"id": 2, "ok": false, "error": "'nope' not found"}
+# A line holding a JSON array is a batch, answered with one line holding an array of responses, which saves a round trip per request
+# id is optional and is only echoed back. Each client connection is served by its own task, so clients don't wait on each other
+#
+# Ops and their arguments:
+#   "item" (item), "consumers" (item), "producers" (item), "profit" (recipe as in Recipe.to_dict()),
+#   "top_profits" (top=10, ascending=false), "bom" (item, quantity=1), "edit_item" (item, name, sell_value)
+# Results of read ops are cached as encoded JSON per request, and the whole cache is dropped on any database change,
+# whether it came through edit_item or from other code editing the same database in the server's thread
+# Requests are answered on the event loop, so every op has to stay quick even on a cache miss: lookups go through the
+# database's indexes, top_profits reads the profit order a SortIndex keeps up to date instead of sorting every Recipe,
+# and BOMs come from BillOfMaterials' memoized expansions. Both are built when the server starts
+#
+#   python QueryServer.py game.json --port 8765
+
+#Ops that only read the database, so their results can be cached
+READ_OPS = ("item", "consumers", "producers", "profit", "top_profits", "bom")
+
+class QueryServer:
+    def __init__(self, db:CraftingDatabase, host="127.0.0.1", port=0, cache_size=10000):
+        self.db = db
+        self.host = host
+        self.port = port
+        self.cache_size = cache_size
+
+        #Canonical request text: encoded result
+        self._cache = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        self._bill = BillOfMaterials(db)
+        self._sort_index = SortIndex(db)
+        self._server = None
+        self.db.add_listener(self.on_change)
+
+    #Starts listening, returning the port (which was picked by the OS if port was 0)
+    async def start(self) -> int:
+        self._sort_index.sorted_recipes("profit", limit=0)
+        self._server = await asyncio.start_server(self._serve, self.host, self.port, limit=1 << 24)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    #Stops listening and stops following the database
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        self.db.remove_listener(self.on_change)
+        self._bill.close()
+        self._sort_index.close()
+
+    #Database listener, every change can affect any cached result (a BOM's raw cost depends on Items far down the tree)
+    def on_change(self, event:str, *args):
+        self._cache.clear()
+
+    #Answers one request line, returning the response line without its newline
+    def handle_line(self, line:str) -> str:
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return self._error(None, f"Invalid JSON: {e}")
+        if isinstance(request, list):
+            return "[" + ", ".join(self._handle(r) for r in request) + "]"
+        return self._handle(request)
+
+    async def _serve(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    writer.write((self._error(None, "Request line too long") + "\n").encode("utf-8"))
+                    break
+                if not line:
+                    break
+                if line.strip():
+                    writer.write((self.handle_line(line.decode("utf-8", errors="replace")) + "\n").encode("utf-8"))
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    #Response for one request object, from the cache when a read op was asked the same thing since the last change
+    def _handle(self, request) -> str:
+        if not isinstance(request, dict):
+            return self._error(None, f"Expected a JSON object, got {type(request).__name__}")
+        request_id = request.get("id")
+        op = request.get("op")
+        handler = OPS.get(op)
+        if handler is None:
+            return self._error(request_id, f"Unknown op '{op}'")
+
+        key = None
+        if op in READ_OPS:
+            key = json.dumps({k: v for k, v in request.items() if k != "id"}, sort_keys=True)
+            result = self._cache.get(key)
+            if result is not None:
+                self.cache_hits += 1
+                return f'{{"id": {json.dumps(request_id)}, "ok": true, "result": {result}}}'
+            self.cache_misses += 1
+
+        try:
+            success, value = handler(self, request)
+        except KeyError as e:
+            return self._error(request_id, f"Missing argument {e}")
+        except (TypeError, ValueError) as e:
+            return self._error(request_id, f"Bad request: {e}")
+        if not success:
+            return self._error(request_id, value)
+
+        result = json.dumps(value)
+        if key is not None:
+            if len(self._cache) >= self.cache_size:
+                del self._cache[next(iter(self._cache))]
+            self._cache[key] = result
+        return f'{{"id": {json.dumps(request_id)}, "ok": true, "result": {result}}}'
+
+    def _error(self, request_id, message:str) -> str:
+        return json.dumps({"id": request_id, "ok": False, "error": message})
+
+    #Each op returns (success, result or error message)
+
+    def _item(self, request):
+        item = self.db.items.get(_item_id(request))
+        if item is None:
+            return False, f"'{request['item']}' not found"
+        return True, item.to_dict()
+
+    def _consumers(self, request):
+        return self._recipes_of(_item_id(request), self.db.recipes_that_consume)
+
+    def _producers(self, request):
+        return self._recipes_of(_item_id(request), self.db.recipes_that_produce)
+
+    def _recipes_of(self, item_id:str, lookup):
+        if item_id not in self.db.items:
+            return False, f"'{item_id}' not found"
+        return True, [recipe_json(self.db, r) for r in lookup(item_id)]
+
+    #Recipe.from_dict() checks the ingredients itself, with messages meant for users
+    def _profit(self, request):
+        data = request["recipe"]
+        if not isinstance(data, dict):
+            raise ValueError("recipe must be an object like Recipe.to_dict() returns")
+        if not isinstance(data.get("type", "CRAFT"), str):
+            raise ValueError("recipe type must be a string")
+        if not _is_number(data.get("time", 0), (int, float)):
+            raise ValueError("recipe time must be a number")
+        success, profit = self.db.calc_profit(Recipe.from_dict(data))
+        return (True, profit) if success else (False, "Recipe not found")
+
+    def _top_profits(self, request):
+        top = request.get("top", 10)
+        if not _is_number(top, int) or top < 0:
+            raise ValueError("top must be a whole number of at least 0")
+        ascending = request.get("ascending", False)
+        if not isinstance(ascending, bool):
+            raise ValueError("ascending must be true or false")
+        ranked = self._sort_index.sorted_recipes("profit", descending=not ascending, limit=top)
+        return True, [recipe_json(self.db, r) for r in ranked]
+
+    def _bom(self, request):
+        item_id = _item_id(request)
+        quantity = request.get("quantity", 1)
+        if not _is_number(quantity, (int, float)) or not quantity > 0:
+            raise ValueError("quantity must be a number above 0")
+        success, materials = self._bill.expand(item_id, quantity)
+        if not success:
+            return False, materials
+        return True, {"materials": materials, "raw_cost": self._bill.raw_cost(item_id, quantity)[1]}
+
+    def _edit_item(self, request):
+        sell_value = request.get("sell_value")
+        if sell_value is not None and (not _is_number(sell_value, int) or sell_value < 0):
+            raise ValueError("sell_value must be a whole number of at least 0")
+        name = request.get("name")
+        if name is not None and not isinstance(name, str):
+            raise ValueError("name must be a string")
+        return self.db.edit_item(_item_id(request), new_name=name, new_sell_value=sell_value)
+
+#A request's "item" argument, which must be a string
+def _item_id(request) -> str:
+    item_id = request["item"]
+    if not isinstance(item_id, str):
+        raise ValueError("item must be a string")
+    return item_id
+
+#Whether value is a JSON number of the given types, true and false not counting as numbers
+def _is_number(value, types) -> bool:
+    return isinstance(value, types) and not isinstance(value, bool)
+
+OPS = {
+    "item": QueryServer._item,
+    "consumers": QueryServer._consumers,
+    "producers": QueryServer._producers,
+    "profit": QueryServer._profit,
+    "top_profits": QueryServer._top_profits,
+    "bom": QueryServer._bom,
+    "edit_item": QueryServer._edit_item,
+}
+
+
+#Sends requests (a list of request objects) to a running server as one batch and returns the list of responses
+#Meant for scripts and for checking a server from the same machine
+async def query(requests:list, host="127.0.0.1", port=8765) -> list:
+    reader, writer = await asyncio.open_connection(host, port, limit=1 << 24)
+    try:
+        writer.write((json.dumps(requests) + "\n").encode("utf-8"))
+        await writer.drain()
+        return json.loads(await reader.readline())
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve crafting lookups for a database file on localhost")
+    parser.add_argument("file", help="database JSON file")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    try:
+        db = CraftingDatabase.load(args.file, trusted=True)
+    except (OSError, ValueError, TypeError, KeyError) as e:
+        print(f"Could not load '{args.file}': {e}", file=sys.stderr)
+        sys.exit(2)
+
+    server = QueryServer(db, host=args.host, port=args.port)
+    print(f"Serving '{args.file}' on {args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
@@ -1,36 +1,84 @@
-# Recipes stores two dictionaries of of inputs and outputs in the form of item_id: quantity
-# They also store a type and a time variable, yet unused
+import sys
+
+# Recipes store their inputs and outputs in the form of item_id: quantity
+# They also store a type and a time variable (seconds per craft, used by ProductionPlanner)
 # Recipes do NOT store Item objects or even know about them. 
+# To keep large databases small, Recipes use __slots__ and keep both sides in one flat tuple
+# (input_id, quantity, ..., output_id, quantity, ...) split at _split, with interned item_ids and types so the same id is
+# shared by every Recipe using it. Equal times are shared the same way through _TIMES
+# inputs and outputs are rebuilt as dictionaries on access; Recipes are not meant to be changed after being created
+
+#time: time, capped so databases with many distinct times don't grow it forever
+_TIMES = {}
+_TIMES_LIMIT = 4096
+
 class Recipe:
+    __slots__ = ("_ingredients", "_split", "type", "time", "_hash")
+
     def __init__(self, inputs, outputs, type="CRAFT", time=0):
         
-        #validate inputs by dict, then str key, then int quantity, and finally positive quantity
-        if not isinstance(inputs, dict):
-            raise TypeError("Inputs must be a dictionary of item_id -> quantity")
-        for item_id, quantity in inputs.items():
-            if not isinstance(item_id, str):
-                raise TypeError(f"item_id must be a string, got {type(item_id).__name__}")
-            if not isinstance(quantity, int):
-                raise TypeError(f"Quantity must for {item_id} must be an int, got {type(quantity).__name__}")
-            if quantity <=0:
-                raise ValueError(f"Quantity for {item_id} must be positive, got {quantity}")
+        #validate inputs and outputs by dict, then str key, then int quantity, and finally positive quantity
+        Recipe._validate(inputs, "Inputs")
+        Recipe._validate(outputs, "Outputs")
         
-        #validate outputs by dict, then str key, then int quantity, and finally positive quantity
-        if not isinstance(outputs, dict):
-            raise TypeError("Outputs must be a dictionary of item_id -> quantity")
+        self._pack(inputs, outputs)
+        self.type = sys.intern(type.upper())
+        self.time = Recipe._shared_time(time)
+        self._hash = None
+
+    #Dictionary of item_id: quantity consumed, in the order it was created with
+    @property
+    def inputs(self):
+        return dict(self.input_items())
+
+    #Dictionary of item_id: quantity produced, in the order it was created with
+    @property
+    def outputs(self):
+        return dict(self.output_items())
+
+    #item_ids consumed and produced, without building dictionaries
+    @property
+    def input_ids(self):
+        return self._ingredients[0:self._split:2]
+
+    @property
+    def output_ids(self):
+        return self._ingredients[self._split::2]
+
+    #Every item_id consumed or produced, inputs first
+    @property
+    def item_ids(self):
+        return self._ingredients[::2]
+
+    #(item_id, quantity) pairs consumed and produced, without building dictionaries
+    def input_items(self):
+        return zip(self._ingredients[0:self._split:2], self._ingredients[1:self._split:2])
+
+    def output_items(self):
+        return zip(self._ingredients[self._split::2], self._ingredients[self._split + 1::2])
+
+    #{'iron': 4}, {'iron_ingot': 2} -> ('iron', 4, 'iron_ingot', 2) split at 2, interning each item_id
+    def _pack(self, inputs, outputs):
+        packed = []
+        for item_id, quantity in inputs.items():
+            packed.append(sys.intern(item_id))
+            packed.append(quantity)
+        self._split = len(packed)
         for item_id, quantity in outputs.items():
-            if not isinstance(item_id, str):
-                raise TypeError(f"item_id must be a string, got {type(item_id).__name__}")
-            if not isinstance(quantity, int):
-                raise TypeError(f"Quantity must for {item_id} must be an int, got {type(quantity).__name__}")
-            if quantity <=0:
-                raise ValueError(f"Quantity for {item_id} must be positive, got {quantity}")
-        
-        
-        self.inputs = inputs
-        self.outputs = outputs
-        self.type = type.upper()
-        self.time = float(time)
+            packed.append(sys.intern(item_id))
+            packed.append(quantity)
+        self._ingredients = tuple(packed)
+
+    #Returns time as a float, reusing the float object of an equal earlier time when possible
+    @staticmethod
+    def _shared_time(time):
+        time = float(time)
+        shared = _TIMES.get(time)
+        if shared is not None:
+            return shared
+        if len(_TIMES) < _TIMES_LIMIT:
+            _TIMES[time] = time
+        return time
     
     #CRAFT: iron x4 -> iron_ingot x2 (time: 0.0)
     def __str__(self):
@@ -43,19 +91,32 @@ class Recipe:
     def __repr__(self):
         return (f"Recipe(inputs={self.inputs}, outputs={self.outputs}, type='{self.type}', time={self.time})")
     
-    #Adds comparison between Recipes using ==
+    #Adds comparison between Recipes using ==, ingredient order doesn't matter
+    #Hashes are cached, so comparing them first makes most unequal comparisons cheap
     def __eq__(self, other):
-        return isinstance(other, Recipe) and \
-            self.inputs == other.inputs and \
-            self.outputs == other.outputs and \
-            self.type == other.type and \
-            self.time == other.time
+        return isinstance(other, Recipe) and hash(self) == hash(other) and self.key == other.key
+
+    #Canonical identity of a Recipe: sorted inputs, sorted outputs, type and time
+    #((('iron', 4),), (('iron_ingot', 2),), 'CRAFT', 0.0)
+    @property
+    def key(self):
+        return (tuple(sorted(self.input_items())),
+                tuple(sorted(self.output_items())),
+                self.type,
+                self.time)
+
+    #Equal Recipes share a key, so they also share a hash and can be used in sets and as dictionary keys
+    #The hash is cached on first use
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(self.key)
+        return self._hash
 
 
     def to_dict(self):
         return {
-                "inputs": self.inputs.copy(), 
-                "outputs": self.outputs.copy(),
+                "inputs": self.inputs, 
+                "outputs": self.outputs,
                 "type": self.type,
                 "time": self.time
                 }
@@ -63,11 +124,11 @@ class Recipe:
     
     #return true if item is used in recipe
     def consumes(self, item_id) -> bool:
-        return item_id in self.inputs
+        return item_id in self.input_ids
 
     #return true if recipe creates item
     def produces(self, item_id) -> bool:
-        return item_id in self.outputs
+        return item_id in self.output_ids
 
     @classmethod
     def from_dict(cls, data):
@@ -77,4 +138,50 @@ class Recipe:
                 type=data.get("type", "CRAFT"),
                 time=data.get("time", 0)
 
-        )
\ No newline at end of file
+        )
+
+    #Builds a Recipe from a dictionary without validating it, only for data this app wrote itself (see StreamingLoader)
+    #Call validate() afterwards if the data turns out not to be trusted
+    @classmethod
+    def _from_trusted_dict(cls, data):
+        recipe = cls.__new__(cls)
+        try:
+            recipe._pack(data["inputs"], data["outputs"])
+        except (AttributeError, TypeError):
+            return cls.from_dict(data)
+        recipe.type = sys.intern(data.get("type", "CRAFT").upper())
+        recipe.time = Recipe._shared_time(data.get("time", 0))
+        recipe._hash = None
+        return recipe
+
+    #Builds a Recipe from ingredient dictionaries the caller already validated, for bulk imports (see BulkImporter)
+    #item_ids are used as given, so they should be the database's own strings, and the hash comes straight from the
+    #dictionaries instead of being unpacked again from the flat tuple
+    @classmethod
+    def _from_checked(cls, inputs:dict, outputs:dict, type:str, time):
+        recipe = cls.__new__(cls)
+        recipe._ingredients = sum(inputs.items(), ()) + sum(outputs.items(), ())
+        recipe._split = 2 * len(inputs)
+        recipe.type = sys.intern(type.upper())
+        recipe.time = Recipe._shared_time(time)
+        recipe._hash = hash((tuple(sorted(inputs.items())), tuple(sorted(outputs.items())), recipe.type, recipe.time))
+        return recipe
+
+    #Re-runs the constructor's validation on an existing Recipe, raising the same errors
+    def validate(self):
+        Recipe._validate(self.inputs, "Inputs")
+        Recipe._validate(self.outputs, "Outputs")
+
+    #validate ingredients by dict, then str key, then int quantity, and finally positive quantity
+    #label is "Inputs" or "Outputs", used in error messages
+    @staticmethod
+    def _validate(ingredients, label:str):
+        if not isinstance(ingredients, dict):
+            raise TypeError(f"{label} must be a dictionary of item_id -> quantity")
+        for item_id, quantity in ingredients.items():
+            if not isinstance(item_id, str):
+                raise TypeError(f"item_id must be a string, got {type(item_id).__name__}")
+            if not isinstance(quantity, int):
+                raise TypeError(f"Quantity must for {item_id} must be an int, got {type(quantity).__name__}")
+            if quantity <=0:
+                raise ValueError(f"Quantity for {item_id} must be positive, got {quantity}")
\ No newline at end of file
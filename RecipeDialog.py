@@ -1,18 +1,19 @@
-import sys
 from Item import Item
 from Recipe import Recipe
-from CraftingDatabase import CraftingDatabase
-from PySide6.QtWidgets import QCompleter, QComboBox, QFormLayout, QSpinBox, QLineEdit, QDialog, QMessageBox, QInputDialog, QApplication, QMainWindow, QWidget, QPushButton, QVBoxLayout, QLabel, QTabWidget, QListWidget, QHBoxLayout
-from PySide6.QtCore import Qt, Signal, QTimer, QEvent
+from PySide6.QtWidgets import QCompleter, QComboBox, QFormLayout, QSpinBox, QLineEdit, QDialog, QMessageBox, QWidget, QPushButton, QVBoxLayout, QLabel, QHBoxLayout
+from PySide6.QtCore import Qt, Signal, QTimer, QEvent, QModelIndex
+from PySide6.QtGui import QStandardItemModel, QStandardItem
 
 class RecipeDialog(QDialog):
-    def __init__(self, items: dict[str, Item], recipe = None, parent=None, title="Add Recipe"):
+    def __init__(self, items: dict[str, Item], recipe = None, parent=None, title="Add Recipe", name_index=None):
         super().__init__(parent)
         self.setWindowTitle(title)
 
         # Recieves a list of current Items, and possibly a Recipe to pre-populate from
+        # A NameIndex of the Items, if given, is used by the IngredientRows to complete typed names
         self.items = items
         self.recipe = recipe
+        self.name_index = name_index
 
         main_layout = QVBoxLayout(self)
 
@@ -70,7 +71,7 @@ class RecipeDialog(QDialog):
     def add_input_row(self):
 
         # Create an Ingredient row with existing items and set RecipeDialog as parent, and connect remove button
-        row = IngredientRow(self.items, parent=self)
+        row = IngredientRow(self.items, parent=self, name_index=self.name_index)
         row.remove_requested.connect(self.remove_input_row)
         self.inputs_layout.addWidget(row)
         self.input_rows.append(row)
@@ -79,7 +80,7 @@ class RecipeDialog(QDialog):
     def add_output_row(self):
 
         # Create an Ingredient row with existing items and set RecipeDialog as parent, and connect remove button
-        row = IngredientRow(self.items, parent=self)
+        row = IngredientRow(self.items, parent=self, name_index=self.name_index)
         row.remove_requested.connect(self.remove_output_row)
         self.outputs_layout.addWidget(row)
         self.output_rows.append(row)
@@ -189,11 +190,15 @@ class IngredientRow(QWidget):
     # Signal used for deleting self
     remove_requested = Signal(object)
 
-    def __init__(self, items: dict[str, Item], parent=None):
+    # Number of names shown by the completer when a NameIndex is used
+    completion_limit = 20
+
+    def __init__(self, items: dict[str, Item], parent=None, name_index=None):
         super().__init__(parent)
 
         # Must be passed a dictionary of current items
         self.items = items
+        self.name_index = name_index
 
         layout = QHBoxLayout(self)
 
@@ -206,6 +211,12 @@ class IngredientRow(QWidget):
         self.item_combo.addItem("Select item...", None)
         self.line_edit = self.item_combo.lineEdit()
 
+        # With a NameIndex, the completer shows the index's ranked (and typo tolerant) matches instead of scanning every name
+        self.completion_model = QStandardItemModel(self)
+        self.line_edit.textEdited.connect(self.update_completions)
+        if self.name_index is not None:
+            self.use_name_index()
+
         # Also has the capability of auto-focusing itself and selecting all text for convenience
         self.line_edit.installEventFilter(self)
 
@@ -236,16 +247,50 @@ class IngredientRow(QWidget):
         if type(parent) == RecipeDialog:
             QTimer.singleShot(0, lambda: self._focus_combo())
 
-    def refresh_items(self, items:dict[str, Item]):
+    def refresh_items(self, items:dict[str, Item], name_index=None):
         
         # Copies the logic for adding items in __init__, specifically for the modified IngredientRow used in the Recipe tab's filter bar
         self.items = items
+        if name_index is not None and name_index is not self.name_index:
+            self.name_index = name_index
+            self.use_name_index()
         self.item_combo.clear()
         self.item_combo.addItem("Select item...", None)
 
         for item_id, item in sorted(items.items(), key=lambda kv: kv[1].name.lower()):
             self.item_combo.addItem(item.name, item_id)
 
+    def use_name_index(self):
+
+        # Replace the combo's own completer with one fed from the NameIndex as the user types
+        # The completer model is already filtered and ranked, so the completer must not filter it again
+        completer = QCompleter(self.completion_model, self)
+        completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        completer.activated[QModelIndex].connect(self.on_completion_activated)
+        self.item_combo.setCompleter(completer)
+
+    def update_completions(self, text):
+
+        # Without a NameIndex the combo's own completer handles it
+        if self.name_index is None:
+            return
+
+        # Fill the completer with the best matching names, each holding its item_id
+        self.completion_model.clear()
+        for item_id in self.name_index.search(text, limit=self.completion_limit):
+            row = QStandardItem(self.items[item_id].name)
+            row.setData(item_id, Qt.UserRole)
+            self.completion_model.appendRow(row)
+        if self.completion_model.rowCount():
+            self.item_combo.completer().complete()
+
+    def on_completion_activated(self, index):
+
+        # Select the completed Item by id, since several Items may share a name
+        i = self.item_combo.findData(index.data(Qt.UserRole))
+        if i >= 0:
+            self.item_combo.setCurrentIndex(i)
+
     def _focus_combo(self):
 
         # Focuses itself and selects all text
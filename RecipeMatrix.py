@@ -0,0 +1,166 @@
+import numpy as np
+from CraftingDatabase import CraftingDatabase
+
+# RecipeMatrix is an optional columnar view of a CraftingDatabase for questions about the whole graph at once
+# Items are mapped to column indices and Recipes to row indices. Recipe inputs and outputs are kept as two sparse
+# CSR matrices (indptr, indices, data arrays), with a price vector of each Item's sell_value
+# All profits are then (outputs - inputs) @ prices, computed in one vectorized pass
+#
+# The view listens to the database and patches itself: price edits update the price vector in place, added Recipes are
+# queued and appended in one go on the next query, and removed Recipes are only marked dead until enough pile up to compact
+# Rows stay in the database's Recipe order, since both append edited and added Recipes at the end
+
+class RecipeMatrix:
+    def __init__(self, db:CraftingDatabase, compact_ratio=0.25):
+        self.db = db
+        self.compact_ratio = compact_ratio
+        self.db.add_listener(self.on_change)
+        self._rebuild()
+
+    #Stops listening to the database, for when the view is no longer needed
+    def close(self):
+        self.db.remove_listener(self.on_change)
+
+    #Database listener, patches the view instead of rebuilding it where possible
+    #Once a rebuild is due, the arrays no longer match the database, so later changes are left to the rebuild too
+    def on_change(self, event:str, *args):
+        if self._dirty:
+            return
+        if event == "add_item":
+            self._add_column(args[0])
+        elif event == "edit_item":
+            item = args[0]
+            self._prices[self.item_index[item.id]] = item.sell_value
+        elif event == "add_recipe":
+            self._pending.append(args[0])
+        elif event == "remove_recipe":
+            self._kill(args[0])
+        elif event == "edit_recipe":
+            self._kill(args[0])
+            self._pending.append(args[1])
+        elif event == "remove_item":
+            for recipe in args[1]:
+                self._kill(recipe)
+        else:
+            self._dirty = True
+
+    #Alive Recipes in row order, matching the arrays returned by profits()
+    def recipes(self):
+        self._refresh()
+        return [r for r in self._rows if r is not None]
+
+    #Returns every alive Recipe's profit as one array, in the order of recipes()
+    def profits(self):
+        self._refresh()
+        values = self._row_sums(self._out, self._prices) - self._row_sums(self._in, self._prices)
+        return values[self._alive]
+
+    #Returns {Recipe: profit} for every Recipe, from one vectorized pass
+    def profit_table(self):
+        return dict(zip(self.recipes(), self.profits().tolist()))
+
+    #Returns the Recipes consuming and/or producing any of item_ids, found with one mask over the index arrays
+    def recipes_touching(self, item_ids, inputs=True, outputs=True):
+        self._refresh()
+        wanted = np.zeros(len(self.item_ids), dtype=bool)
+        wanted[[self.item_index[i] for i in item_ids if i in self.item_index]] = True
+
+        hit = np.zeros(len(self._rows), dtype=bool)
+        for matrix, use in ((self._in, inputs), (self._out, outputs)):
+            if use:
+                hit |= self._rows_with(matrix, wanted)
+        hit &= self._alive
+        return [self._rows[i] for i in np.flatnonzero(hit)]
+
+    #Builds every array from the database
+    def _rebuild(self):
+        self.item_ids = list(self.db.items)
+        self.item_index = {item_id: i for i, item_id in enumerate(self.item_ids)}
+        self._prices = np.array([item.sell_value for item in self.db.items.values()], dtype=float)
+
+        self._rows = []
+        self._row_of = {}
+        self._in = (np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0))
+        self._out = (np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0))
+        self._alive = np.zeros(0, dtype=bool)
+        self._dead = 0
+        self._pending = list(self.db.recipes)
+        self._dirty = False
+        self._append_pending()
+
+    #Brings the arrays up to date before a query
+    def _refresh(self):
+        if self._dirty:
+            self._rebuild()
+            return
+        if self._dead > self.compact_ratio * max(len(self._rows), 1):
+            self._rebuild()
+            return
+        if self._pending:
+            self._append_pending()
+
+    #Appends every queued Recipe as new rows in a single concatenation
+    def _append_pending(self):
+        recipes = self._pending
+        self._pending = []
+        if not recipes:
+            return
+
+        first_row = len(self._rows)
+        for offset, recipe in enumerate(recipes):
+            self._rows.append(recipe)
+            self._row_of[recipe] = first_row + offset
+
+        self._in = self._extend(self._in, [r.input_items() for r in recipes])
+        self._out = self._extend(self._out, [r.output_items() for r in recipes])
+        self._alive = np.concatenate([self._alive, np.ones(len(recipes), dtype=bool)])
+
+    #Returns a CSR matrix with one row appended per list of (item_id, quantity) pairs
+    def _extend(self, matrix, rows):
+        indptr, indices, data = matrix
+        new_indices = []
+        new_data = []
+        lengths = []
+        for pairs in rows:
+            count = 0
+            for item_id, qty in pairs:
+                new_indices.append(self.item_index[item_id])
+                new_data.append(qty)
+                count += 1
+            lengths.append(count)
+
+        new_indptr = indptr[-1] + np.cumsum(lengths, dtype=np.int64)
+        return (np.concatenate([indptr, new_indptr]),
+                np.concatenate([indices, np.array(new_indices, dtype=np.int64)]),
+                np.concatenate([data, np.array(new_data, dtype=float)]))
+
+    #Adds a column for a new Item
+    def _add_column(self, item):
+        self.item_index[item.id] = len(self.item_ids)
+        self.item_ids.append(item.id)
+        self._prices = np.append(self._prices, float(item.sell_value))
+
+    #Marks a Recipe's row dead, or drops it from the queue if it hasn't been appended yet
+    def _kill(self, recipe):
+        row = self._row_of.pop(recipe, None)
+        if row is None:
+            if recipe in self._pending:
+                self._pending.remove(recipe)
+            return
+        self._rows[row] = None
+        self._alive[row] = False
+        self._dead += 1
+
+    #Sum of data * vector[indices] for each row of a CSR matrix
+    def _row_sums(self, matrix, vector):
+        indptr, indices, data = matrix
+        rows = len(indptr) - 1
+        row_ids = np.repeat(np.arange(rows), np.diff(indptr))
+        return np.bincount(row_ids, weights=data * vector[indices], minlength=rows)
+
+    #True for each row of a CSR matrix with an entry in a wanted column
+    def _rows_with(self, matrix, wanted):
+        indptr, indices, _ = matrix
+        rows = len(indptr) - 1
+        row_ids = np.repeat(np.arange(rows), np.diff(indptr))
+        return np.bincount(row_ids, weights=wanted[indices], minlength=rows) > 0
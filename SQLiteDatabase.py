@@ -0,0 +1,324 @@
+from Item import Item
+from Recipe import Recipe
+from CraftingDatabase import CraftingDatabase
+from collections.abc import Mapping
+import json
+import sqlite3
+
+# SQLiteCraftingDatabase is a CraftingDatabase stored in an SQLite file instead of memory
+# It has the same add/edit/remove, sell_value, calc_profit and recipes_that_* methods, with the same return values and listener events
+# Every change is written in its own transaction as it happens, so there is no save() step
+# Recipe inputs and outputs are normalized into their own tables, indexed by item_id, so consumer/producer lookups and
+# profits are answered by SQLite. Recipes are only built into Recipe objects when a query returns them,
+# so opening a large database doesn't read it
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    sell_value NUMERIC NOT NULL
+);
+CREATE TABLE IF NOT EXISTS recipes (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    type TEXT NOT NULL,
+    time REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS recipe_inputs (
+    recipe_id INTEGER NOT NULL REFERENCES recipes(id) ON DELETE CASCADE,
+    item_id TEXT NOT NULL REFERENCES items(id),
+    quantity INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (recipe_id, item_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS recipe_outputs (
+    recipe_id INTEGER NOT NULL REFERENCES recipes(id) ON DELETE CASCADE,
+    item_id TEXT NOT NULL REFERENCES items(id),
+    quantity INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (recipe_id, item_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS recipe_inputs_item ON recipe_inputs (item_id);
+CREATE INDEX IF NOT EXISTS recipe_outputs_item ON recipe_outputs (item_id);
+"""
+
+
+class SQLiteCraftingDatabase:
+    def __init__(self, filename:str, name=None):
+        self.filename = filename
+        self.conn = sqlite3.connect(filename)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+            if name is not None:
+                self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('name', ?)", (name,))
+
+        #Read-only views that query the file on access, standing in for CraftingDatabase's items and recipes
+        self.items = _ItemsView(self)
+        self.recipes = _RecipesView(self)
+
+        self._listeners = []
+
+    #Closes the connection, every change is already written
+    def close(self):
+        self.conn.close()
+
+    #Database name, kept in the meta table
+    @property
+    def name(self):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'name'").fetchone()
+        return row[0] if row else "Unnamed Database"
+
+    @name.setter
+    def name(self, value:str):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('name', ?)", (value,))
+
+    #Same listener interface as CraftingDatabase
+    def add_listener(self, listener):
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, event:str, *args):
+        for listener in self._listeners:
+            listener(event, *args)
+
+    #Does not allow adding duplicate items
+    #Returns a boolean success value and related message
+    def add_item(self, item:Item):
+        try:
+            with self.conn:
+                self.conn.execute("INSERT INTO items (id, name, sell_value) VALUES (?, ?, ?)", (item.id, item.name, item.sell_value))
+        except sqlite3.IntegrityError:
+            return False, "Item already exists"
+        self._notify("add_item", item)
+        return True, "Item successfully added"
+
+    #Does not allow adding duplicate recipes, checked against the unique recipe key
+    #Returns a boolean success value and related message
+    def add_recipe(self, recipe:Recipe):
+        if self._recipe_id(recipe) is not None:
+            return False, "Recipe already exists"
+
+        for item_id in recipe.input_ids:
+            if item_id not in self.items:
+                return False, f"Unknown input item '{item_id}'. Add it before adding the recipe."
+
+        for item_id in recipe.output_ids:
+            if item_id not in self.items:
+                return False, f"Unknown output item '{item_id}'. Add it before adding the recipe."
+
+        with self.conn:
+            self._insert_recipe(recipe)
+        self._notify("add_recipe", recipe)
+        return True, "Recipe successfully added"
+
+    #Removes given Item from items, provided it exists
+    def remove_item(self, item_id:str, cascade=False):
+        item = self.items.get(item_id)
+        if item is None:
+            return False, f"'{item_id}' not found"
+
+        recipes_that_include = list(dict.fromkeys(self.recipes_that_consume(item_id) + self.recipes_that_produce(item_id)))
+
+        if recipes_that_include and not cascade:
+            return False, "Item must not be in recipes, use cascade=true to force delete Item and included Recipes"
+
+        with self.conn:
+            self.conn.execute("""
+                DELETE FROM recipes WHERE id IN (
+                    SELECT recipe_id FROM recipe_inputs WHERE item_id = ?
+                    UNION SELECT recipe_id FROM recipe_outputs WHERE item_id = ?)
+                """, (item_id, item_id))
+            self.conn.execute("DELETE FROM items WHERE id = ?", (item_id,))
+        self._notify("remove_item", item, recipes_that_include)
+
+        if recipes_that_include:
+            return True, "Item and all included Recipes removed"
+        return True, "Item removed. No included Recipes found."
+
+    #Removes recipe from the database, provided it exists
+    def remove_recipe(self, recipe:Recipe):
+        with self.conn:
+            deleted = self.conn.execute("DELETE FROM recipes WHERE key = ?", (self._key_text(recipe),)).rowcount
+        if deleted:
+            self._notify("remove_recipe", recipe)
+            return True, "Recipe deleted"
+        return False, "Recipe not found"
+
+    #Updates an Item's name and/or sell_value, provided the item_id exists
+    #Item id CANNOT be changed, only removed
+    def edit_item(self, item_id: str, new_name=None, new_sell_value=None):
+        item = self.items.get(item_id)
+        if item is None:
+            return False, "Item not found"
+
+        old_name, old_sell_value = item.name, item.sell_value
+        if new_name is not None:
+            item.name = new_name
+        if new_sell_value is not None:
+            item.sell_value = new_sell_value
+
+        with self.conn:
+            self.conn.execute("UPDATE items SET name = ?, sell_value = ? WHERE id = ?", (item.name, item.sell_value, item_id))
+        self._notify("edit_item", item, old_name, old_sell_value)
+        return True, "Item updated"
+
+    #Updates a Recipe by removing and readding it in one transaction, provided it exists
+    #Does not allow editing a Recipe into a duplicate of another existing Recipe
+    def edit_recipe(self, old_recipe: Recipe, new_recipe: Recipe):
+        old_id = self._recipe_id(old_recipe)
+        if old_id is None:
+            return False, "Recipe not found"
+        if new_recipe != old_recipe and self._recipe_id(new_recipe) is not None:
+            return False, "Recipe already exists"
+
+        with self.conn:
+            self.conn.execute("DELETE FROM recipes WHERE id = ?", (old_id,))
+            self._insert_recipe(new_recipe)
+        self._notify("edit_recipe", old_recipe, new_recipe)
+        return True, "Recipe updated"
+
+    #Returns an item's sell_value, provided it's in the database
+    def sell_value(self, item_id:str):
+        row = self.conn.execute("SELECT sell_value FROM items WHERE id = ?", (item_id,)).fetchone()
+        if row is not None:
+            return True, row[0]
+        return False, -1
+
+    #Returns the "profit" from selling a recipe's outputs vs it's inputs, summed by SQLite
+    #Positive values means the output is worth more to sell
+    def calc_profit(self, recipe:Recipe) -> tuple [bool, int]:
+        recipe_id = self._recipe_id(recipe)
+        if recipe_id is None:
+            return False, -1
+
+        profit = self.conn.execute("""
+            SELECT
+                (SELECT COALESCE(SUM(i.sell_value * o.quantity), 0) FROM recipe_outputs o JOIN items i ON i.id = o.item_id WHERE o.recipe_id = ?)
+              - (SELECT COALESCE(SUM(i.sell_value * r.quantity), 0) FROM recipe_inputs r JOIN items i ON i.id = r.item_id WHERE r.recipe_id = ?)
+            """, (recipe_id, recipe_id)).fetchone()[0]
+        return True, profit
+
+    #Returns recipes which have item_id in their inputs, found through the recipe_inputs item index
+    def recipes_that_consume(self, item_id:str):
+        ids = [row[0] for row in self.conn.execute("SELECT recipe_id FROM recipe_inputs WHERE item_id = ? ORDER BY recipe_id", (item_id,))]
+        return self._load_recipes(ids)
+
+    #Returns recipes which have item_id in their outputs, found through the recipe_outputs item index
+    def recipes_that_produce(self, item_id:str):
+        ids = [row[0] for row in self.conn.execute("SELECT recipe_id FROM recipe_outputs WHERE item_id = ? ORDER BY recipe_id", (item_id,))]
+        return self._load_recipes(ids)
+
+    #Reads the whole file into an in-memory CraftingDatabase, for exporting to JSON with save()
+    def to_database(self):
+        return CraftingDatabase(items=dict(self.items), recipes=list(self.recipes), name=self.name)
+
+    #Creates (or adds to) an SQLite file from an in-memory CraftingDatabase in a single transaction
+    @classmethod
+    def from_database(cls, db:CraftingDatabase, filename:str):
+        sql_db = cls(filename, name=db.name)
+        with sql_db.conn:
+            sql_db.conn.executemany("INSERT INTO items (id, name, sell_value) VALUES (?, ?, ?)",
+                                    ((i.id, i.name, i.sell_value) for i in db.items.values()))
+            for recipe in db.recipes:
+                sql_db._insert_recipe(recipe)
+        return sql_db
+
+    #Recipe key as stored in the recipes table's unique key column
+    def _key_text(self, recipe:Recipe):
+        return json.dumps(recipe.key)
+
+    #Returns the row id of a stored recipe, or None if it isn't stored
+    def _recipe_id(self, recipe:Recipe):
+        row = self.conn.execute("SELECT id FROM recipes WHERE key = ?", (self._key_text(recipe),)).fetchone()
+        return row[0] if row else None
+
+    #Writes a recipe and its normalized inputs and outputs, inside the caller's transaction
+    def _insert_recipe(self, recipe:Recipe):
+        recipe_id = self.conn.execute("INSERT INTO recipes (key, type, time) VALUES (?, ?, ?)",
+                                      (self._key_text(recipe), recipe.type, recipe.time)).lastrowid
+        self.conn.executemany("INSERT INTO recipe_inputs (recipe_id, item_id, quantity, position) VALUES (?, ?, ?, ?)",
+                              ((recipe_id, item_id, qty, pos) for pos, (item_id, qty) in enumerate(recipe.input_items())))
+        self.conn.executemany("INSERT INTO recipe_outputs (recipe_id, item_id, quantity, position) VALUES (?, ?, ?, ?)",
+                              ((recipe_id, item_id, qty, pos) for pos, (item_id, qty) in enumerate(recipe.output_items())))
+        return recipe_id
+
+    #Builds Recipe objects for the given recipe row ids, keeping their order
+    def _load_recipes(self, ids:list[int]):
+        recipes = []
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            rows = {}
+            for recipe_id, recipe_type, time in self.conn.execute(f"SELECT id, type, time FROM recipes WHERE id IN ({marks})", chunk):
+                rows[recipe_id] = ({}, {}, recipe_type, time)
+            for table, slot in (("recipe_inputs", 0), ("recipe_outputs", 1)):
+                for recipe_id, item_id, qty in self.conn.execute(
+                        f"SELECT recipe_id, item_id, quantity FROM {table} WHERE recipe_id IN ({marks}) ORDER BY recipe_id, position", chunk):
+                    rows[recipe_id][slot][item_id] = qty
+            for recipe_id in chunk:
+                inputs, outputs, recipe_type, time = rows[recipe_id]
+                recipes.append(Recipe(inputs, outputs, type=recipe_type, time=time))
+        return recipes
+
+
+# Read-only item_id: Item mapping over the items table
+# Items returned are copies, change them through SQLiteCraftingDatabase.edit_item()
+class _ItemsView(Mapping):
+    def __init__(self, db:SQLiteCraftingDatabase):
+        self._db = db
+
+    def __getitem__(self, item_id):
+        row = self._db.conn.execute("SELECT id, name, sell_value FROM items WHERE id = ?", (item_id,)).fetchone()
+        if row is None:
+            raise KeyError(item_id)
+        return Item(*row)
+
+    def __contains__(self, item_id):
+        return self._db.conn.execute("SELECT 1 FROM items WHERE id = ?", (item_id,)).fetchone() is not None
+
+    def __iter__(self):
+        for row in self._db.conn.execute("SELECT id FROM items ORDER BY rowid"):
+            yield row[0]
+
+    def values(self):
+        for row in self._db.conn.execute("SELECT id, name, sell_value FROM items ORDER BY rowid"):
+            yield Item(*row)
+
+    def items(self):
+        for item in self.values():
+            yield item.id, item
+
+    def __len__(self):
+        return self._db.conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+
+# Read-only collection of stored Recipes, streamed from the recipes table in insertion order
+class _RecipesView:
+    def __init__(self, db:SQLiteCraftingDatabase):
+        self._db = db
+
+    def __contains__(self, recipe):
+        return isinstance(recipe, Recipe) and self._db._recipe_id(recipe) is not None
+
+    def __iter__(self):
+        last_id = 0
+        while True:
+            ids = [row[0] for row in self._db.conn.execute("SELECT id FROM recipes WHERE id > ? ORDER BY id LIMIT 500", (last_id,))]
+            if not ids:
+                return
+            yield from self._db._load_recipes(ids)
+            last_id = ids[-1]
+
+    def __len__(self):
+        return self._db.conn.execute("SELECT COUNT(*) FROM recipes").fetchone()[0]
@@ -0,0 +1,10 @@
+from CraftingDatabase import CraftingDatabase
+
+# JSON shapes shared by the command line tool and the QueryServer, so both answer the same query with the same value
+# Only the headless core is imported, so cli.py stays fast to start
+
+#{"inputs": {...}, "outputs": {...}, "type": "CRAFT", "time": 0.0, "profit": 2}, Recipe.to_dict() plus its profit
+def recipe_json(db:CraftingDatabase, recipe) -> dict:
+    data = recipe.to_dict()
+    data["profit"] = db.calc_profit(recipe)[1]
+    return data
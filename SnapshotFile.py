@@ -0,0 +1,366 @@
+from Item import Item
+from Recipe import Recipe
+from CraftingDatabase import CraftingDatabase
+from array import array
+from collections.abc import Mapping
+import mmap
+import os
+import struct
+import sys
+
+# SnapshotDatabase is a read-only CraftingDatabase backed by a compact binary snapshot file that is mmapped, not read
+# Items and Recipes are only decoded when a query returns them, and lookups, sell values and profits are answered straight
+# from the mapped arrays, so opening a snapshot of any size is instant and many processes opening the same file share one
+# copy of it through the OS page cache instead of each holding its own Items and Recipes
+#
+# File layout, all little endian and every section starting on an 8 byte boundary:
+#   Header: MAGIC, version, flags, the item, recipe, ingredient and string counts, then the offset of every section in SECTIONS
+#   String table: string_offsets (Q, strings + 1) into the strings UTF-8 blob. String i < items is Item i's id,
+#     items + i its name, 2 * items the database name, and the strings after it the Recipe types
+#   Items, in the database's order: item_values (q, or d when any sell_value isn't an int), and item_order (I) listing
+#     Item numbers sorted by id bytes, searched by bisection to find an item_id
+#   Recipes, in the database's order, as CSR arrays: recipe_offsets (Q, recipes + 1) into ingredient_items (I, Item numbers)
+#     and ingredient_quantities (q), inputs first then outputs, with recipe_inputs (I) inputs each,
+#     recipe_types (I, string numbers) and recipe_times (d)
+#   Indexes: consumer_offsets/producer_offsets (Q, items + 1) into consumer_rows/producer_rows (I, Recipe numbers)
+#
+#   SnapshotDatabase.write(db, "game.snap")
+#   with SnapshotDatabase("game.snap") as snap:
+#       snap.recipes_that_consume("iron_ore")
+
+MAGIC = b"CTTSNAP\0"
+VERSION = 1
+
+#Set in the header's flags when sell values are stored as doubles
+FLOAT_VALUES = 1
+
+SECTIONS = (
+    ("string_offsets", "Q"), ("strings", "B"),
+    ("item_values", None), ("item_order", "I"),
+    ("recipe_offsets", "Q"), ("recipe_inputs", "I"), ("ingredient_items", "I"), ("ingredient_quantities", "q"),
+    ("recipe_types", "I"), ("recipe_times", "d"),
+    ("consumer_offsets", "Q"), ("consumer_rows", "I"), ("producer_offsets", "Q"), ("producer_rows", "I"),
+)
+HEADER = struct.Struct(f"<8sII4Q{len(SECTIONS)}Q")
+
+class SnapshotDatabase:
+    def __init__(self, filename:str):
+        self.filename = filename
+        with open(filename, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._map) < HEADER.size:
+            self._map.close()
+            raise ValueError(f"'{filename}' is too short to be a snapshot")
+        magic, version, flags, items, recipes, ingredients, strings, *offsets = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"'{filename}' is not a version {VERSION} snapshot")
+
+        self.item_count = items
+        self.recipe_count = recipes
+        counts = {
+            "string_offsets": strings + 1, "strings": None, "item_values": items, "item_order": items,
+            "recipe_offsets": recipes + 1, "recipe_inputs": recipes, "ingredient_items": ingredients,
+            "ingredient_quantities": ingredients, "recipe_types": recipes, "recipe_times": recipes,
+            "consumer_offsets": items + 1, "consumer_rows": None, "producer_offsets": items + 1, "producer_rows": None,
+        }
+        self._strings_start = offsets[1]
+
+        #Every section as a memoryview over the mapping (a copy on big endian machines), set as an attribute of its name
+        self._views = []
+        try:
+            for i, (name, fmt) in enumerate(SECTIONS):
+                if fmt is None:
+                    fmt = "d" if flags & FLOAT_VALUES else "q"
+                if name == "strings":
+                    continue
+                count = counts[name]
+                if count is None:
+                    count = getattr(self, "_" + name.replace("_rows", "_offsets"))[-1]
+                setattr(self, "_" + name, self._section(offsets[i], fmt, count))
+            if self._strings_start + self._string_offsets[-1] > len(self._map):
+                raise ValueError(f"'{filename}' is truncated")
+        except ValueError:
+            self.close()
+            raise
+
+        #Read-only views standing in for CraftingDatabase's items and recipes
+        self.items = _ItemsView(self)
+        self.recipes = _RecipesView(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    #Unmaps the file, Items and Recipes already returned stay valid
+    def close(self):
+        for view in self._views:
+            view.release()
+        self._views.clear()
+        self._map.close()
+
+    @property
+    def name(self):
+        return self._string(2 * self.item_count)
+
+    #Returns an item's sell_value, provided it's in the snapshot
+    def sell_value(self, item_id:str):
+        index = self._item_index(item_id)
+        if index is None:
+            return False, -1
+        return True, self._item_values[index]
+
+    #Returns the "profit" from selling a recipe's outputs vs it's inputs, summed from the mapped arrays
+    #recipe may also be a Recipe number (its position in recipes), as returned by consumer_rows() and producer_rows()
+    #bool is an int subclass, but True isn't Recipe number 1
+    def calc_profit(self, recipe) -> tuple [bool, int]:
+        is_row = isinstance(recipe, int) and not isinstance(recipe, bool)
+        row = recipe if is_row and 0 <= recipe < self.recipe_count else self._row_of(recipe)
+        if row is None:
+            return False, -1
+
+        values = self._item_values
+        items = self._ingredient_items
+        quantities = self._ingredient_quantities
+        start, end = self._recipe_offsets[row], self._recipe_offsets[row + 1]
+        split = start + self._recipe_inputs[row]
+        input_cost = 0
+        for k in range(start, split):
+            input_cost += values[items[k]] * quantities[k]
+        output_cost = 0
+        for k in range(split, end):
+            output_cost += values[items[k]] * quantities[k]
+        return True, output_cost - input_cost
+
+    #Returns recipes which have item_id in their inputs, decoding only those Recipes
+    def recipes_that_consume(self, item_id:str):
+        return [self.recipe(row) for row in self.consumer_rows(item_id)]
+
+    def recipes_that_produce(self, item_id:str):
+        return [self.recipe(row) for row in self.producer_rows(item_id)]
+
+    #Recipe numbers of the recipes that consume or produce item_id, read from the mapped index without decoding any Recipe
+    def consumer_rows(self, item_id:str):
+        return self._index_rows(item_id, self._consumer_offsets, self._consumer_rows)
+
+    def producer_rows(self, item_id:str):
+        return self._index_rows(item_id, self._producer_offsets, self._producer_rows)
+
+    #Decodes Recipe number row
+    def recipe(self, row:int) -> Recipe:
+        start, end = self._recipe_offsets[row], self._recipe_offsets[row + 1]
+        split = start + self._recipe_inputs[row]
+        ids = [self._string(self._ingredient_items[k]) for k in range(start, end)]
+        quantities = self._ingredient_quantities[start:end].tolist()
+        return Recipe._from_trusted_dict({
+            "inputs": dict(zip(ids[:split - start], quantities[:split - start])),
+            "outputs": dict(zip(ids[split - start:], quantities[split - start:])),
+            "type": self._string(self._recipe_types[row]),
+            "time": self._recipe_times[row],
+        })
+
+    #Decodes the whole snapshot into an in-memory CraftingDatabase
+    def to_database(self):
+        return CraftingDatabase(items=dict(self.items), recipes=list(self.recipes), name=self.name)
+
+    #Writes a snapshot of db to filename and opens it
+    @classmethod
+    def from_database(cls, db:CraftingDatabase, filename:str):
+        cls.write(db, filename)
+        return cls(filename)
+
+    #Writes a snapshot of db to filename, through a temporary file moved over the old one once complete like save()
+    @staticmethod
+    def write(db:CraftingDatabase, filename:str):
+        items = list(db.items.values())
+        number = {item.id: i for i, item in enumerate(items)}
+        strings = [item.id for item in items] + [item.name for item in items] + [db.name]
+        type_numbers = {}
+
+        float_values = not all(isinstance(item.sell_value, int) for item in items)
+        sections = {name: array(fmt or ("d" if float_values else "q")) for name, fmt in SECTIONS}
+        sections["item_values"].extend(item.sell_value for item in items)
+        encoded_ids = [item.id.encode("utf-8") for item in items]
+        sections["item_order"].extend(sorted(range(len(items)), key=encoded_ids.__getitem__))
+
+        offsets = sections["recipe_offsets"]
+        offsets.append(0)
+        consumers = [[] for _ in items]
+        producers = [[] for _ in items]
+        for row, recipe in enumerate(db.recipes):
+            inputs = [number[item_id] for item_id in recipe.input_ids]
+            outputs = [number[item_id] for item_id in recipe.output_ids]
+            for k in inputs:
+                consumers[k].append(row)
+            for k in outputs:
+                producers[k].append(row)
+            sections["ingredient_items"].extend(inputs + outputs)
+            sections["ingredient_quantities"].extend(q for _i, q in recipe.input_items())
+            sections["ingredient_quantities"].extend(q for _i, q in recipe.output_items())
+            offsets.append(len(sections["ingredient_items"]))
+            sections["recipe_inputs"].append(len(inputs))
+            if recipe.type not in type_numbers:
+                type_numbers[recipe.type] = len(strings)
+                strings.append(recipe.type)
+            sections["recipe_types"].append(type_numbers[recipe.type])
+            sections["recipe_times"].append(recipe.time)
+
+        for index, name in ((consumers, "consumer"), (producers, "producer")):
+            offsets = sections[f"{name}_offsets"]
+            rows = sections[f"{name}_rows"]
+            offsets.append(0)
+            for recipe_rows in index:
+                rows.extend(recipe_rows)
+                offsets.append(len(rows))
+
+        blob = bytearray()
+        string_offsets = sections["string_offsets"]
+        string_offsets.append(0)
+        for text in strings:
+            blob += text.encode("utf-8")
+            string_offsets.append(len(blob))
+        sections["strings"] = array("B", blob)
+
+        temp_filename = f"{filename}.tmp"
+        try:
+            with open(temp_filename, "wb") as f:
+                position = HEADER.size
+                section_offsets = []
+                f.write(b"\0" * HEADER.size)
+                for name, _fmt in SECTIONS:
+                    data = sections[name]
+                    if sys.byteorder != "little":
+                        data.byteswap()
+                    padding = -position % 8
+                    f.write(b"\0" * padding)
+                    position += padding
+                    section_offsets.append(position)
+                    f.write(data.tobytes())
+                    position += len(data) * data.itemsize
+
+                f.seek(0)
+                f.write(HEADER.pack(MAGIC, VERSION, FLOAT_VALUES if float_values else 0, len(items), len(db.recipes),
+                                    len(sections["ingredient_items"]), len(strings), *section_offsets))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_filename, filename)
+        except BaseException:
+            if os.path.exists(temp_filename):
+                os.remove(temp_filename)
+            raise
+
+    #count values of format fmt starting at offset, mapped in place on little endian machines
+    def _section(self, offset:int, fmt:str, count:int):
+        size = struct.calcsize(fmt) * count
+        if offset + size > len(self._map):
+            raise ValueError(f"'{self.filename}' is truncated")
+        if sys.byteorder != "little":
+            data = array(fmt, self._map[offset:offset + size])
+            data.byteswap()
+            return memoryview(data)
+        view = memoryview(self._map)[offset:offset + size].cast(fmt)
+        self._views.append(view)
+        return view
+
+    #String number i, read straight from the mapped blob
+    def _string(self, i:int) -> str:
+        start = self._strings_start
+        return self._map[start + self._string_offsets[i]:start + self._string_offsets[i + 1]].decode("utf-8")
+
+    #Item number of item_id, bisecting item_order by id bytes, or None if it isn't in the snapshot
+    def _item_index(self, item_id:str):
+        if not isinstance(item_id, str):
+            return None
+        key = item_id.encode("utf-8")
+        order = self._item_order
+        offsets = self._string_offsets
+        start = self._strings_start
+        low, high = 0, len(order)
+        while low < high:
+            middle = (low + high) // 2
+            i = order[middle]
+            if self._map[start + offsets[i]:start + offsets[i + 1]] < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(order):
+            i = order[low]
+            if self._map[start + offsets[i]:start + offsets[i + 1]] == key:
+                return i
+        return None
+
+    def _index_rows(self, item_id:str, offsets, rows):
+        index = self._item_index(item_id)
+        if index is None:
+            return []
+        return rows[offsets[index]:offsets[index + 1]].tolist()
+
+    #Recipe number of a Recipe equal to recipe, found among the recipes producing (or consuming) one of its items, or None
+    def _row_of(self, recipe):
+        if not isinstance(recipe, Recipe):
+            return None
+        item_id = (recipe.output_ids or recipe.input_ids or (None,))[0]
+        candidates = self.producer_rows(item_id) if recipe.output_ids else self.consumer_rows(item_id)
+        for row in candidates:
+            if self._recipe_times[row] == recipe.time and self.recipe(row) == recipe:
+                return row
+        return None
+
+
+# Read-only item_id: Item mapping over the snapshot's Items, decoding an Item each time one is returned
+class _ItemsView(Mapping):
+    def __init__(self, db:SnapshotDatabase):
+        self._db = db
+
+    def __getitem__(self, item_id):
+        index = self._db._item_index(item_id)
+        if index is None:
+            raise KeyError(item_id)
+        return self._item(index)
+
+    def __contains__(self, item_id):
+        return self._db._item_index(item_id) is not None
+
+    def __iter__(self):
+        for i in range(self._db.item_count):
+            yield self._db._string(i)
+
+    def values(self):
+        for i in range(self._db.item_count):
+            yield self._item(i)
+
+    def items(self):
+        for item in self.values():
+            yield item.id, item
+
+    def __len__(self):
+        return self._db.item_count
+
+    def _item(self, index:int) -> Item:
+        db = self._db
+        return Item(db._string(index), db._string(db.item_count + index), db._item_values[index])
+
+
+# Read-only collection of the snapshot's Recipes in the database's order, decoded as they are iterated
+class _RecipesView:
+    def __init__(self, db:SnapshotDatabase):
+        self._db = db
+
+    def __contains__(self, recipe):
+        return self._db._row_of(recipe) is not None
+
+    def __iter__(self):
+        for row in range(self._db.recipe_count):
+            yield self._db.recipe(row)
+
+    def __getitem__(self, row:int):
+        if not 0 <= row < self._db.recipe_count:
+            raise IndexError(row)
+        return self._db.recipe(row)
+
+    def __len__(self):
+        return self._db.recipe_count
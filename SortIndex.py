@@ -0,0 +1,133 @@
+import bisect
+from itertools import groupby
+from operator import itemgetter
+from CraftingDatabase import CraftingDatabase
+
+# SortIndex keeps the database's Recipes sorted by each of MainWindow's sort keys, so refreshing the Recipes list
+# doesn't re-sort (and recompute keys for) every Recipe each time
+# Each sort key has a list of (key, seq) entries kept sorted with bisect, where seq is a number given to every Recipe
+# when it is added. Equal keys keep the order Recipes were added in, the same order a stable sort of db.recipes gives
+# A key's list is only built the first time it is asked for, and from then on is updated by the database's listener events:
+# added/removed/edited Recipes are inserted/removed, and editing an Item only re-keys the Recipes that use it
+
+class SortIndex:
+    KEYS = ("profit", "time", "type", "inputs", "outputs")
+
+    def __init__(self, db:CraftingDatabase):
+        self.db = db
+        self._key_funcs = {
+            "profit": lambda r: self.db.calc_profit(r)[1],
+            "time": lambda r: r.time,
+            "type": lambda r: r.type,
+            "inputs": lambda r: self._names(r.input_ids),
+            "outputs": lambda r: self._names(r.output_ids),
+        }
+        self._reset()
+        self.db.add_listener(self.on_change)
+
+    #Stops listening to the database, for when the SortIndex is no longer needed
+    def close(self):
+        self.db.remove_listener(self.on_change)
+
+    #Returns every Recipe ordered by key, one of KEYS, or only the first limit of them
+    #Descending order reverses the keys but, like sort(reverse=True), keeps equal keys in the order they were added
+    def sorted_recipes(self, key:str, descending=False, limit=None):
+        if key not in self._key_funcs:
+            raise ValueError(f"Unknown sort key '{key}', expected one of {', '.join(self.KEYS)}")
+        entries = self._entries(key)
+        recipes = self._recipes
+
+        if not descending:
+            return [recipes[seq] for _key, seq in entries[:limit]]
+
+        ordered = []
+        for _key, run in groupby(reversed(entries), key=itemgetter(0)):
+            if limit is not None and len(ordered) >= limit:
+                break
+            ordered.extend(recipes[seq] for _key, seq in reversed(list(run)))
+        return ordered[:limit]
+
+    #Database listener, inserts, removes and re-keys only the Recipes a change touches
+    def on_change(self, event:str, *args):
+        if event == "add_recipe":
+            self._insert(args[0])
+        elif event == "remove_recipe":
+            self._remove(args[0])
+        elif event == "edit_recipe":
+            self._remove(args[0])
+            self._insert(args[1])
+        elif event == "remove_item":
+            for recipe in args[1]:
+                self._remove(recipe)
+        elif event == "edit_item":
+            item, old_name, old_sell_value = args
+            consumers = self.db.recipes_that_consume(item.id)
+            producers = self.db.recipes_that_produce(item.id)
+            if item.name != old_name:
+                self._rekey("inputs", consumers)
+                self._rekey("outputs", producers)
+            if item.sell_value != old_sell_value:
+                self._rekey("profit", list(dict.fromkeys(consumers + producers)))
+        elif event != "add_item":
+            self._reset()
+
+    #Drops every list, they are rebuilt from the database when next asked for
+    def _reset(self):
+        #seq: Recipe and Recipe: seq, in the order Recipes were added
+        self._recipes = {}
+        self._seqs = {}
+        for seq, recipe in enumerate(self.db.recipes):
+            self._recipes[seq] = recipe
+            self._seqs[recipe] = seq
+        self._next_seq = len(self._recipes)
+
+        #key name: sorted [(key, seq)] and key name: {seq: key}, only for the lists built so far
+        self._sorted = {}
+        self._keys = {}
+
+    #The sorted list for a key name, built on first use
+    def _entries(self, name:str):
+        entries = self._sorted.get(name)
+        if entries is None:
+            func = self._key_funcs[name]
+            keys = {seq: func(recipe) for seq, recipe in self._recipes.items()}
+            entries = sorted((key, seq) for seq, key in keys.items())
+            self._sorted[name] = entries
+            self._keys[name] = keys
+        return entries
+
+    def _insert(self, recipe):
+        seq = self._next_seq
+        self._next_seq += 1
+        self._recipes[seq] = recipe
+        self._seqs[recipe] = seq
+        for name, entries in self._sorted.items():
+            key = self._key_funcs[name](recipe)
+            self._keys[name][seq] = key
+            bisect.insort(entries, (key, seq))
+
+    def _remove(self, recipe):
+        seq = self._seqs.pop(recipe, None)
+        if seq is None:
+            return
+        del self._recipes[seq]
+        for name, entries in self._sorted.items():
+            key = self._keys[name].pop(seq)
+            del entries[bisect.bisect_left(entries, (key, seq))]
+
+    #Moves recipes to their new place in one list, if that list has been built
+    def _rekey(self, name:str, recipes):
+        entries = self._sorted.get(name)
+        if entries is None:
+            return
+        keys = self._keys[name]
+        func = self._key_funcs[name]
+        for recipe in recipes:
+            seq = self._seqs[recipe]
+            del entries[bisect.bisect_left(entries, (keys[seq], seq))]
+            keys[seq] = func(recipe)
+            bisect.insort(entries, (keys[seq], seq))
+
+    #"Copper Ore, Iron Ore" for ('iron', 'copper'), names joined in item_id order like MainWindow shows them
+    def _names(self, item_ids):
+        return ", ".join(self.db.items[i].name for i in sorted(item_ids))
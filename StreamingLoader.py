@@ -0,0 +1,175 @@
+from Item import Item
+from Recipe import Recipe
+from CraftingDatabase import CraftingDatabase, CHECKSUM_TRAILER, CHECKSUM_TRAILER_LENGTH
+import codecs
+import hashlib
+import json
+import os
+import re
+
+WHITESPACE = re.compile(r"[ \t\r\n]*")
+SEPARATOR = re.compile(r"[ \t\r\n]*([,\]}])")
+
+# StreamingLoader reads a saved CraftingDatabase JSON file a chunk at a time, building each Item and Recipe as soon as
+# its entry has been read, so only one chunk and the entry being parsed are held as text instead of the whole file
+# Top level keys may come in any order, and unknown keys are skipped
+# In trusted mode Recipes are built without validation. The file's checksum (see CraftingDatabase.save()) is checked at the end,
+# and if it doesn't match, every Recipe is validated after all, so an untrusted file still raises the usual errors
+
+class StreamingLoader:
+    def __init__(self, filename:str, trusted=False, progress=None, chunk_size=1 << 20):
+        self.filename = filename
+        self.trusted = trusted
+        self.progress = progress
+        self.chunk_size = chunk_size
+
+    #Parses the file into a new database of type cls
+    def load(self, cls=CraftingDatabase):
+        self._total = os.path.getsize(self.filename)
+        self._read = 0
+        self._hashed_limit = self._total - CHECKSUM_TRAILER_LENGTH
+        self._digest = hashlib.sha256()
+        self._tail = b""
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+        db = cls()
+        with open(self.filename, "rb") as self._file:
+            self._expect("{")
+            if not self._next_is("}"):
+                while True:
+                    key = self._value()
+                    self._expect(":")
+                    if key == "items":
+                        self._load_items(db)
+                    elif key == "recipes":
+                        self._load_recipes(db)
+                    elif key == "name":
+                        db.name = self._value()
+                    else:
+                        self._value()
+                    if self._next_is("}"):
+                        break
+                    self._expect(",")
+
+            # Reads whatever is left, so the checksum covers the whole file
+            while not self._eof:
+                self._fill()
+
+        if self.trusted and not self._checksum_matches():
+            self._validate(db)
+        return db
+
+    #Runs the checks trusted mode skipped, for a file whose checksum didn't match
+    def _validate(self, db:CraftingDatabase):
+        for item_id, item in db.items.items():
+            if item_id != item.id:
+                raise ValueError(f"Dictionary key '{item_id}' does not match Item.id '{item.id}'")
+        for recipe in db.recipes:
+            recipe.validate()
+
+    #Reads the "items" object one item_id: Item entry at a time
+    def _load_items(self, db:CraftingDatabase):
+        self._expect("{")
+        if self._next_is("}"):
+            return
+        while True:
+            item_id = self._value()
+            self._expect(":")
+            item = Item.from_dict(self._value())
+            if not self.trusted and item_id != item.id:
+                raise ValueError(f"Dictionary key '{item_id}' does not match Item.id '{item.id}'")
+            db.items[item_id] = item
+            if self._separator("}"):
+                return
+
+    #Reads the "recipes" list one Recipe at a time, duplicates collapse like in the CraftingDatabase constructor
+    def _load_recipes(self, db:CraftingDatabase):
+        self._expect("[")
+        if self._next_is("]"):
+            return
+        build = Recipe._from_trusted_dict if self.trusted else Recipe.from_dict
+        while True:
+            recipe = build(self._value())
+            if recipe not in db.recipes:
+                db._insert_recipe(recipe)
+            if self._separator("]"):
+                return
+
+    #Decodes the next JSON value, reading more chunks until it is complete
+    #A value ending exactly at the end of the buffer may be a cut off number, so it is only accepted once more data (or EOF) follows
+    def _value(self):
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buffer, self._pos)
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill()
+
+    #Consumes the "," between entries or the closing character, returning True if the container closed
+    #Entries are usually followed by their separator in the same chunk, so this tries a single regex match first
+    def _separator(self, close:str) -> bool:
+        match = SEPARATOR.match(self._buffer, self._pos)
+        if match is not None and match.group(1) in (",", close):
+            self._pos = match.end()
+            return match.group(1) == close
+        if self._next_is(close):
+            return True
+        self._expect(",")
+        return False
+
+    #Consumes the next non-whitespace character, which must be char
+    def _expect(self, char:str):
+        if not self._next_is(char):
+            found = self._buffer[self._pos:self._pos + 20] if self._pos < len(self._buffer) else "end of file"
+            raise json.JSONDecodeError(f"Expected '{char}', found '{found}'", self._buffer, self._pos)
+
+    #Consumes the next non-whitespace character only if it is char
+    def _next_is(self, char:str) -> bool:
+        self._skip_whitespace()
+        if self._pos < len(self._buffer) and self._buffer[self._pos] == char:
+            self._pos += 1
+            return True
+        return False
+
+    def _skip_whitespace(self):
+        while True:
+            self._pos = WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer) or self._eof:
+                return
+            self._fill()
+
+    #Reads the next chunk, dropping the already parsed part of the buffer and hashing everything before the checksum trailer
+    def _fill(self):
+        chunk = self._file.read(self.chunk_size)
+        if not chunk:
+            self._eof = True
+            self._buffer = self._buffer[self._pos:] + self._decoder.decode(b"", final=True)
+            self._pos = 0
+            return
+
+        if self.trusted:
+            hashed = max(0, min(len(chunk), self._hashed_limit - self._read))
+            self._digest.update(chunk[:hashed])
+            self._tail += chunk[hashed:]
+
+        self._read += len(chunk)
+        self._buffer = self._buffer[self._pos:] + self._decoder.decode(chunk)
+        self._pos = 0
+
+        if self.progress is not None:
+            self.progress(self._read, self._total)
+
+    #True if the file ends with a checksum trailer matching the hash of everything before it
+    def _checksum_matches(self) -> bool:
+        if self._hashed_limit < 0:
+            return False
+        return self._tail == CHECKSUM_TRAILER.format(self._digest.hexdigest()).encode("utf-8")
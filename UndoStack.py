@@ -0,0 +1,194 @@
+from collections import deque
+from Item import Item
+from CraftingDatabase import CraftingDatabase
+
+# UndoStack records every change made to a CraftingDatabase as a small record, and undoes/redoes it by making the inverse change
+# Records only hold what the change touched: Item values as (id, name, sell_value) tuples, since Items are edited in place,
+# and the Recipes themselves, which never change once created. Undoing the removal of an Item with 100 Recipes costs 100 Recipes,
+# never a copy of the whole database
+# Only the last limit changes are kept. Redo history is dropped as soon as a new change is made
+# Changes the stack doesn't know how to invert clear the history, since older records could no longer be applied
+# After every undo/redo, last_touched holds the item_ids and Recipes it added, removed or edited, so a view only has to
+# redraw those
+
+class UndoStack:
+    def __init__(self, db:CraftingDatabase, limit=200):
+        self.db = db
+        self.limit = limit
+
+        #Records oldest first, each one (event, data). The oldest undo record falls off once there are limit of them
+        self._undo = deque(maxlen=limit)
+        self._redo = []
+
+        #Set while undoing/redoing, so the changes made to do it aren't recorded as new ones
+        self._applying = False
+
+        #(item_ids, Recipes) the last undo/redo touched, empty until one is made
+        self.last_touched = (set(), set())
+
+        self.db.add_listener(self.on_change)
+
+    #Stops recording, for when the stack is no longer needed
+    def close(self):
+        self.db.remove_listener(self.on_change)
+
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+
+    #Database listener, turns every change into a record
+    def on_change(self, event:str, *args):
+        if self._applying:
+            return
+
+        if event in ("add_item", "edit_item"):
+            item = args[0]
+            data = (_values(item),) + args[1:]
+        elif event == "remove_item":
+            item, removed_recipes = args
+            data = (_values(item), list(removed_recipes))
+        elif event in ("add_recipe", "remove_recipe", "edit_recipe", "bulk_add_recipes"):
+            data = args
+        elif event == "bulk_add_items":
+            data = ([_values(item) for item in args[0]],)
+        elif event == "bulk_remove":
+            removed_items, removed_recipes = args
+            data = ([_values(item) for item in removed_items], list(removed_recipes))
+        else:
+            self.clear()
+            return
+
+        self._undo.append((event, data))
+        self._redo.clear()
+
+    #Undoes the last change, returning a boolean success value and related message
+    def undo(self):
+        self.last_touched = (set(), set())
+        if not self._undo:
+            return False, "Nothing to undo"
+        record = self._undo.pop()
+        self.last_touched = _touched(record)
+        success, msg = self._apply(record, undo=True)
+        if not success:
+            self.clear()
+            return False, f"Could not undo {_describe(record)}: {msg}"
+        self._redo.append(record)
+        return True, f"Undid {_describe(record)}"
+
+    #Redoes the last undone change, returning a boolean success value and related message
+    def redo(self):
+        self.last_touched = (set(), set())
+        if not self._redo:
+            return False, "Nothing to redo"
+        record = self._redo.pop()
+        self.last_touched = _touched(record)
+        success, msg = self._apply(record, undo=False)
+        if not success:
+            self.clear()
+            return False, f"Could not redo {_describe(record)}: {msg}"
+        self._undo.append(record)
+        return True, f"Redid {_describe(record)}"
+
+    #Makes the inverse of a recorded change, or the change again, through the database's own methods
+    def _apply(self, record, undo:bool):
+        event, data = record
+        db = self.db
+        self._applying = True
+        try:
+            if event == "add_item":
+                return db.remove_item(data[0][0]) if undo else db.add_item(Item(*data[0]))
+
+            if event == "edit_item":
+                (item_id, name, sell_value), old_name, old_sell_value = data
+                if undo:
+                    return db.edit_item(item_id, new_name=old_name, new_sell_value=old_sell_value)
+                return db.edit_item(item_id, new_name=name, new_sell_value=sell_value)
+
+            if event == "remove_item":
+                values, removed_recipes = data
+                if not undo:
+                    return db.remove_item(values[0], cascade=True)
+                success, msg = db.add_item(Item(*values))
+                if success and removed_recipes:
+                    success, results = db.bulk_add_recipes(removed_recipes)
+                    msg = _first_failure(results)
+                return success, msg
+
+            if event == "add_recipe":
+                return db.remove_recipe(data[0]) if undo else db.add_recipe(data[0])
+
+            if event == "remove_recipe":
+                return db.add_recipe(data[0]) if undo else db.remove_recipe(data[0])
+
+            if event == "edit_recipe":
+                old_recipe, new_recipe = data
+                return db.edit_recipe(new_recipe, old_recipe) if undo else db.edit_recipe(old_recipe, new_recipe)
+
+            if event == "bulk_add_items":
+                if undo:
+                    success, results = db.bulk_remove([values[0] for values in data[0]])
+                else:
+                    success, results = db.bulk_add_items([Item(*values) for values in data[0]])
+                return success, _first_failure(results)
+
+            if event == "bulk_add_recipes":
+                if undo:
+                    success, results = db.bulk_remove(recipes=data[0])
+                else:
+                    success, results = db.bulk_add_recipes(data[0])
+                return success, _first_failure(results)
+
+            if event == "bulk_remove":
+                values, removed_recipes = data
+                if not undo:
+                    success, results = db.bulk_remove([v[0] for v in values], removed_recipes, cascade=True)
+                    return success, _first_failure(results)
+                success, results = db.bulk_add_items([Item(*v) for v in values])
+                if success:
+                    success, results = db.bulk_add_recipes(removed_recipes)
+                return success, _first_failure(results)
+        finally:
+            self._applying = False
+
+
+#(id, name, sell_value) of an Item as it is now
+def _values(item:Item) -> tuple:
+    return (item.id, item.name, item.sell_value)
+
+#Message of the first failed entry in a bulk method's results, or "" if none failed
+def _first_failure(results) -> str:
+    return next((msg for success, msg in results if not success), "")
+
+#(item_ids, Recipes) a record adds, removes or edits, the same whether it is undone or redone
+def _touched(record) -> tuple:
+    event, data = record
+    if event in ("add_item", "edit_item"):
+        return {data[0][0]}, set()
+    if event == "remove_item":
+        return {data[0][0]}, set(data[1])
+    if event == "bulk_add_items":
+        return {values[0] for values in data[0]}, set()
+    if event == "bulk_remove":
+        return {values[0] for values in data[0]}, set(data[1])
+    if event == "bulk_add_recipes":
+        return set(), set(data[0])
+    return set(), set(data)
+
+#"add Item 'iron'", "add 3 Recipes", shown in undo/redo messages
+def _describe(record) -> str:
+    event, data = record
+    if event in ("add_item", "edit_item", "remove_item"):
+        return f"{event.split('_')[0]} Item '{data[0][0]}'"
+    if event in ("add_recipe", "remove_recipe", "edit_recipe"):
+        return f"{event.split('_')[0]} Recipe"
+    if event == "bulk_add_items":
+        return f"add {len(data[0])} Items"
+    if event == "bulk_add_recipes":
+        return f"add {len(data[0])} Recipes"
+    return f"remove {len(data[0])} Items and {len(data[1])} Recipes"
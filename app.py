@@ -4,16 +4,38 @@ from Recipe import Recipe
 from CraftingDatabase import CraftingDatabase
 from ItemDialog import ItemDialog
 from RecipeDialog import RecipeDialog, IngredientRow
-from PySide6.QtWidgets import QSpinBox, QSizePolicy, QComboBox, QLineEdit, QFileDialog, QListWidgetItem, QDialog, QMessageBox, QInputDialog, QApplication, QMainWindow, QWidget, QPushButton, QVBoxLayout, QLabel, QTabWidget, QListWidget, QHBoxLayout
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QColor, QBrush, QFont
+from SortIndex import SortIndex
+from UndoStack import UndoStack
+from Metrics import metrics, timed
+from BackgroundTask import BackgroundTask, TaskCancelled
+from ListModels import ItemListModel, RecipeListModel, ItemFilterProxy, RecipeFilterProxy
+from PySide6.QtWidgets import QCheckBox, QTableWidget, QTableWidgetItem, QSpinBox, QSizePolicy, QComboBox, QLineEdit, QFileDialog, QListView, QProgressDialog, QDialog, QMessageBox, QApplication, QMainWindow, QWidget, QPushButton, QVBoxLayout, QLabel, QTabWidget, QHBoxLayout
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtGui import QKeySequence, QShortcut
 
 class MainWindow(QMainWindow):
+
+    # How often a database with a file and unsaved changes is saved in the background
+    AUTOSAVE_INTERVAL_MS = 5 * 60 * 1000
+
     def __init__(self):
         super().__init__()
 
-        # Main Database
+        # Main Database, the file it was last loaded from or saved to, and whether it changed since
         self.db = CraftingDatabase()
+        self.db_filename = None
+        self.unsaved_changes = False
+        self.db.add_listener(self.on_db_changed)
+
+        # Loads and saves running in the background, kept referenced until they finish
+        self.tasks = set()
+        self.autosave_task = None
+
+        # Maintained Recipe sort orders, kept up to date by the database's change events
+        self.sort_index = SortIndex(self.db)
+
+        # Undo/redo history of the database's changes
+        self.undo_stack = UndoStack(self.db)
 
         #Main window title and default size
         self.setWindowTitle("Crafting Database GUI")
@@ -28,6 +50,11 @@ class MainWindow(QMainWindow):
         self.build_recipes_tab()
         self.build_options_tab()
         self.wire_signals()
+
+        # Autosave timer, autosaves run in the background so editing can go on
+        self.autosave_timer = QTimer(self)
+        self.autosave_timer.timeout.connect(self.autosave)
+        self.autosave_timer.start(self.AUTOSAVE_INTERVAL_MS)
         
     def build_items_tab(self):
 
@@ -77,8 +104,14 @@ class MainWindow(QMainWindow):
         # Keep the buttons in place
         self.item_sort_layout.addStretch()
         
-        # Add the Items list
-        self.items_list = QListWidget()
+        # Add the Items list, a view over the Items model through the name filter
+        # Rows all have the same height, so Qt can lay out 100k rows without measuring each one
+        self.items_model = ItemListModel(self.db, parent=self)
+        self.items_proxy = ItemFilterProxy(parent=self)
+        self.items_proxy.setSourceModel(self.items_model)
+        self.items_list = QListView()
+        self.items_list.setModel(self.items_proxy)
+        self.items_list.setUniformItemSizes(True)
         self.items_layout.addWidget(self.items_list)
 
         # Add the buttons below for adding/editing/removing items
@@ -138,7 +171,7 @@ class MainWindow(QMainWindow):
         self.recipe_filter_layout.addWidget(self.recipe_filter_label)        
         
         # Item selector using a modified IngredientRow to only select existing items
-        self.recipe_filter_item = IngredientRow(self.db.items, parent=self)
+        self.recipe_filter_item = IngredientRow(self.db.items, parent=self, name_index=self.db.name_index)
         self.recipe_filter_item.qty_spin.deleteLater()
         self.recipe_filter_item.remove_btn.deleteLater()
         self.recipe_filter_item.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
@@ -157,8 +190,13 @@ class MainWindow(QMainWindow):
         self.recipe_filter_clear_btn.setFixedHeight(25)
         self.recipe_filter_layout.addWidget(self.recipe_filter_clear_btn)
 
-        # Add the Recipe list
-        self.recipes_list = QListWidget()
+        # Add the Recipe list, a view over the Recipes model through the Item filter
+        self.recipes_model = RecipeListModel(self.db, parent=self)
+        self.recipes_proxy = RecipeFilterProxy(parent=self)
+        self.recipes_proxy.setSourceModel(self.recipes_model)
+        self.recipes_list = QListView()
+        self.recipes_list.setModel(self.recipes_proxy)
+        self.recipes_list.setUniformItemSizes(True)
         self.recipes_layout.addWidget(self.recipes_list)
 
         # Add the buttons below for adding/editing/removing recipes
@@ -215,21 +253,52 @@ class MainWindow(QMainWindow):
         # Set default font size to 10
         self.font_size_selector.setValue(10)
 
+        # Diagnostics label, and a switch for recording how long database operations and list refreshes take
+        self.diagnostics_label = QLabel("Diagnostics")
+        self.diagnostics_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.options_layout.addWidget(self.diagnostics_label)
+        self.metrics_check = QCheckBox("Record operation timings")
+        self.options_layout.addWidget(self.metrics_check)
+
+        # Table of recorded operations, and the time split between Qt list population and database work
+        self.metrics_table = QTableWidget(0, 5)
+        self.metrics_table.setHorizontalHeaderLabels(["Operation", "Calls", "Total ms", "p50 ms", "p99 ms"])
+        self.metrics_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.metrics_table.verticalHeader().setVisible(False)
+        self.options_layout.addWidget(self.metrics_table)
+        self.metrics_split_label = QLabel()
+        self.options_layout.addWidget(self.metrics_split_label)
+
+        # Refresh/Reset/Export buttons, and a button starting and stopping a cProfile capture
+        self.metrics_buttons = QHBoxLayout()
+        self.metrics_refresh_btn = QPushButton("Refresh")
+        self.metrics_reset_btn = QPushButton("Reset")
+        self.metrics_export_btn = QPushButton("Export...")
+        self.profile_btn = QPushButton("Start profiling")
+        self.metrics_buttons.addWidget(self.metrics_refresh_btn)
+        self.metrics_buttons.addWidget(self.metrics_reset_btn)
+        self.metrics_buttons.addWidget(self.metrics_export_btn)
+        self.metrics_buttons.addWidget(self.profile_btn)
+        self.options_layout.addLayout(self.metrics_buttons)
+
         # Keep buttons in place
         self.options_layout.addStretch()
 
     def wire_signals(self):
-        
+
+        # The refresh methods are wrapped by @timed, which would pass a signal's arguments on to them, so they are
+        # connected through lambdas that drop the arguments
+
         # Item sort options auto-refresh
-        self.item_sort_combo.currentIndexChanged.connect(self.refresh_items_list)
-        self.item_sort_dir.currentIndexChanged.connect(self.refresh_items_list)
+        self.item_sort_combo.currentIndexChanged.connect(lambda *_: self.refresh_items_list())
+        self.item_sort_dir.currentIndexChanged.connect(lambda *_: self.refresh_items_list())
 
-        # Item filter text auto-refresh
-        self.items_filter_text.textChanged.connect(self.refresh_items_list)
+        # Item filter text only re-filters the existing rows
+        self.items_filter_text.textChanged.connect(lambda *_: self.refresh_items_filter())
         self.items_filter_clear_btn.clicked.connect(lambda: self.items_filter_text.setText(""))
 
         # Double click an Item to instantly see it's Recipes
-        self.items_list.itemDoubleClicked.connect(self.go_to_recipe)
+        self.items_list.doubleClicked.connect(self.go_to_recipe)
 
         # Item add/edit/remove buttons
         self.items_add.clicked.connect(self.add_item)
@@ -237,12 +306,12 @@ class MainWindow(QMainWindow):
         self.items_remove.clicked.connect(self.remove_item)
 
         # Recipe sort options auto-refresh
-        self.recipe_sort_combo.currentIndexChanged.connect(self.refresh_recipes_list)
-        self.recipe_sort_dir.currentIndexChanged.connect(self.refresh_recipes_list)
+        self.recipe_sort_combo.currentIndexChanged.connect(lambda *_: self.refresh_recipes_list())
+        self.recipe_sort_dir.currentIndexChanged.connect(lambda *_: self.refresh_recipes_list())
 
-        # Recipe filter options auto-refresh
-        self.recipe_filter_item.item_combo.currentIndexChanged.connect(self.refresh_recipes_list)
-        self.recipe_filter_type.currentIndexChanged.connect(self.refresh_recipes_list)
+        # Recipe filter options only re-filter the existing rows
+        self.recipe_filter_item.item_combo.currentIndexChanged.connect(lambda *_: self.refresh_recipes_filter())
+        self.recipe_filter_type.currentIndexChanged.connect(lambda *_: self.refresh_recipes_filter())
         self.recipe_filter_clear_btn.clicked.connect(self.clear_recipe_filter)
        
         # Recipe add/edit/remove buttons
@@ -259,6 +328,17 @@ class MainWindow(QMainWindow):
 
         # Options font size changer
         self.font_size_selector.valueChanged.connect(self.set_font_size)
+
+        # Options diagnostics switch and buttons
+        self.metrics_check.toggled.connect(self.toggle_metrics)
+        self.metrics_refresh_btn.clicked.connect(self.refresh_metrics)
+        self.metrics_reset_btn.clicked.connect(self.reset_metrics)
+        self.metrics_export_btn.clicked.connect(self.export_metrics)
+        self.profile_btn.clicked.connect(self.toggle_profile)
+
+        # Undo/redo shortcuts for the whole window, text fields with focus still handle their own
+        self.undo_shortcut = QShortcut(QKeySequence("Ctrl+Z"), self, self.undo)
+        self.redo_shortcut = QShortcut(QKeySequence("Ctrl+Y"), self, self.redo)
         
     def add_item(self):
 
@@ -283,13 +363,13 @@ class MainWindow(QMainWindow):
     def edit_item(self):
 
         # Get current selected item, abort if no item selected
-        selected = self.items_list.currentRow()
-        if selected < 0:
+        selected = self.items_list.currentIndex()
+        if not selected.isValid():
             print("No item selected")
             return
 
         # Items are stored in Qt.UserRole
-        item = self.items_list.item(selected).data(Qt.UserRole)
+        item = selected.data(Qt.UserRole)
         item_id = item.id
 
         # Create a window for editing item params, but preloaded with existing values
@@ -319,15 +399,16 @@ class MainWindow(QMainWindow):
     def remove_item(self):
 
         # Get current selected item, abort if no item selected
-        selected = self.items_list.currentRow()
-        if selected < 0:
+        selected = self.items_list.currentIndex()
+        if not selected.isValid():
             print("No item selected")
             return
+        item_id = selected.data(Qt.UserRole).id
         
         # Since Recipes rely on their inputs/outputs actually existing, only Items not used in Recipes may be removed
 
         # Attempt to remove the item without cascading (removing related Recipes)
-        success, msg = self.db.remove_item(self.items_list.item(selected).data(Qt.UserRole).id, cascade=False)
+        success, msg = self.db.remove_item(item_id, cascade=False)
 
         # Item exists in at least one recipe
         if not success:
@@ -342,7 +423,7 @@ class MainWindow(QMainWindow):
         
             # User selected yes, remove all Item's recipes and the Item itself
             if reply == QMessageBox.Yes:
-                success, msg = self.db.remove_item(self.items_list.item(selected).data(Qt.UserRole).id, cascade=True)
+                success, msg = self.db.remove_item(item_id, cascade=True)
             else:
                 return
             
@@ -354,14 +435,12 @@ class MainWindow(QMainWindow):
         else:
             QMessageBox.warning(self,"Error", msg)
 
-    def go_to_recipe(self, item_widget):
+    def go_to_recipe(self, index):
         
-        # Loop through items in recipe tab's items an look for matching data, then set to current index
-        for i in range(self.recipe_filter_item.item_combo.count()):
-           
-           if item_widget.data(Qt.UserRole).id == self.recipe_filter_item.item_combo.itemData(i):
-               self.recipe_filter_item.item_combo.setCurrentIndex(i)
-               break
+        # Look up the double clicked Item in the recipe tab's item selector and set it as the current index
+        i = self.recipe_filter_item.item_combo.findData(index.data(Qt.UserRole).id)
+        if i >= 0:
+            self.recipe_filter_item.item_combo.setCurrentIndex(i)
             
         # Switch to recipe tab
         self.tabs.setCurrentWidget(self.recipes_tab)
@@ -369,7 +448,7 @@ class MainWindow(QMainWindow):
     def add_recipe(self):
 
         # Create a window for editing Recipe params
-        dialog = RecipeDialog(self.db.items, parent=self)
+        dialog = RecipeDialog(self.db.items, parent=self, name_index=self.db.name_index)
 
         # If the Dialog runs successfully
         if dialog.exec() == QDialog.Accepted:
@@ -385,16 +464,16 @@ class MainWindow(QMainWindow):
     def edit_recipe(self):
 
         # Get currently selected Recipe, abort if no Recipe selected
-        selected = self.recipes_list.currentRow()
-        if selected < 0:
+        selected = self.recipes_list.currentIndex()
+        if not selected.isValid():
             print("No recipe selected")
             return
 
         # Recipe is stored in UserRole
-        recipe = self.recipes_list.item(selected).data(Qt.UserRole)
+        recipe = selected.data(Qt.UserRole)
 
         # Create a window for editing Recipe params, but preloaded with existing values
-        dialog = RecipeDialog(self.db.items, recipe=recipe, parent=self, title="Edit Recipe")
+        dialog = RecipeDialog(self.db.items, recipe=recipe, parent=self, title="Edit Recipe", name_index=self.db.name_index)
         
         #If the dialog runs successfully
         if dialog.exec() == QDialog.Accepted:
@@ -409,13 +488,13 @@ class MainWindow(QMainWindow):
     def remove_recipe(self):
 
         #Get currently selected Recipe, abort if no Recipe selected
-        selected = self.recipes_list.currentRow()
-        if selected < 0:
+        selected = self.recipes_list.currentIndex()
+        if not selected.isValid():
             print("No recipe selected")
             return
 
         # Remove Recipe, no additional logic required like with Items
-        success, msg = self.db.remove_recipe(self.recipes_list.item(selected).data(Qt.UserRole))
+        success, msg = self.db.remove_recipe(selected.data(Qt.UserRole))
         
         # If successful, refresh Recipe list
         if success:
@@ -424,31 +503,36 @@ class MainWindow(QMainWindow):
         else:
             QMessageBox.warning(self, "Error", msg)
 
+    @timed("ui.refresh_items_list")
     def refresh_items_list(self):
         
-        # Clear the items list
-        self.items_list.clear()
-
-        filter_text = self.items_filter_text.text().lower().strip()
-
-        # Gets current items in list of tuples
-        for i in self.get_sorted_items():
-
-            # If filter text is non-empty, skip items that don't match
-            if filter_text and filter_text not in i[1].name.lower():
-                continue
-
-            # Format item display name
-            list_item = QListWidgetItem(f"{i[1].name} (${i[1].sell_value})")
-
-            # Set UserRole to the Item obj itself
-            list_item.setData(Qt.UserRole, i[1])
-
-            # Add item to list widget
-            self.items_list.addItem(list_item)
+        # Hand the sorted item_ids to the model, rows are only formatted once they are on screen
+        with metrics.timer("db.sorted_items"):
+            item_ids = [item_id for item_id, _item in self.get_sorted_items()]
+        with metrics.timer("qt.items_model"):
+            self.items_model.set_rows(item_ids, db=self.db)
+        self.refresh_items_filter()
         
         # Also update the list of items in the recipe tab's item drop-down (the modified IngredientRow), to ensure they stay synced
-        self.recipe_filter_item.refresh_items(self.db.items)
+        with metrics.timer("db.name_index"):
+            name_index = self.db.name_index
+        with metrics.timer("qt.recipe_filter_items"):
+            self.recipe_filter_item.refresh_items(self.db.items, name_index=name_index)
+
+    @timed("ui.refresh_items_filter")
+    def refresh_items_filter(self):
+
+        # Look up the Items whose name contains the filter text in the database's name index
+        # If none do, show the closest names instead, so typos still find something
+        text = self.items_filter_text.text()
+        with metrics.timer("db.name_index"):
+            allowed = self.db.name_index.matching(text)
+            if allowed is not None and not allowed:
+                allowed = set(self.db.name_index.search(text, limit=50))
+
+        # The proxy hides the other rows without touching the model
+        with metrics.timer("qt.items_filter"):
+            self.items_proxy.set_allowed(allowed)
         
     def get_sorted_items(self):
 
@@ -467,93 +551,46 @@ class MainWindow(QMainWindow):
         
         return sorted_items
 
+    @timed("ui.refresh_recipes_list")
     def refresh_recipes_list(self):
     
-        # Clear the recipes list
-        self.recipes_list.clear()
+        # Hand the sorted Recipes to the model, rows are only formatted and colored once they are on screen
+        with metrics.timer("db.sorted_recipes"):
+            recipes = self.get_sorted_recipes()
+        with metrics.timer("qt.recipes_model"):
+            self.recipes_model.set_rows(recipes, db=self.db)
+        self.refresh_recipes_filter()
 
-        # Grab both the item to filter by and whether to use Inputs/Outputs/Both
-        item_filter = self.recipe_filter_item.item_combo
-        type_filter = self.recipe_filter_type
-
-        # Get current Recipes in a list of Recipe objects
-        for r in self.get_sorted_recipes():
-           
-            # Formats and colors the Recipe into a string to insert into the list widget
-            item = self.create_recipe_list_item(r)
-
-            # Stores the Recipe onj itself into UserRole
-            item.setData(Qt.UserRole, r)
-            
-            # If the item filter has no data, do not filter items
-            # Otherwise, use Recipe's consumes() and produces() with the item_filter's current item to determine if it gets added
-            if not item_filter.currentData():
-                self.recipes_list.addItem(item)
-            elif type_filter.currentText() == "Both":
-                if r.consumes(item_filter.currentData()) or r.produces(item_filter.currentData()):
-                    self.recipes_list.addItem(item)
-            elif type_filter.currentText() == "Inputs":
-                if r.consumes(item_filter.currentData()):
-                    self.recipes_list.addItem(item)
-            elif type_filter.currentText() == "Outputs":
-                if r.produces(item_filter.currentData()):
-                    self.recipes_list.addItem(item)
-                
-    def create_recipe_list_item(self, recipe):
-        
-        # Format inputs and outputs
-        inputs_str = ", ".join(f"{qty}x {self.db.items[i].name}" for i, qty in sorted(recipe.inputs.items()))
-        outputs_str = ", ".join(f"{qty}x {self.db.items[i].name}" for i, qty in sorted(recipe.outputs.items()))
-
-        # Type and time
-        type_str = recipe.type
-        time_str = f"{recipe.time}s"
-
-        # Profit
-        success, profit = self.db.calc_profit(recipe)
-        profit_str = f"Profit: {profit}" if success else "Profit: N/A"
-
-        # Full display text
-        display_text = f"{type_str}: {inputs_str} → {outputs_str} | {time_str} | {profit_str}"
-       
-        # Create the widget
-        list_item = QListWidgetItem(display_text)
-        list_item.setData(Qt.UserRole, recipe)
+    @timed("ui.refresh_recipes_filter")
+    def refresh_recipes_filter(self):
 
-        # Coloring using QBrush, based on the total sell_values of the inputs and outputs
-        # Green is profitable, red is a net loss, black is break-even
-        if success:
-            if profit > 0:
-                list_item.setForeground(QBrush(QColor("green")))
-            elif profit < 0:
-                list_item.setForeground(QBrush(QColor("red")))
-            else:
-                list_item.setForeground(QBrush(QColor("black")))
-
-        return list_item
+        # Grab both the item to filter by and whether to use Inputs/Outputs/Both
+        item_filter = self.recipe_filter_item.item_combo.currentData()
+        type_filter = self.recipe_filter_type.currentText()
+
+        # If the item filter has data, look up the matching Recipes in the database's consumer/producer indexes
+        # instead of calling Recipe's consumes() and produces() on every Recipe
+        allowed = None
+        if item_filter:
+            matches = []
+            if type_filter in ("Both", "Inputs"):
+                matches += self.db.recipes_that_consume(item_filter)
+            if type_filter in ("Both", "Outputs"):
+                matches += self.db.recipes_that_produce(item_filter)
+            allowed = set(matches)
+
+        # The proxy hides the other rows without touching the model
+        with metrics.timer("qt.recipes_filter"):
+            self.recipes_proxy.set_allowed(allowed)
 
     def get_sorted_recipes(self):
-        
-        # Grab current Recipes
-        recipes = list(self.db.recipes)
 
         # Grab current sort criteria and direction
         key = self.recipe_sort_combo.currentText()
         descending = self.recipe_sort_dir.currentText() == "Descending"
 
-        # Sort based on key and direction using built-in .sort()
-        if key == "Profit":
-            recipes.sort(key=lambda r: self.db.calc_profit(r), reverse=descending)
-        if key == "Time":
-            recipes.sort(key=lambda r: r.time, reverse=descending)
-        if key == "Type":
-            recipes.sort(key=lambda r: r.type, reverse=descending)
-        if key == "Inputs":
-            recipes.sort(key=lambda r: ", ".join(self.db.items[i].name for i in sorted(r.inputs)), reverse=descending)
-        if key == "Outputs":
-            recipes.sort(key=lambda r: ", ".join(self.db.items[i].name for i in sorted(r.outputs)), reverse=descending)
-
-        return recipes
+        # The SortIndex keeps every order sorted as Recipes and Items change, so nothing is re-sorted here
+        return self.sort_index.sorted_recipes(key.lower(), descending=descending)
 
     def clear_recipe_filter(self):
 
@@ -583,13 +620,23 @@ class MainWindow(QMainWindow):
         # Don't save empty filename
         if not filename:
             return
-    
-        # Run database's save() method and display a window saying whether it succeeded
-        try:
-            self.db.save(filename)
+
+        # Display a window saying whether it succeeded
+        def saved(_result):
+            self.db_filename = filename
             QMessageBox.information(self, "Save Database", f"Database saved as '{filename}'")
-        except Exception as e:
-            QMessageBox.critical(self, "Save Error", str(e))
+
+        def failed(e):
+            self.unsaved_changes = True
+            if isinstance(e, TaskCancelled):
+                QMessageBox.information(self, "Save Database", "Save cancelled, the file was not changed")
+            else:
+                QMessageBox.critical(self, "Save Error", str(e))
+    
+        # Run a snapshot's save() method in the background, so edits made while it saves don't end up half written
+        snapshot = self.db.snapshot()
+        self.unsaved_changes = False
+        self.run_task(lambda report: snapshot.save(filename, progress=report), "Saving database...", saved, failed)
     
     def load_database(self):
 
@@ -604,28 +651,221 @@ class MainWindow(QMainWindow):
         # Don't open an empty filename
         if not filename:
             return
-        
-        # Run CraftingDatabase's load() method to create a database, set it's name, and refresh the Item and Recipe lists and display a window saying whether it succeeded
-        try:
-            self.db = CraftingDatabase.load(filename)
-            self.db_name_edit.setText(self.db.name)
+
+        # Only swap in the loaded database once it is complete, then display a window saying it succeeded
+        def loaded(db):
+            self.set_database(db, filename)
             QMessageBox.information(self, "Load Database", f"Database loaded from '{filename}'")
-            self.refresh_items_list()
-            self.refresh_recipes_list()
-        except FileNotFoundError:
-            QMessageBox.warning(self, "Load Error", f"File '{filename}' not found")
-        except Exception as e:
-            QMessageBox.critical(self, "Load Error", str(e))
+
+        # On failure or cancel the current database is left as it was
+        def failed(e):
+            if isinstance(e, TaskCancelled):
+                return
+            if isinstance(e, FileNotFoundError):
+                QMessageBox.warning(self, "Load Error", f"File '{filename}' not found")
+            else:
+                QMessageBox.critical(self, "Load Error", str(e))
+
+        # Run CraftingDatabase's load() method in the background
+        self.run_task(lambda report: CraftingDatabase.load(filename, progress=report), "Loading database...", loaded, failed)
+
+    def set_database(self, db, filename=None):
+
+        # Swap in a new database and everything built on the old one, set it's name, and refresh the Item and Recipe lists
+        self.db.remove_listener(self.on_db_changed)
+        self.sort_index.close()
+        self.undo_stack.close()
+        self.db = db
+        self.db.add_listener(self.on_db_changed)
+        self.sort_index = SortIndex(self.db)
+        self.undo_stack = UndoStack(self.db)
+        self.db_filename = filename
+        self.db_name_edit.setText(self.db.name)
+        self.unsaved_changes = False
+        self.refresh_items_list()
+        self.refresh_recipes_list()
+
+    def run_task(self, func, title, on_finished, on_failed, dialog=True):
+
+        # Run func(report) in a BackgroundTask, calling on_finished(result) or on_failed(exception) on the main thread
+        task = BackgroundTask(func)
+        self.tasks.add(task)
+
+        # Progress dialog with a cancel button, only shown if the task takes more than a moment
+        if dialog:
+            progress = QProgressDialog(title, "Cancel", 0, 100, self)
+            progress.setWindowModality(Qt.WindowModal)
+            progress.setMinimumDuration(300)
+            # Called through a lambda so it runs on the main thread right away, see BackgroundTask.cancel()
+            progress.canceled.connect(lambda: task.cancel())
+
+            # -1 means the total is unknown, shown as a busy bar
+            def show_progress(percent):
+                if percent < 0:
+                    progress.setRange(0, 0)
+                else:
+                    progress.setValue(percent)
+            task.progress.connect(show_progress)
+        else:
+            progress = None
+
+        def finish(callback, value):
+            self.tasks.discard(task)
+            if progress is not None:
+                progress.reset()
+            callback(value)
+
+        task.finished.connect(lambda result: finish(on_finished, result))
+        task.failed.connect(lambda e: finish(on_failed, e))
+        task.start()
+        return task
+
+    def autosave(self):
+
+        # Only autosave a database with a file and unsaved changes, and never start a second autosave over a running one
+        if self.db_filename is None or not self.unsaved_changes or self.autosave_task is not None:
+            return
+
+        def done(_result):
+            self.autosave_task = None
+
+        def failed(e):
+            self.autosave_task = None
+            self.unsaved_changes = True
+            self.statusBar().showMessage(f"Autosave failed: {e}", 5000)
+
+        # Saves a snapshot without a progress dialog, edits made meanwhile are saved by the next autosave
+        snapshot = self.db.snapshot()
+        filename = self.db_filename
+        self.unsaved_changes = False
+        self.autosave_task = self.run_task(lambda report: snapshot.save(filename, progress=report), "Autosaving...", done, failed, dialog=False)
+
+    def on_db_changed(self, event, *args):
+
+        # Any change to the database is picked up by the next autosave
+        self.unsaved_changes = True
+
+    def undo(self):
+        self.step_history(self.undo_stack.undo)
+
+    def redo(self):
+        self.step_history(self.undo_stack.redo)
+
+    def step_history(self, step):
+
+        # Say what was undone/redone in the status bar, and refresh the rows it touched
+        _success, msg = step()
+        self.statusBar().showMessage(msg, 5000)
+        item_ids, recipes = self.undo_stack.last_touched
+        if item_ids or recipes:
+            self.refresh_changed(item_ids, recipes)
+
+    def refresh_changed(self, item_ids, recipes):
+
+        # Recipes using a touched Item show its name and value, so they are redrawn too
+        recipes = set(recipes)
+        for item_id in item_ids:
+            if item_id in self.db.items:
+                recipes.update(self.db.recipes_that_consume(item_id))
+                recipes.update(self.db.recipes_that_produce(item_id))
+
+        # The models only insert, remove and redraw the touched rows, unless the change moved other rows too
+        if item_ids:
+            self.items_model.update_rows([item_id for item_id, _item in self.get_sorted_items()], item_ids)
+            if self.items_filter_text.text().strip():
+                self.refresh_items_filter()
+
+            # The Recipe tab's item drop-down is rebuilt, keeping the Item it filters by if that still exists
+            combo = self.recipe_filter_item.item_combo
+            selected = combo.currentData()
+            self.recipe_filter_item.refresh_items(self.db.items, name_index=self.db.name_index)
+            if selected is not None and combo.findData(selected) >= 0:
+                combo.setCurrentIndex(combo.findData(selected))
+        if recipes:
+            self.recipes_model.update_rows(self.get_sorted_recipes(), recipes)
+            if self.recipe_filter_item.item_combo.currentData():
+                self.refresh_recipes_filter()
+
+    def toggle_metrics(self, checked):
+
+        # Database methods are only wrapped with timers while recording is on
+        if checked:
+            metrics.enable()
+        else:
+            metrics.disable()
+        self.refresh_metrics()
+
+    def refresh_metrics(self):
+
+        # One row per recorded operation, slowest total first
+        summary = sorted(metrics.summary().items(), key=lambda entry: entry[1]["total_ms"], reverse=True)
+        self.metrics_table.setRowCount(len(summary))
+        for row, (name, stats) in enumerate(summary):
+            values = [name, str(stats["calls"])] + [f"{stats[key]:.3f}" for key in ("total_ms", "p50_ms", "p99_ms")]
+            for column, value in enumerate(values):
+                self.metrics_table.setItem(row, column, QTableWidgetItem(value))
+
+        # Qt list population against database work, each operation only counted once even when nested
+        categories = metrics.categories()
+        self.metrics_split_label.setText(
+            f"Qt list population: {categories.get('qt', 0):.1f} ms, database work: {categories.get('db', 0):.1f} ms"
+        )
+
+    def reset_metrics(self):
+        metrics.reset()
+        self.refresh_metrics()
+
+    def export_metrics(self):
+
+        # Open a window for file explorer, and write the timings as JSON
+        filename, _ = QFileDialog.getSaveFileName(self, "Export Timings", "timings.json", "JSON Files (*.json)")
+        if not filename:
+            return
+        try:
+            metrics.export(filename)
+        except OSError as e:
+            QMessageBox.critical(self, "Export Error", str(e))
+
+    def toggle_profile(self):
+
+        # The first click starts a cProfile capture, the second asks where to save it as a pstats file
+        if not metrics.profiling():
+            metrics.start_profile()
+            self.profile_btn.setText("Stop profiling and save...")
+            return
+        filename, _ = QFileDialog.getSaveFileName(self, "Save Profile", "profile.pstats", "Profile Stats (*.pstats)")
+        self.profile_btn.setText("Start profiling")
+        if not filename:
+            metrics.stop_profile()
+            return
+        try:
+            metrics.stop_profile(filename)
+        except OSError as e:
+            QMessageBox.critical(self, "Profile Error", str(e))
+
+    def closeEvent(self, event):
+
+        # Stop loads and saves still running before the window closes, a cancelled save leaves the old file as it was
+        for task in list(self.tasks):
+            task.cancel()
+            task.thread.wait()
+        super().closeEvent(event)
 
     def on_db_name_changed(self, text):
 
         # Change database's name
         self.db.name = text.strip()
+        self.unsaved_changes = True
+
+def main():
+
+    # Make stuff run
+    app = QApplication(sys.argv)
 
-# Make stuff run
-app = QApplication(sys.argv)
+    window = MainWindow()
+    window.show()
 
-window = MainWindow()
-window.show()
+    return app.exec()
 
-sys.exit(app.exec())
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())
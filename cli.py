@@ -0,0 +1,132 @@
+import argparse
+import sys
+from CraftingDatabase import CraftingDatabase
+from Serialization import recipe_json
+
+# Command line tool for querying a saved database without starting the GUI
+# Only the headless core (Item, Recipe, CraftingDatabase) is imported up front, and nothing imports Qt or numpy,
+# so it starts fast enough to be called in scripting loops. Query commands load the file in trusted mode, which only
+# validates it if its checksum shows this app didn't write it
+#
+#   python cli.py profit game.json --top 10
+#   python cli.py consumers game.json iron
+#   python cli.py producers game.json iron_ingot
+#   python cli.py bom game.json iron_gear --quantity 5
+#   python cli.py validate game.json
+#
+# Every command takes --json to print machine readable output instead of text
+# Exit codes: 0 success, 1 the query failed (unknown Item, invalid database), 2 the file couldn't be read
+
+#CRAFT: 4x Iron Ore → 2x Iron Ingot | 3.0s | Profit: 2, like MainWindow's Recipes list shows it
+def recipe_text(db:CraftingDatabase, recipe) -> str:
+    inputs_str = ", ".join(f"{qty}x {db.items[i].name}" for i, qty in sorted(recipe.input_items()))
+    outputs_str = ", ".join(f"{qty}x {db.items[i].name}" for i, qty in sorted(recipe.output_items()))
+    success, profit = db.calc_profit(recipe)
+    profit_str = f"Profit: {profit}" if success else "Profit: N/A"
+    return f"{recipe.type}: {inputs_str} → {outputs_str} | {recipe.time}s | {profit_str}"
+
+#Each command returns (exit code, text lines, JSON value)
+
+def profit(db:CraftingDatabase, args):
+    ranked = sorted(db.recipes, key=lambda r: db.calc_profit(r)[1], reverse=not args.ascending)
+    if args.top is not None:
+        ranked = ranked[:args.top]
+    return 0, [recipe_text(db, r) for r in ranked], [recipe_json(db, r) for r in ranked]
+
+def consumers(db:CraftingDatabase, args):
+    return _recipes_of(db, args.item, db.recipes_that_consume)
+
+def producers(db:CraftingDatabase, args):
+    return _recipes_of(db, args.item, db.recipes_that_produce)
+
+def _recipes_of(db:CraftingDatabase, item_id:str, lookup):
+    if item_id not in db.items:
+        return 1, [f"'{item_id}' not found"], {"error": f"'{item_id}' not found"}
+    recipes = lookup(item_id)
+    return 0, [recipe_text(db, r) for r in recipes], [recipe_json(db, r) for r in recipes]
+
+def bom(db:CraftingDatabase, args):
+
+    #Imported here since only this command needs it
+    from BillOfMaterials import BillOfMaterials
+    bill = BillOfMaterials(db)
+    success, materials = bill.expand(args.item, args.quantity)
+    if not success:
+        return 1, [materials], {"error": materials}
+    success, cost = bill.raw_cost(args.item, args.quantity)
+
+    lines = [f"{qty:g}x {db.items[raw_id].name} ({raw_id})" for raw_id, qty in sorted(materials.items())]
+    lines.append(f"Raw cost: {cost:g}")
+    return 0, lines, {"materials": materials, "raw_cost": cost}
+
+#Checks the file the way loading untrusted data does, plus that every Recipe only uses Items that exist
+def validate(db:CraftingDatabase, args):
+    problems = []
+    for recipe in db.recipes:
+        for item_id in list(recipe.input_ids) + list(recipe.output_ids):
+            if item_id not in db.items:
+                problems.append(f"Recipe '{recipe!r}' uses unknown item '{item_id}'")
+
+    summary = f"{len(db.items)} items, {len(db.recipes)} recipes, {len(problems)} problems"
+    return (1 if problems else 0), problems + [summary], {
+        "items": len(db.items),
+        "recipes": len(db.recipes),
+        "problems": problems,
+    }
+
+COMMANDS = {
+    "profit": profit,
+    "consumers": consumers,
+    "producers": producers,
+    "bom": bom,
+    "validate": validate,
+}
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="cli.py", description="Query a crafting database file without the GUI")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def command(name, help):
+        sub = commands.add_parser(name, help=help)
+        sub.add_argument("file", help="database JSON file")
+        sub.add_argument("--json", action="store_true", help="print JSON instead of text")
+        return sub
+
+    sub = command("profit", "list Recipes by profit, most profitable first")
+    sub.add_argument("--top", type=int, help="only list this many Recipes")
+    sub.add_argument("--ascending", action="store_true", help="least profitable first")
+
+    sub = command("consumers", "list the Recipes that use an Item")
+    sub.add_argument("item", help="item_id")
+
+    sub = command("producers", "list the Recipes that make an Item")
+    sub.add_argument("item", help="item_id")
+
+    sub = command("bom", "list the raw Items it takes to craft an Item")
+    sub.add_argument("item", help="item_id")
+    sub.add_argument("--quantity", type=float, default=1)
+
+    command("validate", "check that the file loads and every Recipe uses existing Items")
+    return parser
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+
+    try:
+        db = CraftingDatabase.load(args.file, trusted=args.command != "validate")
+    except (OSError, ValueError, TypeError, KeyError) as e:
+        print(f"Could not load '{args.file}': {e}", file=sys.stderr)
+        return 2
+
+    code, lines, value = COMMANDS[args.command](db, args)
+    if args.json:
+        import json
+        print(json.dumps(value, indent=2))
+    else:
+        out = sys.stdout if code == 0 else sys.stderr
+        for line in lines:
+            print(line, file=out)
+    return code
+
+if __name__ == "__main__":
+    sys.exit(main())
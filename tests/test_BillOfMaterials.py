@@ -0,0 +1,129 @@
+import random
+
+import pytest
+
+from BillOfMaterials import BillOfMaterials
+from CraftingDatabase import CraftingDatabase
+from Item import Item
+from Recipe import Recipe
+
+
+#Plain recursive expansion through each Item's first producing Recipe, None if the tree has a cycle
+def brute_force(db, item_id, path=()):
+    if item_id in path:
+        return None
+    producers = db.recipes_that_produce(item_id)
+    if not producers:
+        return {item_id: 1.0}
+    recipe = producers[0]
+    per_craft = dict(recipe.output_items())[item_id]
+    materials = {}
+    for input_id, qty in recipe.input_items():
+        below = brute_force(db, input_id, path + (item_id,))
+        if below is None:
+            return None
+        for raw_id, raw_qty in below.items():
+            materials[raw_id] = materials.get(raw_id, 0.0) + raw_qty * qty / per_craft
+    return materials
+
+def check_matches(db, bom):
+    fresh = BillOfMaterials(db)
+    for item_id in db.items:
+        expected = brute_force(db, item_id)
+        success, materials = bom.expand(item_id, 3)
+        assert success == (expected is not None), item_id
+        assert fresh.expand(item_id, 3)[0] == success, item_id
+        if success:
+            assert materials == pytest.approx({raw_id: qty * 3 for raw_id, qty in expected.items()}), item_id
+            assert fresh.expand(item_id, 3)[1] == pytest.approx(materials), item_id
+    fresh.close()
+
+#Recipes only take inputs from Items with a lower number unless cycles are allowed, so most trees are acyclic
+def random_recipe(rnd, item_ids, cycles):
+    output_at = rnd.randrange(1, len(item_ids))
+    sources = item_ids if cycles else item_ids[:output_at]
+    sources = [item_id for item_id in sources if item_id != item_ids[output_at]]
+    inputs = {item_id: rnd.randint(1, 4) for item_id in rnd.sample(sources, min(len(sources), rnd.randint(1, 3)))}
+    outputs = {item_ids[output_at]: rnd.randint(1, 3)}
+    if rnd.random() < 0.3:
+        byproduct = rnd.choice(item_ids)
+        if byproduct not in inputs:
+            outputs[byproduct] = outputs.get(byproduct, 0) + 1
+    return Recipe(inputs, outputs)
+
+#Makes random edits to a random database, checking after each one that the memoized expansions kept up to date by
+#the listener agree with a plain recursive expansion and with a BillOfMaterials built from scratch
+def check_random_edits(seed, steps, cycles):
+    rnd = random.Random(seed)
+    db = CraftingDatabase()
+    for i in range(rnd.randint(4, 9)):
+        db.add_item(Item(f"i{i}", f"I{i}", rnd.randint(0, 20)))
+    bom = BillOfMaterials(db)
+
+    for step in range(steps):
+        item_ids = sorted(db.items, key=lambda item_id: int(item_id[1:]))
+        roll = rnd.random()
+        if roll < 0.4:
+            recipe = random_recipe(rnd, item_ids, cycles)
+            if recipe not in db.recipes:
+                db.add_recipe(recipe)
+        elif roll < 0.55 and db.recipes:
+            db.remove_recipe(rnd.choice(list(db.recipes)))
+        elif roll < 0.7 and db.recipes:
+            recipe = random_recipe(rnd, item_ids, cycles)
+            if recipe not in db.recipes:
+                db.edit_recipe(rnd.choice(list(db.recipes)), recipe)
+        elif roll < 0.8:
+            recipes = {random_recipe(rnd, item_ids, cycles) for _ in range(rnd.randint(1, 3))}
+            db.bulk_add_recipes([recipe for recipe in recipes if recipe not in db.recipes])
+        elif roll < 0.9 and len(item_ids) > 3:
+            db.remove_item(rnd.choice(item_ids[1:]), cascade=True)
+        elif len(item_ids) > 3:
+            db.bulk_remove(rnd.sample(item_ids[1:], 2), cascade=True)
+        if len(db.items) < 4:
+            db.add_item(Item(f"n{step}", "x", 1))
+        check_matches(db, bom)
+    bom.close()
+
+
+@pytest.mark.parametrize("seed", range(150))
+def test_random_acyclic_edits_match_recursive_expansion(seed):
+    check_random_edits(seed, 30, cycles=False)
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_random_edits_with_cycles_match_recursive_expansion(seed):
+    check_random_edits(seed, 30, cycles=True)
+
+
+def test_expand_scales_by_output_quantity():
+    db = CraftingDatabase()
+    for item_id, value in (("iron", 1), ("coal", 1), ("iron_ingot", 5), ("steel", 20)):
+        db.add_item(Item(item_id, item_id, value))
+    db.add_recipe(Recipe({"iron": 4}, {"iron_ingot": 2}))
+    db.add_recipe(Recipe({"iron_ingot": 3, "coal": 1}, {"steel": 1}))
+    bom = BillOfMaterials(db)
+    assert bom.expand("iron_ingot") == (True, {"iron": 2.0})
+    assert bom.expand("steel", 2) == (True, {"iron": 12.0, "coal": 2.0})
+    assert bom.raw_cost("steel") == (True, 7.0)
+    assert bom.expand("gold") == (False, "'gold' not found")
+
+
+def test_cycle_is_reported_with_its_path():
+    db = CraftingDatabase()
+    for item_id in ("a", "b", "c"):
+        db.add_item(Item(item_id, item_id, 1))
+    db.add_recipe(Recipe({"b": 1}, {"a": 1}))
+    db.add_recipe(Recipe({"c": 1}, {"b": 1}))
+    db.add_recipe(Recipe({"a": 1}, {"c": 1}))
+    bom = BillOfMaterials(db)
+    assert bom.expand("a") == (False, "Cycle detected: a -> b -> c -> a")
+
+
+def test_deep_chain_does_not_recurse():
+    db = CraftingDatabase()
+    depth = 5000
+    db.bulk_add_items([Item(f"i{i}", f"I{i}", 1) for i in range(depth)])
+    db.bulk_add_recipes([Recipe({f"i{i}": 2}, {f"i{i + 1}": 2}) for i in range(depth - 1)])
+    bom = BillOfMaterials(db)
+    assert bom.expand(f"i{depth - 1}") == (True, {"i0": 1.0})
@@ -0,0 +1,96 @@
+import json
+import random
+
+import pytest
+
+from CraftingDatabase import CraftingDatabase
+from Item import Item
+from Recipe import Recipe
+
+
+@pytest.fixture
+def db():
+    db = CraftingDatabase()
+    for item_id, name in (("iron_ore", "Iron Ore"), ("coal", "Coal"), ("iron_ingot", "Iron Ingot"), ("slag", "Slag")):
+        db.add_item(Item(item_id, name, 1))
+    return db
+
+def write(path, lines):
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_import_items(tmp_path):
+    db = CraftingDatabase()
+    filename = write(tmp_path / "items.csv", ["Item Name,Price", "Iron Ore,3", "Coal,", ",4", "Gear,2.5", "Plate,-1"])
+    report = db.import_items(filename, columns={"name": "Item Name", "sell_value": "Price"})
+    assert report["added"] == 2
+    assert sorted(line for line, _reason in report["errors"]) == [4, 5, 6]
+    assert db.items["iron_ore"].sell_value == 3
+    assert db.items["coal"].sell_value == 0
+
+
+def test_import_recipes_csv(db, tmp_path):
+    filename = write(tmp_path / "recipes.csv", [
+        "inputs,outputs,type,time",
+        "iron_ore:2; coal,iron_ingot:1; slag:1,smelt,3",
+        "Iron Ore:1; iron_ore:1,iron_ingot,,",
+        "gold:1,iron_ingot:1,,",
+        "iron_ore:0,iron_ingot:1,,",
+        "iron_ore:2; coal,iron_ingot:1; slag:1,smelt,3",
+        "iron_ore:1,iron_ingot:1,,fast",
+    ])
+    report = db.import_recipes(filename)
+    assert report["rows"] == 6
+    assert report["added"] == 2
+    assert sorted(line for line, _reason in report["errors"]) == [4, 5, 6, 7]
+    assert Recipe({"iron_ore": 2, "coal": 1}, {"iron_ingot": 1, "slag": 1}, "SMELT", 3) in db.recipes
+    assert Recipe({"iron_ore": 2}, {"iron_ingot": 1}) in db.recipes
+    assert db.recipes_that_produce("slag") == [Recipe({"iron_ore": 2, "coal": 1}, {"iron_ingot": 1, "slag": 1}, "SMELT", 3)]
+
+
+def test_import_recipes_jsonl(db, tmp_path):
+    filename = write(tmp_path / "recipes.jsonl", [
+        json.dumps({"inputs": {"iron_ore": 2}, "outputs": "iron_ingot:1", "time": 1.5}),
+        "",
+        "not json",
+        json.dumps(["iron_ore"]),
+        json.dumps({"inputs": {"iron_ore": 2.5}, "outputs": {"iron_ingot": 1}}),
+    ])
+    report = db.import_recipes(filename)
+    assert report["added"] == 1
+    assert sorted(line for line, _reason in report["errors"]) == [3, 4, 5]
+    assert Recipe({"iron_ore": 2}, {"iron_ingot": 1}, time=1.5) in db.recipes
+
+
+def test_json_extension_needs_a_format(db, tmp_path):
+    filename = write(tmp_path / "recipes.json", [json.dumps({"inputs": {"iron_ore": 1}, "outputs": {"coal": 1}})])
+    with pytest.raises(ValueError):
+        db.import_recipes(filename)
+    assert db.import_recipes(filename, format="jsonl")["added"] == 1
+
+
+#Imported Recipes must be indistinguishable from ones built with the constructor, down to the stored tuple and hash
+def test_imported_recipes_match_constructed(tmp_path):
+    rnd = random.Random(7)
+    db = CraftingDatabase()
+    item_ids = [f"item_{i}" for i in range(50)]
+    for item_id in item_ids:
+        db.add_item(Item(item_id, item_id.replace("_", " ").title(), 1))
+    lines = ["inputs,outputs,type,time"]
+    for _ in range(500):
+        inputs = "; ".join(f"{rnd.choice(item_ids)}:{rnd.randint(1, 5)}" for _ in range(rnd.randint(1, 3)))
+        outputs = "; ".join(f"{rnd.choice(item_ids).replace('_', ' ').title()}:{rnd.randint(1, 5)}" for _ in range(2))
+        lines.append(f"{inputs},{outputs},{rnd.choice(['craft', 'Smelt'])},{rnd.randint(0, 4) / 2}")
+    report = db.import_recipes(write(tmp_path / "recipes.csv", lines), batch_size=64)
+
+    assert report["added"] + report["rejected"] == 500
+    assert all(reason == "Recipe is listed more than once" or "already exists" in reason
+               for _line, reason in report["errors"])
+    for recipe in db.recipes:
+        built = Recipe(recipe.inputs, recipe.outputs, recipe.type, recipe.time)
+        assert hash(built) == hash(recipe)
+        assert built == recipe
+        assert built._ingredients == recipe._ingredients
+        assert built._split == recipe._split
+        assert all(item_id in db.items for item_id in recipe.item_ids)
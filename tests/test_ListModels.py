@@ -0,0 +1,39 @@
+import pytest
+
+pytest.importorskip("PySide6")
+
+from CraftingDatabase import CraftingDatabase
+from ListModels import ItemListModel, _runs
+
+
+def test_runs():
+    assert _runs([]) == []
+    assert _runs([1, 2, 3, 7, 9, 10]) == [(1, 3), (7, 7), (9, 10)]
+
+
+#Records the row signals a model emits, as ("removed" | "inserted" | "changed", first row, last row)
+def watch(model):
+    signals = []
+    model.rowsRemoved.connect(lambda _parent, first, last: signals.append(("removed", first, last)))
+    model.rowsInserted.connect(lambda _parent, first, last: signals.append(("inserted", first, last)))
+    model.dataChanged.connect(lambda first, last, *_roles: signals.append(("changed", first.row(), last.row())))
+    model.modelReset.connect(lambda: signals.append(("reset",)))
+    return signals
+
+
+def test_update_rows_only_touches_changed_rows():
+    model = ItemListModel(CraftingDatabase())
+    model.set_rows(["a", "b", "c", "d", "e"])
+    signals = watch(model)
+    model.update_rows(["a", "c", "x", "y", "d", "e"], {"b", "x", "y", "d"})
+    assert model.item_ids == ["a", "c", "x", "y", "d", "e"]
+    assert signals == [("removed", 1, 1), ("inserted", 2, 3), ("changed", 4, 4)]
+
+
+def test_update_rows_resets_when_other_rows_move():
+    model = ItemListModel(CraftingDatabase())
+    model.set_rows(["a", "b", "c"])
+    signals = watch(model)
+    model.update_rows(["c", "b", "a"], {"a"})
+    assert model.item_ids == ["c", "b", "a"]
+    assert signals == [("reset",)]
@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from NameIndex import NameIndex
+
+WORDS = ["iron", "copper", "gold", "ore", "ingot", "plate", "gear", "wire", "circuit", "steel", "coal", "sand", "glass",
+         "mk", "advanced", "basic", "tank", "pipe", "rod", "frame", "motor", "engine", "battery", "cable"]
+
+#100k names made from a couple dozen words, so every trigram has thousands of postings and names repeat many times
+@pytest.fixture(scope="module")
+def repetitive():
+    rnd = random.Random(1)
+    names = {}
+    for i in range(100000):
+        name = " ".join(rnd.choice(WORDS).title() for _ in range(rnd.randint(1, 3)))
+        if rnd.random() < 0.5:
+            name += f" Mk{rnd.randint(1, 9)}"
+        names[f"id{i}"] = name
+    return names
+
+#Item names with the best similarity to text, found by scoring every name
+def brute_force(index, text):
+    grams = NameIndex._grams(text)
+    scores = {item_id: NameIndex._similarity(grams, name) for item_id, name in index._names.items()}
+    best = max(scores.values(), default=0)
+    return {index._names[item_id] for item_id, score in scores.items() if score == best >= index.min_similarity}
+
+
+@pytest.mark.parametrize("budget", [5000, 100000])
+@pytest.mark.parametrize("text, expected", [
+    ("irno ore", "iron ore"),
+    ("coper wire", "copper wire"),
+    ("stel plate", "steel plate"),
+])
+def test_typos_on_repetitive_index(repetitive, budget, text, expected):
+    index = NameIndex.build(repetitive.items(), fuzzy_budget=budget)
+    found = index.search(text, 5)
+    assert len(found) == 5
+    assert {index._names[item_id] for item_id in found} == {expected}
+
+
+def test_matching_on_repetitive_index(repetitive):
+    index = NameIndex.build(repetitive.items())
+    for text in ["i", "ir", "on", "iron", "ron o", "e m", "k5", "zzz"]:
+        assert index.matching(text) == {item_id for item_id, name in repetitive.items() if text in name.lower()}
+    assert index.matching(" ") is None
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_fuzzy_finds_most_similar(seed):
+    rnd = random.Random(seed)
+    pairs = [(f"id{i}", " ".join(rnd.sample(WORDS, rnd.randint(1, 3)))) for i in range(500)]
+    index = NameIndex.build(pairs)
+    for _ in range(10):
+        letters = list(rnd.choice(pairs)[1])
+        i = rnd.randrange(len(letters) - 1)
+        letters[i], letters[i + 1] = letters[i + 1], letters[i]
+        text = "".join(letters)
+        if index.matching(text):
+            continue
+        found = index.search(text, 1)
+        expected = brute_force(index, text)
+        assert {index._names[item_id] for item_id in found} <= expected
+        assert bool(found) == bool(expected)
+
+
+def test_add_and_remove():
+    index = NameIndex.build([("a", "Iron Ore"), ("b", "Copper Wire")])
+    index.add("c", "Steel Plate")
+    index.remove("a")
+    assert index.search("stel plate") == ["c"]
+    assert index.search("irno ore") == []
+    assert index.matching("ire") == {"b"}
@@ -0,0 +1,123 @@
+import random
+
+import pytest
+
+from CraftingDatabase import CraftingDatabase
+from GraphGenerator import generate
+from Item import Item
+from ProductionPlanner import ProductionPlanner
+from Recipe import Recipe
+
+
+def make_db(item_ids, recipes):
+    db = CraftingDatabase()
+    for item_id in item_ids:
+        db.add_item(Item(item_id, item_id, 1))
+    for recipe in recipes:
+        db.add_recipe(recipe)
+    return db
+
+#A small random database, mostly acyclic with some loops and byproducts
+def random_db(seed):
+    rnd = random.Random(seed)
+    count = rnd.randint(3, 12)
+    db = make_db([f"i{i}" for i in range(count)], [])
+    for _ in range(rnd.randint(1, 14)):
+        inputs = {f"i{rnd.randrange(count)}": rnd.randint(1, 3) for _ in range(rnd.randint(1, 3))}
+        outputs = {f"i{rnd.randrange(count)}": rnd.randint(1, 3) for _ in range(rnd.randint(1, 2))}
+        if rnd.random() < 0.7:
+            low = max(int(item_id[1:]) for item_id in inputs)
+            if low >= count - 1:
+                continue
+            outputs = {f"i{rnd.randint(low + 1, count - 1)}": rnd.randint(1, 3) for _ in range(rnd.randint(1, 2))}
+        db.add_recipe(Recipe(inputs, outputs, time=rnd.randint(0, 5)))
+    targets = [{f"i{rnd.randrange(count)}": rnd.randint(0, 5) for _ in range(2)} for _ in range(2)]
+    return db, targets
+
+#Checks a plan against the targets it was made for by adding up every Recipe it runs
+def check_plan(planner, targets, plan):
+    net = {item_id: -rate for item_id, rate in targets.items()}
+    for recipe, crafts in plan["crafts"].items():
+        assert crafts >= 0
+        assert plan["parallel"][recipe] == pytest.approx(crafts * recipe.time / 60)
+        for item_id, qty in recipe.input_items():
+            net[item_id] = net.get(item_id, 0) - qty * crafts
+        for item_id, qty in recipe.output_items():
+            net[item_id] = net.get(item_id, 0) + qty * crafts
+
+    for item_id, amount in net.items():
+        if planner.recipe_for(item_id) is None and amount < -1e-9:
+            assert plan["raw"][item_id] == pytest.approx(-amount)
+        elif amount > 1e-9:
+            assert plan["byproducts"][item_id] == pytest.approx(amount)
+        else:
+            assert amount == pytest.approx(0, abs=1e-9)
+            assert item_id not in plan["byproducts"]
+
+    # Nothing runs more than it has to, some Item it makes has no surplus
+    for recipe, crafts in plan["crafts"].items():
+        if crafts > 1e-9:
+            assert any(abs(net[item_id]) < 1e-6 for item_id in recipe.output_ids)
+
+
+def test_spare_byproducts_are_reported():
+    db = make_db(["ore", "sand", "slag", "ingot", "glass"], [
+        Recipe({"sand": 1}, {"slag": 1}),
+        Recipe({"ore": 1}, {"ingot": 1, "slag": 2}),
+        Recipe({"slag": 1}, {"glass": 1}),
+    ])
+    success, plan = ProductionPlanner(db).plan({"ingot": 10, "glass": 1})
+    assert success
+    crafts = {str(recipe): crafts for recipe, crafts in plan["crafts"].items()}
+    assert crafts == {
+        str(Recipe({"sand": 1}, {"slag": 1})): 0,
+        str(Recipe({"ore": 1}, {"ingot": 1, "slag": 2})): 10,
+        str(Recipe({"slag": 1}, {"glass": 1})): 1,
+    }
+    assert plan["byproducts"] == {"slag": 19}
+    assert plan["raw"] == {"ore": 10}
+
+
+def test_byproduct_drives_its_recipe_when_needed_more():
+    db = make_db(["ore", "ingot", "slag", "brick"], [
+        Recipe({"ore": 1}, {"ingot": 1, "slag": 1}),
+        Recipe({"slag": 4}, {"brick": 1}),
+    ])
+    success, plan = ProductionPlanner(db).plan({"ingot": 1, "brick": 1})
+    assert success
+    assert plan["raw"] == {"ore": 4}
+    assert plan["byproducts"] == {"ingot": 3}
+
+
+def test_loop_using_more_than_it_makes():
+    db = make_db(["a", "b"], [
+        Recipe({"b": 2}, {"a": 1}),
+        Recipe({"a": 1}, {"b": 1}),
+    ])
+    success, message = ProductionPlanner(db).plan({"a": 1})
+    assert not success
+    assert "can't be made" in message
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_random_plans_balance(seed):
+    db, targets_list = random_db(seed)
+    planner = ProductionPlanner(db)
+    success, plans = planner.plan_many(targets_list)
+    if success:
+        for targets, plan in zip(targets_list, plans):
+            check_plan(planner, targets, plan)
+    planner.close()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_generated_plans_succeed(seed):
+    db = generate(seed=seed)
+    planner = ProductionPlanner(db)
+    rnd = random.Random(seed)
+    item_ids = list(db.items)
+    for _ in range(10):
+        targets = {rnd.choice(item_ids): rnd.randint(1, 10) for _ in range(rnd.randint(1, 4))}
+        success, plan = planner.plan(targets)
+        assert success, plan
+        check_plan(planner, targets, plan)
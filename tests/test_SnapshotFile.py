@@ -0,0 +1,30 @@
+import pytest
+
+from CraftingDatabase import CraftingDatabase
+from Item import Item
+from Recipe import Recipe
+from SnapshotFile import SnapshotDatabase
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    db = CraftingDatabase()
+    for item_id, value in (("ore", 1), ("coal", 2), ("ingot", 5)):
+        db.add_item(Item(item_id, item_id.title(), value))
+    db.add_recipe(Recipe({"ore": 2}, {"ingot": 1}))
+    db.add_recipe(Recipe({"coal": 1, "ore": 1}, {"ingot": 1}))
+    with SnapshotDatabase.from_database(db, str(tmp_path / "db.snap")) as snapshot:
+        yield snapshot
+
+
+def test_calc_profit_by_recipe_and_row(snapshot):
+    assert snapshot.calc_profit(0) == (True, 3)
+    assert snapshot.calc_profit(1) == (True, 2)
+    assert snapshot.calc_profit(Recipe({"coal": 1, "ore": 1}, {"ingot": 1})) == (True, 2)
+    assert snapshot.calc_profit(2) == (False, -1)
+    assert snapshot.calc_profit(Recipe({"coal": 1}, {"ingot": 1})) == (False, -1)
+
+
+@pytest.mark.parametrize("value", [True, False])
+def test_calc_profit_rejects_bool(snapshot, value):
+    assert snapshot.calc_profit(value) == (False, -1)
@@ -0,0 +1,88 @@
+import random
+
+import pytest
+
+from CraftingDatabase import CraftingDatabase
+from Item import Item
+from Recipe import Recipe
+from UndoStack import UndoStack
+
+
+@pytest.fixture
+def db():
+    db = CraftingDatabase()
+    for item_id in ("ore", "coal", "ingot"):
+        db.add_item(Item(item_id, item_id.title(), 1))
+    db.add_recipe(Recipe({"ore": 2}, {"ingot": 1}))
+    return db
+
+def state(db):
+    return ({item_id: (item.name, item.sell_value) for item_id, item in db.items.items()}, set(db.recipes))
+
+
+def test_undo_and_redo_report_what_they_touched(db):
+    stack = UndoStack(db)
+    smelt = Recipe({"ore": 2}, {"ingot": 1})
+    coke = Recipe({"coal": 1}, {"ingot": 1})
+
+    db.edit_item("ore", new_sell_value=5)
+    db.add_recipe(coke)
+    db.edit_recipe(coke, Recipe({"coal": 2}, {"ingot": 1}))
+    db.remove_item("ore", cascade=True)
+    db.bulk_add_items([Item("gear", "Gear", 3), Item("plate", "Plate", 2)])
+
+    expected = [
+        ({"gear", "plate"}, set()),
+        ({"ore"}, {smelt}),
+        (set(), {coke, Recipe({"coal": 2}, {"ingot": 1})}),
+        (set(), {coke}),
+        ({"ore"}, set()),
+    ]
+    for touched in expected:
+        assert stack.undo()[0]
+        assert stack.last_touched == touched
+    for touched in reversed(expected):
+        assert stack.redo()[0]
+        assert stack.last_touched == touched
+
+    assert stack.redo() == (False, "Nothing to redo")
+    assert stack.last_touched == (set(), set())
+
+
+def test_bulk_remove_touches_items_and_recipes(db):
+    stack = UndoStack(db)
+    smelt = Recipe({"ore": 2}, {"ingot": 1})
+    db.bulk_remove(["ore"], cascade=True)
+    assert stack.undo()[0]
+    assert stack.last_touched == ({"ore"}, {smelt})
+    assert smelt in db.recipes
+
+
+#Undoing every random change in turn walks back through every state the database was in
+@pytest.mark.parametrize("seed", range(20))
+def test_random_changes_undo_and_redo(seed):
+    rnd = random.Random(seed)
+    db = CraftingDatabase()
+    stack = UndoStack(db, limit=1000)
+    states = [state(db)]
+    for step in range(40):
+        item_ids = list(db.items)
+        roll = rnd.random()
+        if roll < 0.3 or len(item_ids) < 2:
+            success, _msg = db.add_item(Item(f"i{step}", f"I{step}", rnd.randint(0, 9)))
+        elif roll < 0.6:
+            inputs = {rnd.choice(item_ids): rnd.randint(1, 3)}
+            success, _msg = db.add_recipe(Recipe(inputs, {rnd.choice(item_ids): rnd.randint(1, 3)}))
+        elif roll < 0.8:
+            success, _msg = db.edit_item(rnd.choice(item_ids), new_sell_value=rnd.randint(0, 9))
+        else:
+            success, _msg = db.remove_item(rnd.choice(item_ids), cascade=True)
+        if success:
+            states.append(state(db))
+
+    for expected in reversed(states[:-1]):
+        assert stack.undo()[0]
+        assert state(db) == expected
+    for expected in states[1:]:
+        assert stack.redo()[0]
+        assert state(db) == expected